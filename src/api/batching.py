@@ -0,0 +1,91 @@
+import asyncio
+
+
+class AgrupadorSolicitudes:
+    """Agrupa solicitudes individuales de /predict en micro-lotes.
+
+    Espera hasta `ventana_ms` desde la primera solicitud o hasta juntar
+    `max_lote` registros, evalúa el lote con una sola llamada a `procesar_lote`
+    y entrega a cada solicitante su resultado.
+    """
+
+    def __init__(self, procesar_lote, ventana_ms=3.0, max_lote=64):
+        self.procesar_lote = procesar_lote
+        self.ventana = ventana_ms / 1000.0
+        self.max_lote = max_lote
+        self._cola = None
+        self._bucle_tarea = None
+        self._despachos = set()
+        self._lotes = 0
+        self._filas = 0
+        self._lote_max = 0
+
+    def iniciar(self):
+        self._cola = asyncio.Queue()
+        self._bucle_tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._bucle_tarea is not None:
+            self._bucle_tarea.cancel()
+            try:
+                await self._bucle_tarea
+            except asyncio.CancelledError:
+                pass
+            self._bucle_tarea = None
+        if self._despachos:
+            await asyncio.gather(*self._despachos, return_exceptions=True)
+
+    async def enviar(self, registro):
+        """Encola un registro y espera su resultado dentro del lote."""
+        futuro = asyncio.get_running_loop().create_future()
+        self._cola.put_nowait((registro, futuro))
+        return await futuro
+
+    async def _bucle(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self._cola.get()]
+            limite = loop.time() + self.ventana
+            while len(lote) < self.max_lote:
+                if not self._cola.empty():
+                    lote.append(self._cola.get_nowait())
+                    continue
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self._cola.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            # El lote se despacha en segundo plano para seguir acumulando el siguiente.
+            tarea = asyncio.create_task(self._despachar(lote))
+            self._despachos.add(tarea)
+            tarea.add_done_callback(self._despachos.discard)
+
+    async def _despachar(self, lote):
+        self._lotes += 1
+        self._filas += len(lote)
+        self._lote_max = max(self._lote_max, len(lote))
+        try:
+            resultados = await self.procesar_lote([registro for registro, _ in lote])
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        for (_, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+    def estadisticas(self):
+        return {
+            "ventana_ms": self.ventana * 1000,
+            "max_lote": self.max_lote,
+            "lotes": self._lotes,
+            "filas": self._filas,
+            "tamano_medio_lote": round(self._filas / self._lotes, 2) if self._lotes else 0.0,
+            "tamano_max_lote": self._lote_max,
+            "en_espera": self._cola.qsize() if self._cola is not None else 0,
+        }
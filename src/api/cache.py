@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachePredicciones:
+    """Cache LRU con expiración (TTL) de probabilidades por cita.
+
+    La clave es el registro canónico (campos ordenados por nombre) y cada
+    entrada queda asociada a la versión del modelo que la calculó: cuando la
+    versión activa cambia, el cache se vacía automáticamente.
+    """
+
+    def __init__(self, max_entradas=10000, ttl_segundos=3600.0, reloj=time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl = ttl_segundos
+        self._reloj = reloj
+        self._datos = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        self._desalojos = 0
+        self._expiradas = 0
+        self._invalidaciones = 0
+
+    @staticmethod
+    def clave(registro):
+        return tuple(sorted(registro.items()))
+
+    def _sincronizar_version(self, version):
+        if version != self._version:
+            if self._datos:
+                self._invalidaciones += 1
+            self._datos.clear()
+            self._version = version
+
+    def obtener(self, registro, version):
+        """Probabilidad almacenada para el registro, o None si no está o expiró."""
+        clave = self.clave(registro)
+        with self._lock:
+            self._sincronizar_version(version)
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self._fallos += 1
+                return None
+            probabilidad, expira = entrada
+            if self._reloj() >= expira:
+                del self._datos[clave]
+                self._expiradas += 1
+                self._fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self._aciertos += 1
+            return probabilidad
+
+    def guardar(self, registro, version, probabilidad):
+        if self.max_entradas <= 0:
+            return
+        clave = self.clave(registro)
+        with self._lock:
+            self._sincronizar_version(version)
+            self._datos[clave] = (probabilidad, self._reloj() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self._desalojos += 1
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl,
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasa_aciertos": round(self._aciertos / consultas, 4) if consultas else 0.0,
+                "desalojos": self._desalojos,
+                "expiradas": self._expiradas,
+                "invalidaciones": self._invalidaciones,
+                "version_modelo": self._version,
+            }
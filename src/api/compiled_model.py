@@ -0,0 +1,284 @@
+import json
+import numpy as np
+
+# Versión del formato del artefacto compacto (.npz); cambia si cambia su contenido.
+FORMATO_COMPACTO = 1
+# Arreglos del artefacto compacto y el tipo con que se guardan. Los umbrales y
+# valores de hoja se mantienen en float64 para conservar la paridad exacta.
+ARREGLOS_COMPACTO = {
+    'medianas': np.float64, 'media': np.float64, 'escala': np.float64,
+    'columnas_num': np.int32, 'offsets_cat': np.int32, 'raices': np.int32,
+    'feature': np.int32, 'threshold': np.float64, 'izquierda': np.int32,
+    'derecha': np.int32, 'valor': np.float64,
+}
+
+# Diferencia absoluta máxima admitida entre la probabilidad del modelo compilado
+# y la de pipeline.predict_proba. Las únicas diferencias esperadas provienen del
+# orden de las sumas en punto flotante (del orden de 1e-15).
+TOLERANCIA_PROBABILIDAD = 1e-9
+
+
+class ModeloCompilado:
+    """Pipeline entrenado (ColumnTransformer + GradientBoostingClassifier)
+    aplanado en arreglos de NumPy para evaluar citas sin pandas ni sklearn."""
+
+    def __init__(self, numeric_features, categorical_features, medianas, media, escala,
+                 modas, categorias, columnas_num, offsets_cat, n_features,
+                 raices, feature, threshold, izquierda, derecha, valor,
+                 raw_inicial, learning_rate, profundidad, sha256_modelo=None):
+        self.numeric_features = list(numeric_features)
+        self.categorical_features = list(categorical_features)
+        self.medianas = np.asarray(medianas, dtype=np.float64)
+        self.media = np.asarray(media, dtype=np.float64)
+        self.escala = np.asarray(escala, dtype=np.float64)
+        self.modas = list(modas)
+        self.categorias = [list(c) for c in categorias]
+        self.columnas_num = np.asarray(columnas_num, dtype=np.intp)
+        self.offsets_cat = np.asarray(offsets_cat, dtype=np.intp)
+        self.n_features = int(n_features)
+        self.raices = np.asarray(raices, dtype=np.intp)
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.izquierda = np.asarray(izquierda, dtype=np.intp)
+        self.derecha = np.asarray(derecha, dtype=np.intp)
+        self.valor = np.asarray(valor, dtype=np.float64)
+        self.raw_inicial = float(raw_inicial)
+        self.learning_rate = float(learning_rate)
+        self.profundidad = int(profundidad)
+        # Hash del pickle del que se exportó (solo en modelos cargados desde el artefacto compacto).
+        self.sha256_modelo = sha256_modelo
+
+        # Vocabulario categoría -> columna absoluta del one-hot.
+        self._vocabularios = [
+            {cat: int(offset) + i for i, cat in enumerate(cats)}
+            for cats, offset in zip(self.categorias, self.offsets_cat)
+        ]
+
+    def transformar(self, registros):
+        """Matriz de features equivalente a preprocessor.transform para una lista de dicts."""
+        n = len(registros)
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+
+        numericos = np.array(
+            [[r.get(f) for f in self.numeric_features] for r in registros], dtype=np.float64
+        ).reshape(n, len(self.numeric_features))
+        faltantes = np.isnan(numericos)
+        if faltantes.any():
+            numericos = np.where(faltantes, self.medianas, numericos)
+        X[:, self.columnas_num] = (numericos - self.media) / self.escala
+
+        for fila, registro in enumerate(registros):
+            for feature, vocabulario, moda in zip(self.categorical_features, self._vocabularios, self.modas):
+                valor = registro.get(feature)
+                if valor is None or valor != valor:
+                    valor = moda
+                columna = vocabulario.get(valor)
+                # Categorías desconocidas quedan en cero (handle_unknown='ignore').
+                if columna is not None:
+                    X[fila, columna] = 1.0
+        return X
+
+    def transformar_columnas(self, columnas):
+        """Como `transformar`, pero con un arreglo por feature (p. ej. las columnas de un DataFrame).
+
+        Evita construir un dict por cita cuando se evalúan lotes grandes.
+        """
+        n = len(columnas[self.numeric_features[0]])
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+
+        numericos = np.column_stack([np.asarray(columnas[f], dtype=np.float64) for f in self.numeric_features])
+        faltantes = np.isnan(numericos)
+        if faltantes.any():
+            numericos = np.where(faltantes, self.medianas, numericos)
+        X[:, self.columnas_num] = (numericos - self.media) / self.escala
+
+        filas = np.arange(n)
+        for feature, vocabulario, moda in zip(self.categorical_features, self._vocabularios, self.modas):
+            valores = np.asarray(columnas[feature], dtype=object)
+            faltantes = (valores != valores) | (valores == None)  # noqa: E711
+            if faltantes.any():
+                valores = np.where(faltantes, moda, valores)
+            indices = np.fromiter((vocabulario.get(v, -1) for v in valores), dtype=np.intp, count=n)
+            conocidas = indices >= 0
+            X[filas[conocidas], indices[conocidas]] = 1.0
+        return X
+
+    def predict_proba_transformado(self, X):
+        """Probabilidad de la clase 1 a partir de la matriz ya transformada."""
+        # Los árboles de sklearn comparan los features en float32.
+        X32 = np.asarray(X, dtype=np.float32)
+        filas = np.arange(X32.shape[0])[:, None]
+        nodos = np.broadcast_to(self.raices, (X32.shape[0], self.raices.shape[0])).copy()
+        for _ in range(self.profundidad):
+            a_la_izquierda = X32[filas, self.feature[nodos]] <= self.threshold[nodos]
+            nodos = np.where(a_la_izquierda, self.izquierda[nodos], self.derecha[nodos])
+        raw = self.raw_inicial + self.learning_rate * self.valor[nodos].sum(axis=1)
+        return 1.0 / (1.0 + np.exp(-raw))
+
+    def predict_proba(self, registros):
+        """Probabilidad de inasistencia para una lista de dicts con los campos de PacienteInput."""
+        return self.predict_proba_transformado(self.transformar(registros))
+
+    def guardar(self, ruta, sha256_modelo):
+        """Escribe el artefacto compacto: un .npz sin pickle con los arreglos y los metadatos en JSON."""
+        meta = {
+            "formato": FORMATO_COMPACTO,
+            "sha256_modelo": sha256_modelo,
+            "numeric_features": self.numeric_features,
+            "categorical_features": self.categorical_features,
+            "modas": [str(m) for m in self.modas],
+            "categorias": [[str(c) for c in cats] for cats in self.categorias],
+            "n_features": self.n_features,
+            "raw_inicial": self.raw_inicial,
+            "learning_rate": self.learning_rate,
+            "profundidad": self.profundidad,
+        }
+        arreglos = {nombre: getattr(self, nombre).astype(tipo) for nombre, tipo in ARREGLOS_COMPACTO.items()}
+        with open(ruta, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arreglos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Carga un artefacto compacto; solo requiere NumPy (no importa sklearn, pandas ni joblib)."""
+        with np.load(ruta, allow_pickle=False) as datos:
+            meta = json.loads(str(datos["meta"]))
+            if meta["formato"] != FORMATO_COMPACTO:
+                raise ValueError(f"Formato de modelo compacto no soportado: {meta['formato']}")
+            arreglos = {nombre: datos[nombre] for nombre in ARREGLOS_COMPACTO}
+        return cls(**arreglos, **{k: v for k, v in meta.items() if k != "formato"})
+
+
+def compilar_modelo(pipeline):
+    """Extrae los parámetros ajustados del pipeline de train.py y construye un ModeloCompilado.
+
+    Lanza ValueError si el pipeline no tiene la estructura soportada.
+    """
+    try:
+        clf = pipeline.named_steps['classifier']
+    except (AttributeError, KeyError) as e:
+        raise ValueError(f"Estructura de pipeline no soportada por el modo compilado: {e}")
+    if type(clf).__name__ != 'GradientBoostingClassifier' or len(clf.classes_) != 2:
+        raise ValueError(f"Clasificador no soportado por el modo compilado: {type(clf).__name__}")
+
+    try:
+        preprocessor = pipeline.named_steps['preprocessor']
+        num_pipe = preprocessor.named_transformers_['num']
+        cat_pipe = preprocessor.named_transformers_['cat']
+        imputer_num = num_pipe.named_steps['imputer']
+        scaler = num_pipe.named_steps['scaler']
+        imputer_cat = cat_pipe.named_steps['imputer']
+        onehot = cat_pipe.named_steps['onehot']
+    except (AttributeError, KeyError) as e:
+        raise ValueError(f"Estructura de pipeline no soportada por el modo compilado: {e}")
+
+    if getattr(clf, 'loss', 'log_loss') != 'log_loss':
+        raise ValueError(f"Función de pérdida no soportada por el modo compilado: {clf.loss}")
+    if onehot.handle_unknown != 'ignore' or onehot.drop_idx_ is not None:
+        raise ValueError("El modo compilado requiere OneHotEncoder(handle_unknown='ignore') sin drop.")
+    if getattr(onehot, '_infrequent_enabled', False):
+        raise ValueError("El modo compilado no soporta categorías infrecuentes en el OneHotEncoder.")
+
+    numeric_features, categorical_features = None, None
+    for name, _, columns in preprocessor.transformers_:
+        if name == 'num':
+            numeric_features = list(columns)
+        elif name == 'cat':
+            categorical_features = list(columns)
+
+    indices = preprocessor.output_indices_
+    columnas_num = np.arange(indices['num'].start, indices['num'].stop)
+    tamanos = [len(c) for c in onehot.categories_]
+    offsets_cat = indices['cat'].start + np.concatenate([[0], np.cumsum(tamanos)[:-1]]).astype(np.intp)
+
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(numeric_features))
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(numeric_features))
+
+    # Todos los árboles en arreglos contiguos; las hojas apuntan a sí mismas para
+    # que el recorrido vectorizado pueda avanzar una profundidad fija.
+    raices, feature, threshold, izquierda, derecha, valor = [], [], [], [], [], []
+    offset = 0
+    profundidad = 0
+    for estimator in clf.estimators_[:, 0]:
+        tree = estimator.tree_
+        ids = np.arange(tree.node_count)
+        es_hoja = tree.children_left == -1
+        raices.append(offset)
+        feature.append(np.where(es_hoja, 0, tree.feature))
+        threshold.append(np.where(es_hoja, 0.0, tree.threshold))
+        izquierda.append(np.where(es_hoja, ids, tree.children_left) + offset)
+        derecha.append(np.where(es_hoja, ids, tree.children_right) + offset)
+        valor.append(tree.value[:, 0, 0])
+        profundidad = max(profundidad, tree.max_depth)
+        offset += tree.node_count
+
+    raw_inicial = clf._raw_predict_init(np.zeros((1, clf.n_features_in_)))[0, 0]
+
+    return ModeloCompilado(
+        numeric_features=numeric_features,
+        categorical_features=categorical_features,
+        medianas=imputer_num.statistics_,
+        media=mean,
+        escala=scale,
+        modas=imputer_cat.statistics_,
+        categorias=onehot.categories_,
+        columnas_num=columnas_num,
+        offsets_cat=offsets_cat,
+        n_features=clf.n_features_in_,
+        raices=raices,
+        feature=np.concatenate(feature),
+        threshold=np.concatenate(threshold),
+        izquierda=np.concatenate(izquierda),
+        derecha=np.concatenate(derecha),
+        valor=np.concatenate(valor),
+        raw_inicial=raw_inicial,
+        learning_rate=clf.learning_rate,
+        profundidad=profundidad,
+    )
+
+
+def registros_de_verificacion(compilado, max_umbrales=50):
+    """Citas sintéticas que recorren cada feature del modelo (numéricas y categóricas,
+    incluidas las de historial si el modelo las usa).
+
+    Cubren todas las categorías conocidas y, por feature numérica, valores no
+    enteros alrededor de la media, hasta `max_umbrales` umbrales de los árboles
+    (donde una diferencia de redondeo cambia de rama) y valores faltantes (camino
+    del imputador).
+    """
+    # Umbrales de los nodos internos en la escala original de cada feature numérica.
+    internos = compilado.izquierda != np.arange(len(compilado.izquierda))
+    umbrales = []
+    for j, columna in enumerate(compilado.columnas_num):
+        valores = np.unique(compilado.threshold[internos & (compilado.feature == columna)])
+        valores = valores * compilado.escala[j] + compilado.media[j]
+        if len(valores) > max_umbrales:
+            valores = valores[np.linspace(0, len(valores) - 1, max_umbrales).astype(int)]
+        umbrales.append(valores.tolist())
+
+    n = max([len(c) * 4 for c in compilado.categorias] + [3 * len(u) for u in umbrales] + [20])
+    registros = []
+    for i in range(n):
+        registro = {
+            feature: cats[i % len(cats)]
+            for feature, cats in zip(compilado.categorical_features, compilado.categorias)
+        }
+        for j, feature in enumerate(compilado.numeric_features):
+            if i % 9 == 8:
+                registro[feature] = None
+            elif i % 3 == 0 and umbrales[j]:
+                registro[feature] = umbrales[j][(i // 3) % len(umbrales[j])]
+            else:
+                registro[feature] = max(0.0, float(compilado.media[j] + (i % 7 - 3) / 2 * compilado.escala[j]))
+        registros.append(registro)
+    return registros
+
+
+def verificar_paridad(pipeline, compilado, registros=None):
+    """Máxima diferencia absoluta entre el modelo compilado y pipeline.predict_proba."""
+    import pandas as pd
+
+    if registros is None:
+        registros = registros_de_verificacion(compilado)
+    esperado = pipeline.predict_proba(pd.DataFrame(registros))[:, 1]
+    obtenido = compilado.predict_proba(registros)
+    return float(np.max(np.abs(esperado - obtenido)))
@@ -0,0 +1,78 @@
+import os
+
+# Configuración de la API, ajustable mediante variables de entorno.
+
+# Máximo de citas aceptadas en una sola llamada a /predict/batch.
+MAX_BATCH_SIZE = int(os.getenv("CESFAM_MAX_BATCH_SIZE", "5000"))
+
+# Umbral sobre la probabilidad de inasistencia a partir del cual la cita se
+# clasifica como alto riesgo. Bajarlo aumenta el recall de la clase 1.
+UMBRAL_DECISION = float(os.getenv("CESFAM_UMBRAL_DECISION", "0.5"))
+
+# Inferencia compilada: al cargar el modelo se extraen sus parámetros a arreglos
+# de NumPy y cada cita se evalúa sin construir DataFrames. Si el modelo no es
+# compatible o no supera la verificación de paridad se usa el pipeline completo.
+INFERENCIA_COMPILADA = os.getenv("CESFAM_INFERENCIA_COMPILADA", "1") == "1"
+
+# Ejecutor de inferencia: "thread" o "process". El tamaño del pool y el largo
+# máximo de la cola acotan la carga; al superarse, la API responde 503 con
+# Retry-After en lugar de acumular solicitudes.
+EJECUTOR_TIPO = os.getenv("CESFAM_EJECUTOR", "thread")
+EJECUTOR_WORKERS = int(os.getenv("CESFAM_INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+EJECUTOR_MAX_COLA = int(os.getenv("CESFAM_INFERENCE_QUEUE_MAX", "64"))
+RETRY_AFTER_SEGUNDOS = int(os.getenv("CESFAM_RETRY_AFTER_SEGUNDOS", "1"))
+
+# Micro-batching opcional de /predict: las solicitudes que llegan dentro de la
+# ventana (o hasta completar el máximo de filas) se evalúan juntas.
+MICROBATCH = os.getenv("CESFAM_MICROBATCH", "0") == "1"
+MICROBATCH_VENTANA_MS = float(os.getenv("CESFAM_MICROBATCH_VENTANA_MS", "3"))
+MICROBATCH_MAX = int(os.getenv("CESFAM_MICROBATCH_MAX", "64"))
+
+# Cache LRU de probabilidades por cita (0 entradas lo desactiva). Se invalida
+# automáticamente cuando cambia la versión del modelo cargado.
+CACHE_MAX_ENTRADAS = int(os.getenv("CESFAM_CACHE_MAX", "10000"))
+CACHE_TTL_SEGUNDOS = float(os.getenv("CESFAM_CACHE_TTL_SEGUNDOS", "3600"))
+
+# Carga del modelo:
+#   startup    -> se carga y se calienta antes de aceptar solicitudes.
+#   background -> el proceso responde de inmediato y el modelo se carga en un hilo;
+#                 /health/ready indica cuándo está listo.
+#   lazy       -> se carga con la primera solicitud de predicción.
+CARGA_MODELO = os.getenv("CESFAM_CARGA_MODELO", "startup")
+# Modo de mmap para joblib.load ("r" para mapear los arreglos en solo lectura; vacío lo desactiva).
+MODEL_MMAP = os.getenv("CESFAM_MODEL_MMAP", "r") or None
+
+# Workers de uvicorn al ejecutar `python src/api/main.py` (con 1 se activa reload).
+API_WORKERS = int(os.getenv("CESFAM_API_WORKERS", "1"))
+
+# Recarga en caliente: se vigila el archivo del modelo cada N segundos y, si
+# cambió, se carga, valida y activa la nueva versión sin reiniciar la API.
+VIGILAR_MODELO = os.getenv("CESFAM_VIGILAR_MODELO", "1") == "1"
+VIGILANCIA_SEGUNDOS = float(os.getenv("CESFAM_VIGILANCIA_SEGUNDOS", "5"))
+# Si se define, POST /admin/reload exige este valor en el encabezado X-Admin-Token.
+ADMIN_TOKEN = os.getenv("CESFAM_ADMIN_TOKEN", "")
+
+# Tabla de riesgo precalculada (src/modeling/build_lookup_table.py). Se usa solo si
+# existe en models/ y fue construida para el modelo activo.
+TABLA_RIESGO = os.getenv("CESFAM_TABLA_RIESGO", "1") == "1"
+
+# Artefacto compacto del modelo (src/modeling/export_model.py). Si existe en models/ y
+# fue exportado desde el pickle activo, se carga solo con NumPy en vez de deserializar
+# el pipeline de sklearn.
+MODELO_COMPACTO = os.getenv("CESFAM_MODELO_COMPACTO", "1") == "1"
+
+# Historial de pacientes (src/data_prep/feature_store.py). Solo se consulta si el
+# modelo activo fue entrenado con --historial; se recarga cuando el archivo cambia.
+HISTORIAL_PATH = os.getenv("CESFAM_HISTORIAL_PATH", "data/processed/historial_pacientes.npz")
+
+# Métricas en formato Prometheus en GET /metrics: latencia por endpoint, tiempo por
+# etapa de la inferencia, citas por lote, errores y versión del modelo.
+METRICAS = os.getenv("CESFAM_METRICAS", "1") == "1"
+
+# Perfilador por muestreo (requiere CESFAM_METRICAS=1): mientras hay solicitudes en
+# curso toma la pila de los hilos cada CESFAM_PERFILADOR_INTERVALO_MS y, para las
+# solicitudes que superan el umbral, escribe las pilas colapsadas (flame graph).
+PERFILADOR = os.getenv("CESFAM_PERFILADOR", "0") == "1"
+PERFILADOR_UMBRAL_MS = float(os.getenv("CESFAM_PERFILADOR_UMBRAL_MS", "250"))
+PERFILADOR_INTERVALO_MS = float(os.getenv("CESFAM_PERFILADOR_INTERVALO_MS", "5"))
+PERFILADOR_DIR = os.getenv("CESFAM_PERFILADOR_DIR", "data/processed/perfiles")
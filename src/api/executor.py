@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class ColaSaturadaError(Exception):
+    """La cola de inferencia está llena; el cliente debe reintentar más tarde."""
+
+
+def _ejecutar_midiendo(funcion, encolado, args):
+    # time.monotonic usa un reloj de todo el sistema, por lo que también sirve
+    # para medir la espera cuando la tarea corre en otro proceso.
+    espera = time.monotonic() - encolado
+    return espera, funcion(*args)
+
+
+class EjecutorInferencia:
+    """Pool acotado (hilos o procesos) para sacar la inferencia del event loop.
+
+    Admite como máximo `workers + max_cola` tareas simultáneas; por sobre ese
+    límite rechaza con ColaSaturadaError en vez de acumular trabajo.
+    """
+
+    def __init__(self, tipo="thread", workers=4, max_cola=64, initializer=None, initargs=(), al_completar=None):
+        if tipo not in ("thread", "process"):
+            raise ValueError(f"Tipo de ejecutor desconocido: {tipo}")
+        self.tipo = tipo
+        self.workers = workers
+        self.max_cola = max_cola
+        # Se llama con los segundos que cada tarea esperó en la cola (p. ej. para métricas).
+        self.al_completar = al_completar
+        if tipo == "process":
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inferencia",
+                                            initializer=initializer, initargs=initargs)
+
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._completadas = 0
+        self._rechazadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    @property
+    def capacidad(self):
+        return self.workers + self.max_cola
+
+    async def ejecutar(self, funcion, *args):
+        with self._lock:
+            if self._pendientes >= self.capacidad:
+                self._rechazadas += 1
+                raise ColaSaturadaError(
+                    f"Cola de inferencia llena ({self._pendientes}/{self.capacidad} tareas pendientes)."
+                )
+            self._pendientes += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            espera, resultado = await loop.run_in_executor(
+                self._pool, _ejecutar_midiendo, funcion, time.monotonic(), args
+            )
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+
+        with self._lock:
+            self._completadas += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+        if self.al_completar is not None:
+            self.al_completar(espera)
+        return resultado
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "tipo": self.tipo,
+                "workers": self.workers,
+                "capacidad_cola": self.max_cola,
+                "profundidad_cola": max(0, self._pendientes - self.workers),
+                "en_curso": self._pendientes,
+                "completadas": self._completadas,
+                "rechazadas": self._rechazadas,
+                "espera_media_ms": round(self._espera_total / self._completadas * 1000, 3) if self._completadas else 0.0,
+                "espera_max_ms": round(self._espera_max * 1000, 3),
+            }
+
+    def cerrar(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,73 @@
+import bisect
+import json
+import numpy as np
+
+FORMATO_TABLA = 1
+ESCALA_CUANTIZACION = 65535
+
+
+class TablaRiesgo:
+    """Probabilidades precalculadas sobre la grilla categórica x rangos numéricos.
+
+    La tabla es un arreglo uint16 con un eje por variable; una consulta es un
+    índice por categoría y un bisect por variable numérica. Devuelve None cuando
+    la cita cae fuera de la tabla (categoría desconocida o valor fuera de rango),
+    para que quien consulta use el modelo en vivo.
+    """
+
+    def __init__(self, categorical_features, categorias, numeric_features, bordes, probabilidades, sha256_modelo):
+        self.categorical_features = list(categorical_features)
+        self.categorias = [list(c) for c in categorias]
+        self.numeric_features = list(numeric_features)
+        self.bordes = [[int(b) for b in bordes_feature] for bordes_feature in bordes]
+        self.probabilidades = probabilidades
+        self.sha256_modelo = sha256_modelo
+
+        self._indices = [{cat: i for i, cat in enumerate(cats)} for cats in self.categorias]
+
+    def buscar(self, registro):
+        indice = []
+        for feature, vocabulario in zip(self.categorical_features, self._indices):
+            posicion = vocabulario.get(registro.get(feature))
+            if posicion is None:
+                return None
+            indice.append(posicion)
+        for feature, bordes in zip(self.numeric_features, self.bordes):
+            valor = registro.get(feature)
+            if valor is None or valor != valor or valor < bordes[0] or valor >= bordes[-1]:
+                return None
+            indice.append(bisect.bisect_right(bordes, valor) - 1)
+        return float(self.probabilidades[tuple(indice)]) / ESCALA_CUANTIZACION
+
+    @property
+    def n_celdas(self):
+        return int(self.probabilidades.size)
+
+    def guardar(self, ruta_base):
+        """Escribe `<ruta_base>.npy` (probabilidades) y `<ruta_base>.json` (metadatos)."""
+        np.save(ruta_base + ".npy", self.probabilidades)
+        with open(ruta_base + ".json", "w") as f:
+            json.dump({
+                "formato": FORMATO_TABLA,
+                "sha256_modelo": self.sha256_modelo,
+                "categorical_features": self.categorical_features,
+                "categorias": self.categorias,
+                "numeric_features": self.numeric_features,
+                "bordes": self.bordes,
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def cargar(cls, ruta_base, mmap_mode=None):
+        with open(ruta_base + ".json") as f:
+            meta = json.load(f)
+        if meta["formato"] != FORMATO_TABLA:
+            raise ValueError(f"Formato de tabla de riesgo no soportado: {meta['formato']}")
+        probabilidades = np.load(ruta_base + ".npy", mmap_mode=mmap_mode)
+        return cls(
+            categorical_features=meta["categorical_features"],
+            categorias=meta["categorias"],
+            numeric_features=meta["numeric_features"],
+            bordes=meta["bordes"],
+            probabilidades=probabilidades,
+            sha256_modelo=meta["sha256_modelo"],
+        )
@@ -1,13 +1,25 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+INICIO_PROCESO = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field
-import pandas as pd
-import uvicorn
+from typing import List, Optional
+import asyncio
+import threading
 import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from src.api.model_loader import load_model
+from src.api import config
+from src.api.model_manager import GestorModelo
+from src.api.executor import EjecutorInferencia, ColaSaturadaError
+from src.api.batching import AgrupadorSolicitudes
+from src.api.cache import CachePredicciones
+from src.api.metrics import MetricasAPI, MiddlewareMetricas, PerfiladorMuestreo
+from src.data_prep.historial import HistorialVigente, completar_registros, usa_historial
 
 app = FastAPI(
     title="API de Predicción No-Show CESFAM",
@@ -15,17 +27,168 @@ app = FastAPI(
     version="1.0.0"
 )
 
-model = None
+PACIENTE_EJEMPLO = {
+    "edad": 45,
+    "sexo": "Femenino",
+    "sector": "Norte",
+    "prevision": "Fonasa B",
+    "especialidad": "Medicina General",
+    "dia_semana": "Lunes",
+    "turno": "Mañana",
+    "tiempo_espera_dias": 5,
+    "inasistencias_previas": 0
+}
 
-@app.on_event("startup")
-def startup_event():
-    global model
+gestor = GestorModelo("model_pipeline.pkl", registro_ejemplo=PACIENTE_EJEMPLO)
+historial = HistorialVigente(config.HISTORIAL_PATH)
+ejecutor = None
+agrupador = None
+cache = None
+metricas = MetricasAPI() if config.METRICAS else None
+perfilador = None
+if metricas is not None and config.PERFILADOR:
+    perfilador = PerfiladorMuestreo(
+        config.PERFILADOR_DIR,
+        umbral=config.PERFILADOR_UMBRAL_MS / 1000,
+        intervalo=config.PERFILADOR_INTERVALO_MS / 1000
+    )
+if metricas is not None:
+    app.add_middleware(MiddlewareMetricas, metricas=metricas, perfilador=perfilador)
+
+estado_carga = {"error": None, "segundos_carga": None, "segundos_hasta_listo": None}
+
+def memoria_rss_mb():
     try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
-        model = load_model("model_pipeline.pkl")
-        print("🚀 API Iniciada y Modelo Cargado Correctamente.")
+def cargar_modelo():
+    """Carga y calienta el modelo una sola vez, aunque la llamen varios hilos a la vez."""
+    inicio = time.perf_counter()
+    try:
+        # La validación del gestor incluye una predicción completa (calentamiento), para que
+        # la primera solicitud no pague imports ni inicializaciones.
+        if not gestor.cargar():
+            return
     except Exception as e:
+        estado_carga["error"] = str(e)
         print(f"❌ Error fatal al cargar el modelo: {e}")
+        return
+
+    estado_carga["error"] = None
+    estado_carga["segundos_carga"] = round(time.perf_counter() - inicio, 3)
+    estado_carga["segundos_hasta_listo"] = round(time.perf_counter() - INICIO_PROCESO, 3)
+    print(
+        f"🚀 API Iniciada y Modelo Cargado Correctamente (pid {os.getpid()}, "
+        f"listo en {estado_carga['segundos_hasta_listo']} s, RSS {memoria_rss_mb():.1f} MB)."
+    )
+
+def inicializar_worker():
+    # Cada proceso del pool (CESFAM_EJECUTOR=process) carga su propia copia del modelo.
+    cargar_modelo()
+
+def registrar_medidores(metricas):
+    """Valores que ya llevan el gestor, el ejecutor, el cache y el agrupador; se leen al exportar."""
+    def modelo():
+        activo = gestor.activo
+        if activo is None:
+            return {}
+        return {(activo.version, str(activo.compilado is not None).lower()): 1}
+
+    def recargas():
+        e = gestor.estadisticas()
+        return {("ok",): e["recargas"], ("fallida",): e["recargas_fallidas"]}
+
+    def estadistica(componente, clave):
+        return lambda: {(): componente().estadisticas()[clave]} if componente() is not None else {}
+
+    metricas.medidor("cesfam_modelo_info", "Versión del modelo activo (valor 1).", ("version", "compilado"), modelo)
+    metricas.medidor("cesfam_modelo_recargas", "Recargas del modelo desde el inicio.", ("resultado",), recargas)
+    metricas.medidor("cesfam_ejecutor_cola", "Tareas de inferencia en cola o en curso.", (),
+                     estadistica(lambda: ejecutor, "profundidad_cola"))
+    metricas.medidor("cesfam_ejecutor_rechazadas", "Tareas rechazadas por cola saturada (503) desde el inicio.", (),
+                     estadistica(lambda: ejecutor, "rechazadas"))
+    metricas.medidor("cesfam_cache_entradas", "Predicciones guardadas en el cache.", (),
+                     estadistica(lambda: cache, "entradas"))
+    metricas.medidor("cesfam_cache_aciertos", "Citas respondidas desde el cache desde el inicio.", (),
+                     estadistica(lambda: cache, "aciertos"))
+    metricas.medidor("cesfam_cache_fallos", "Citas que no estaban en el cache desde el inicio.", (),
+                     estadistica(lambda: cache, "fallos"))
+    metricas.medidor("cesfam_microbatch_lotes", "Micro-lotes enviados al modelo desde el inicio.", (),
+                     estadistica(lambda: agrupador, "lotes"))
+
+if metricas is not None:
+    registrar_medidores(metricas)
+
+def observar_espera_cola(segundos):
+    metricas.etapas.observar(segundos, "cola")
+
+async def modelo_activo():
+    """Versión del modelo con la que se atenderá la solicitud (None si no hay modelo)."""
+    if gestor.activo is None and config.CARGA_MODELO == "lazy":
+        await asyncio.get_running_loop().run_in_executor(None, cargar_modelo)
+    return gestor.activo
+
+@app.on_event("startup")
+def startup_event():
+    global ejecutor, cache
+    if config.CARGA_MODELO == "background":
+        threading.Thread(target=cargar_modelo, name="carga-modelo", daemon=True).start()
+    elif config.CARGA_MODELO != "lazy":
+        cargar_modelo()
+
+    if config.VIGILAR_MODELO:
+        gestor.iniciar_vigilancia(config.VIGILANCIA_SEGUNDOS)
+    # El historial se carga y recarga en un hilo aparte: las solicitudes nunca esperan
+    # un np.load (mientras no hay historial cargado, sus features se imputan).
+    historial.iniciar_vigilancia()
+
+    ejecutor = EjecutorInferencia(
+        tipo=config.EJECUTOR_TIPO,
+        workers=config.EJECUTOR_WORKERS,
+        max_cola=config.EJECUTOR_MAX_COLA,
+        initializer=inicializar_worker if config.EJECUTOR_TIPO == "process" else None,
+        al_completar=observar_espera_cola if metricas is not None else None
+    )
+    print(f"🧵 Ejecutor de inferencia: {config.EJECUTOR_TIPO} x{config.EJECUTOR_WORKERS}, cola máx. {config.EJECUTOR_MAX_COLA}.")
+
+    if config.CACHE_MAX_ENTRADAS > 0:
+        cache = CachePredicciones(config.CACHE_MAX_ENTRADAS, config.CACHE_TTL_SEGUNDOS)
+    else:
+        cache = None
+
+    if perfilador is not None:
+        perfilador.iniciar()
+        print(f"🔥 Perfilador activo: solicitudes de más de {config.PERFILADOR_UMBRAL_MS} ms se guardan en {config.PERFILADOR_DIR}.")
+
+@app.on_event("startup")
+async def iniciar_agrupador():
+    global agrupador
+    if config.MICROBATCH:
+        agrupador = AgrupadorSolicitudes(procesar_microlote, ventana_ms=config.MICROBATCH_VENTANA_MS, max_lote=config.MICROBATCH_MAX)
+        agrupador.iniciar()
+        print(f"📦 Micro-batching activo: ventana {config.MICROBATCH_VENTANA_MS} ms, máx. {config.MICROBATCH_MAX} filas.")
+
+@app.on_event("shutdown")
+async def detener_agrupador():
+    global agrupador
+    if agrupador is not None:
+        await agrupador.detener()
+        agrupador = None
+
+@app.on_event("shutdown")
+def shutdown_event():
+    global ejecutor
+    gestor.detener_vigilancia()
+    historial.detener_vigilancia()
+    if perfilador is not None:
+        perfilador.detener()
+    if ejecutor is not None:
+        ejecutor.cerrar()
+        ejecutor = None
 
 
 class PacienteInput(BaseModel):
@@ -38,48 +201,229 @@ class PacienteInput(BaseModel):
     turno: str = Field(..., description="Mañana o Tarde")
     tiempo_espera_dias: int = Field(..., ge=0, description="Días entre solicitud y cita")
     inasistencias_previas: int = Field(..., ge=0, description="Historial de faltas")
+    paciente_id: Optional[int] = Field(None, description="Identificador del paciente; con un modelo entrenado con historial se usa para consultarlo")
 
     class Config:
         schema_extra = {
-            "example": {
-                "edad": 45,
-                "sexo": "Femenino",
-                "sector": "Norte",
-                "prevision": "Fonasa B",
-                "especialidad": "Medicina General",
-                "dia_semana": "Lunes",
-                "turno": "Mañana",
-                "tiempo_espera_dias": 5,
-                "inasistencias_previas": 0
-            }
+            "example": PACIENTE_EJEMPLO
         }
 
+class LotePacientesInput(BaseModel):
+    citas: List[PacienteInput] = Field(..., description="Citas a evaluar, en el orden deseado de respuesta")
+
+
+def predecir_en_worker(registros, version):
+    # En CESFAM_EJECUTOR=process cada proceso tiene su propio gestor: si la API ya
+    # activó otra versión, el worker la carga antes de evaluar.
+    if gestor.activo is None or gestor.activo.version != version:
+        gestor.recargar()
+    return predecir_midiendo(gestor.activo, registros)
+
+
+def predecir_midiendo(activo, registros):
+    """Probabilidades y segundos por etapa de la inferencia (se miden en el hilo o proceso que predice)."""
+    tiempos = {}
+    return activo.predecir(registros, tiempos), tiempos
+
+
+def preparar_registros(registros, activo):
+    """Registros tal como los recibe el modelo: paciente_id no es una feature; si el
+    modelo usa historial, se reemplaza por las features del historial del paciente."""
+    if usa_historial(activo.columnas):
+        return completar_registros(registros, historial.actual())
+    return [{k: v for k, v in r.items() if k != 'paciente_id'} for r in registros]
+
+def formatear_resultado(probability):
+    prediction = int(probability >= config.UMBRAL_DECISION)
+    return {
+        "prediccion": int(prediction),
+        "probabilidad": float(round(probability, 4)),
+        "umbral": config.UMBRAL_DECISION,
+        "mensaje": "Alto riesgo de inasistencia" if prediction == 1 else "Bajo riesgo - Asistencia probable"
+    }
+
+async def inferir(registros, activo):
+    # Una sola pasada por el modelo; la etiqueta se deriva después de la
+    # probabilidad con el umbral configurado en lugar de llamar a model.predict.
+    try:
+        if ejecutor.tipo == "process":
+            probabilidades, tiempos = await ejecutor.ejecutar(predecir_en_worker, registros, activo.version)
+        else:
+            probabilidades, tiempos = await ejecutor.ejecutar(predecir_midiendo, activo, registros)
+    except ColaSaturadaError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Servicio saturado, reintente más tarde. {e}",
+            headers={"Retry-After": str(config.RETRY_AFTER_SEGUNDOS)}
+        )
+    if metricas is not None:
+        metricas.registrar_etapas(tiempos)
+        metricas.citas_por_inferencia.observar(len(registros))
+    return probabilidades
+
+async def procesar_microlote(items):
+    # Un cambio de modelo puede ocurrir entre solicitudes del mismo micro-lote:
+    # cada una se evalúa con la versión que estaba activa cuando llegó.
+    resultados = [None] * len(items)
+    grupos = {}
+    for i, (activo, _) in enumerate(items):
+        grupos.setdefault(id(activo), (activo, []))[1].append(i)
+    for activo, indices in grupos.values():
+        probabilidades = await inferir([items[i][1] for i in indices], activo)
+        for i, probabilidad in zip(indices, probabilidades):
+            resultados[i] = probabilidad
+    return resultados
+
+async def obtener_probabilidades(registros, activo):
+    # Solo las citas que no están en cache pasan por el modelo.
+    probabilidades = [None] * len(registros)
+    pendientes = []
+    inicio = time.perf_counter()
+    for i, registro in enumerate(registros):
+        probabilidad = cache.obtener(registro, activo.version) if cache is not None else None
+        if probabilidad is None:
+            pendientes.append(i)
+        else:
+            probabilidades[i] = probabilidad
+    if metricas is not None and cache is not None:
+        metricas.etapas.observar(time.perf_counter() - inicio, "cache")
+
+    if pendientes:
+        faltantes = [registros[i] for i in pendientes]
+        if agrupador is not None and len(faltantes) == 1:
+            calculadas = [await agrupador.enviar((activo, faltantes[0]))]
+        else:
+            calculadas = await inferir(faltantes, activo)
+        for i, probabilidad in zip(pendientes, calculadas):
+            probabilidades[i] = float(probabilidad)
+            if cache is not None:
+                cache.guardar(registros[i], activo.version, probabilidades[i])
+
+    return probabilidades
+
+def preparar_midiendo(registros, activo, endpoint):
+    if metricas is None:
+        return preparar_registros(registros, activo)
+    inicio = time.perf_counter()
+    preparados = preparar_registros(registros, activo)
+    metricas.etapas.observar(time.perf_counter() - inicio, "preparacion")
+    metricas.citas_por_solicitud.observar(len(registros), endpoint)
+    return preparados
+
 @app.post("/predict")
-def predict_no_show(data: PacienteInput):
-    global model
-    
-    if model is None:
+async def predict_no_show(data: PacienteInput):
+    if metricas is not None:
+        metricas.registrar_validacion()
+    activo = await modelo_activo()
+    if activo is None:
         raise HTTPException(status_code=503, detail="El modelo no está disponible. Revise los logs del servidor.")
 
     try:
-        input_df = pd.DataFrame([data.dict()])
-        
-      
-        prediction = model.predict(input_df)[0]
-        probability = model.predict_proba(input_df)[0][1] 
-        return {
-            "prediccion": int(prediction),
-            "probabilidad": float(round(probability, 4)),
-            "mensaje": "Alto riesgo de inasistencia" if prediction == 1 else "Bajo riesgo - Asistencia probable"
-        }
+        probabilities = await obtener_probabilidades(preparar_midiendo([data.dict()], activo, "/predict"), activo)
+        return formatear_resultado(probabilities[0])
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error en predicción: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno del servidor al procesar la solicitud: {str(e)}")
 
+@app.post("/predict/batch")
+async def predict_no_show_batch(data: LotePacientesInput):
+    if metricas is not None:
+        metricas.registrar_validacion()
+    activo = await modelo_activo()
+    if activo is None:
+        raise HTTPException(status_code=503, detail="El modelo no está disponible. Revise los logs del servidor.")
+
+    n_citas = len(data.citas)
+    if n_citas == 0:
+        raise HTTPException(status_code=422, detail="El lote debe contener al menos una cita.")
+    if n_citas > config.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote tiene {n_citas} citas; el máximo permitido es {config.MAX_BATCH_SIZE}."
+        )
+
+    try:
+        inicio = time.perf_counter()
+        # Una sola pasada vectorizada por el modelo para las citas del lote que no están en cache.
+        registros = preparar_midiendo([cita.dict() for cita in data.citas], activo, "/predict/batch")
+        probabilities = await obtener_probabilidades(registros, activo)
+        resultados = [formatear_resultado(proba) for proba in probabilities]
+
+        return {
+            "resultados": resultados,
+            "total": n_citas,
+            "umbral": config.UMBRAL_DECISION,
+            "version_modelo": activo.version,
+            "tiempo_ms": round((time.perf_counter() - inicio) * 1000, 3)
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error en predicción por lote: {e}")
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor al procesar el lote: {str(e)}")
+
 @app.get("/")
 def read_root():
-    return {"status": "ok", "message": "API CESFAM Model Ready v1.0"}
+    activo = gestor.activo
+    return {
+        "status": "ok",
+        "message": "API CESFAM Model Ready v1.0",
+        "modelo": activo.describir() if activo is not None else None
+    }
+
+@app.post("/admin/reload")
+async def admin_reload(forzar: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    if config.ADMIN_TOKEN and x_admin_token != config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Token de administración inválido.")
+    # La carga y validación ocurren fuera del event loop; las solicitudes siguen
+    # atendiéndose con la versión activa hasta el reemplazo.
+    resultado = await asyncio.get_running_loop().run_in_executor(None, gestor.recargar, forzar)
+    return {**resultado, "modelo": gestor.activo.describir() if gestor.activo is not None else None}
+
+@app.get("/health/live")
+def health_live():
+    # El proceso está arriba y atendiendo, aunque el modelo aún no esté cargado.
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/health/ready")
+def health_ready():
+    activo = gestor.activo
+    cuerpo = {
+        "ready": activo is not None,
+        "pid": os.getpid(),
+        "modo_carga": config.CARGA_MODELO,
+        "mmap": config.MODEL_MMAP,
+        "inferencia_compilada": activo is not None and activo.compilado is not None,
+        "rss_mb": round(memoria_rss_mb(), 1),
+        **estado_carga
+    }
+    return JSONResponse(status_code=200 if activo is not None else 503, content=cuerpo)
+
+@app.get("/stats")
+def read_stats():
+    return {
+        "inferencia": ejecutor.estadisticas() if ejecutor is not None else None,
+        "microbatch": agrupador.estadisticas() if agrupador is not None else None,
+        "cache": cache.estadisticas() if cache is not None else None,
+        "modelo": gestor.estadisticas()
+    }
+
+@app.get("/metrics")
+def read_metrics():
+    if metricas is None:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas (CESFAM_METRICAS=0).")
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 if __name__ == "__main__":
-    uvicorn.run("src.api.main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(
+        "src.api.main:app",
+        host="127.0.0.1",
+        port=8000,
+        reload=config.API_WORKERS == 1,
+        workers=config.API_WORKERS
+    )
\ No newline at end of file
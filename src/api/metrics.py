@@ -0,0 +1,362 @@
+import bisect
+import contextvars
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+# Límites superiores de los buckets de los histogramas (Prometheus agrega +Inf).
+BUCKETS_SEGUNDOS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CITAS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1000, 2000, 5000)
+
+# Instante (perf_counter) en que el middleware recibió la solicitud en curso.
+INICIO_SOLICITUD = contextvars.ContextVar("inicio_solicitud", default=None)
+
+
+def _formatear_etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = []
+    for nombre, valor in zip(nombres, valores):
+        valor = str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pares.append(f'{nombre}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def _formatear_numero(valor):
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monótono por combinación de etiquetas."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *etiquetas, valor=1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+    def valor(self, *etiquetas):
+        return self._valores.get(etiquetas, 0)
+
+    def muestras(self):
+        with self._lock:
+            valores = dict(self._valores)
+        for etiquetas, valor in sorted(valores.items()):
+            yield self.nombre, _formatear_etiquetas(self.etiquetas, etiquetas), valor
+
+
+class Histograma:
+    """Histograma acumulado con buckets fijos por combinación de etiquetas.
+
+    Observar cuesta una búsqueda binaria y un incremento, sin asignar memoria
+    salvo la primera vez que aparece una combinación de etiquetas.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        # etiquetas -> [conteos por bucket (no acumulados) + desborde, suma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        i = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def total(self, *etiquetas):
+        serie = self._series.get(etiquetas)
+        return serie[2] if serie is not None else 0
+
+    def muestras(self):
+        with self._lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        nombres = self.etiquetas + ("le",)
+        for etiquetas, (conteos, suma, total) in sorted(series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (math.inf,), conteos):
+                acumulado += conteo
+                yield f"{self.nombre}_bucket", _formatear_etiquetas(nombres, etiquetas + (_formatear_numero(limite),)), acumulado
+            yield f"{self.nombre}_sum", _formatear_etiquetas(self.etiquetas, etiquetas), suma
+            yield f"{self.nombre}_count", _formatear_etiquetas(self.etiquetas, etiquetas), total
+
+
+class Medidor:
+    """Valor instantáneo que se lee al exportar: `funcion()` devuelve {etiquetas: valor}."""
+
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, etiquetas, funcion):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.funcion = funcion
+
+    def muestras(self):
+        try:
+            valores = self.funcion()
+        except Exception:
+            return
+        for etiquetas, valor in sorted(valores.items()):
+            if valor is not None:
+                yield self.nombre, _formatear_etiquetas(self.etiquetas, etiquetas), valor
+
+
+class RegistroMetricas:
+    """Métricas de la API en el formato de texto de Prometheus (versión 0.0.4)."""
+
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def medidor(self, nombre, ayuda, etiquetas, funcion):
+        return self._registrar(Medidor(nombre, ayuda, etiquetas, funcion))
+
+    def exportar(self):
+        lineas = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            for nombre, etiquetas, valor in metrica.muestras():
+                lineas.append(f"{nombre}{etiquetas} {_formatear_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI que mide cada solicitud HTTP: latencia por endpoint y
+    conteo por código de estado. El endpoint es la plantilla de la ruta (p. ej.
+    /predict), no la URL, para que las etiquetas no crezcan sin límite.
+
+    Es un middleware ASGI puro (sin BaseHTTPMiddleware) para no agregar una
+    tarea ni copiar el cuerpo de la respuesta en cada solicitud.
+    """
+
+    def __init__(self, app, metricas, perfilador=None, excluir=("/metrics",)):
+        self.app = app
+        self.metricas = metricas
+        self.perfilador = perfilador
+        self.excluir = set(excluir)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluir:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        token = INICIO_SOLICITUD.set(inicio)
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        if self.perfilador is not None:
+            self.perfilador.solicitud_iniciada()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            INICIO_SOLICITUD.reset(token)
+            ruta = getattr(scope.get("route"), "path", "sin_ruta")
+            self.metricas.registrar_solicitud(scope["method"], ruta, estado, duracion)
+            if self.perfilador is not None:
+                self.perfilador.solicitud_terminada(inicio, duracion, f"{scope['method']} {ruta}")
+
+
+class MetricasAPI(RegistroMetricas):
+    """Métricas de la API de predicción."""
+
+    def __init__(self):
+        super().__init__()
+        self.solicitudes = self.contador(
+            "cesfam_http_solicitudes_total", "Solicitudes HTTP atendidas.", ("metodo", "endpoint", "estado"))
+        self.errores = self.contador(
+            "cesfam_http_errores_total", "Solicitudes HTTP respondidas con estado >= 400.", ("endpoint", "estado"))
+        self.latencia = self.histograma(
+            "cesfam_http_latencia_segundos", "Latencia de punta a punta de cada solicitud HTTP.", ("metodo", "endpoint"))
+        self.etapas = self.histograma(
+            "cesfam_inferencia_etapa_segundos",
+            "Tiempo por etapa: validacion, preparacion, cache, cola, tabla, dataframe, preprocesamiento, modelo.",
+            ("etapa",))
+        self.citas_por_solicitud = self.histograma(
+            "cesfam_citas_por_solicitud", "Citas por solicitud de predicción.", ("endpoint",), BUCKETS_CITAS)
+        self.citas_por_inferencia = self.histograma(
+            "cesfam_citas_por_inferencia",
+            "Citas evaluadas en cada llamada al modelo (después del cache y del micro-batching).", (), BUCKETS_CITAS)
+
+    def registrar_solicitud(self, metodo, endpoint, estado, duracion):
+        self.solicitudes.incrementar(metodo, endpoint, estado)
+        self.latencia.observar(duracion, metodo, endpoint)
+        if estado >= 400:
+            self.errores.incrementar(endpoint, estado)
+
+    def registrar_etapas(self, tiempos):
+        for etapa, segundos in tiempos.items():
+            self.etapas.observar(segundos, etapa)
+
+    def registrar_validacion(self):
+        """Tiempo desde que llegó la solicitud hasta que el endpoint recibe el cuerpo ya validado."""
+        inicio = INICIO_SOLICITUD.get()
+        if inicio is not None:
+            self.etapas.observar(time.perf_counter() - inicio, "validacion")
+
+
+def _marco_legible(codigo):
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)})"
+
+
+class PerfiladorMuestreo:
+    """Perfilador por muestreo para solicitudes lentas.
+
+    Mientras hay solicitudes en curso, un hilo toma cada `intervalo` segundos
+    la pila de todos los hilos (sys._current_frames). Cuando una solicitud
+    tarda `umbral` segundos o más, las muestras tomadas durante ella se
+    escriben, desde otro hilo para no bloquear el event loop, en `directorio`
+    en formato de pilas colapsadas ("a;b;c N"), que
+    leen flamegraph.pl, speedscope e inferno. Con solicitudes concurrentes el
+    archivo incluye también las pilas de las otras solicitudes en curso.
+    """
+
+    def __init__(self, directorio, umbral, intervalo=0.005, max_archivos=200, max_muestras=50_000, max_pendientes=16):
+        self.directorio = directorio
+        self.umbral = umbral
+        self.intervalo = intervalo
+        self.max_archivos = max_archivos
+        # (instante, pila colapsada) de las muestras recientes.
+        self._muestras = deque(maxlen=max_muestras)
+        self._activas = 0
+        self._hay_activas = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._hilo = None
+        # Solicitudes lentas por volcar. Los archivos se escriben en un hilo aparte, no
+        # en el event loop; si la cola está llena el perfil se descarta.
+        self._pendientes = queue.Queue(maxsize=max_pendientes)
+        self._hilo_volcado = None
+        self.archivos_escritos = 0
+        self.perfiles_descartados = 0
+        self.muestras_tomadas = 0
+        # CPU usada por el hilo del perfilador tomando muestras.
+        self.segundos_cpu = 0.0
+
+    def iniciar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        self._detener.clear()
+        self._hilo_volcado = threading.Thread(target=self._bucle_volcado, name="perfilador-volcado", daemon=True)
+        self._hilo_volcado.start()
+        self._hilo = threading.Thread(target=self._bucle, name="perfilador-muestreo", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._hay_activas.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+        if self._hilo_volcado is not None:
+            # Se escriben los perfiles pendientes antes de terminar.
+            self._pendientes.put(None)
+            self._hilo_volcado.join(timeout=5)
+            self._hilo_volcado = None
+
+    def solicitud_iniciada(self):
+        with self._lock:
+            self._activas += 1
+            self._hay_activas.set()
+
+    def solicitud_terminada(self, inicio, duracion, nombre):
+        with self._lock:
+            self._activas -= 1
+            if self._activas == 0:
+                self._hay_activas.clear()
+        if duracion >= self.umbral and self.archivos_escritos < self.max_archivos:
+            try:
+                self._pendientes.put_nowait((inicio, inicio + duracion, nombre, duracion))
+            except queue.Full:
+                self.perfiles_descartados += 1
+
+    def _bucle_volcado(self):
+        while True:
+            pendiente = self._pendientes.get()
+            if pendiente is None:
+                break
+            try:
+                self._volcar(*pendiente)
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el perfil de {pendiente[2]}: {e}")
+
+    def _bucle(self):
+        propios = {threading.get_ident(), self._hilo_volcado.ident}
+        nombres = {}
+        # Nombre legible de cada función ya vista: formatearlo en cada muestra domina el costo.
+        marcos = {}
+        while not self._detener.is_set():
+            self._hay_activas.wait()
+            if self._detener.is_set():
+                break
+            ahora, cpu = time.perf_counter(), time.thread_time()
+            for id_hilo, marco in sys._current_frames().items():
+                if id_hilo in propios:
+                    continue
+                pila = []
+                while marco is not None:
+                    codigo = marco.f_code
+                    nombre = marcos.get(codigo)
+                    if nombre is None:
+                        nombre = marcos[codigo] = _marco_legible(codigo)
+                    pila.append(nombre)
+                    marco = marco.f_back
+                if id_hilo not in nombres:
+                    nombres = {h.ident: h.name for h in threading.enumerate()}
+                pila.append(nombres.get(id_hilo, str(id_hilo)))
+                self._muestras.append((ahora, ";".join(reversed(pila))))
+            self.muestras_tomadas += 1
+            self.segundos_cpu += time.thread_time() - cpu
+            time.sleep(self.intervalo)
+
+    def _volcar(self, inicio, fin, nombre, duracion):
+        conteos = {}
+        for instante, pila in list(self._muestras):
+            if inicio <= instante <= fin:
+                conteos[pila] = conteos.get(pila, 0) + 1
+        if not conteos:
+            return
+        archivo = "_".join(nombre.replace("/", " ").split()) or "solicitud"
+        ruta = os.path.join(self.directorio, f"{time.strftime('%Y%m%d-%H%M%S')}-{archivo}-{duracion * 1000:.0f}ms.folded")
+        with open(ruta, "w") as f:
+            for pila, n in sorted(conteos.items()):
+                f.write(f"{pila} {n}\n")
+        self.archivos_escritos += 1
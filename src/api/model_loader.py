@@ -1,12 +1,24 @@
-import joblib
 import os
 import sys
 
-def load_model(model_filename="model_pipeline.pkl"):
-  
+def get_model_path(model_filename="model_pipeline.pkl"):
+    if os.path.isabs(model_filename):
+        return model_filename
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.abspath(os.path.join(current_dir, '..', '..'))
-    model_path = os.path.join(project_root, 'models', model_filename)
+    return os.path.join(project_root, 'models', model_filename)
+
+def huella_modelo(model_filename="model_pipeline.pkl"):
+    # Identifica la versión del archivo del modelo por fecha de modificación y tamaño.
+    stat = os.stat(get_model_path(model_filename))
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def load_model(model_filename="model_pipeline.pkl", mmap_mode=None):
+    # Con mmap_mode='r' los arreglos de NumPy del modelo se mapean desde el archivo
+    # en vez de copiarse: la carga es más rápida y los workers comparten esas páginas.
+    import joblib
+
+    model_path = get_model_path(model_filename)
 
     print(f"🔄 Intentando cargar el modelo desde: {model_path}")
 
@@ -19,8 +31,8 @@ def load_model(model_filename="model_pipeline.pkl"):
         raise FileNotFoundError(error_msg)
 
     try:
-        model = joblib.load(model_path)
-        print("✅ Modelo cargado exitosamente en memoria.")
+        model = joblib.load(model_path, mmap_mode=mmap_mode)
+        print(f"✅ Modelo cargado exitosamente en memoria{' (mmap)' if mmap_mode else ''}.")
         return model
     except Exception as e:
         print(f"❌ Error al deserializar el modelo: {e}")
@@ -0,0 +1,305 @@
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+
+from src.api import config
+from src.api.model_loader import load_model, get_model_path, huella_modelo
+from src.api.compiled_model import (
+    ModeloCompilado, compilar_modelo, verificar_paridad, registros_de_verificacion, TOLERANCIA_PROBABILIDAD
+)
+from src.api.lookup_table import TablaRiesgo
+
+
+def hash_archivo(ruta, bloque=1024 * 1024):
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            sha.update(trozo)
+    return sha.hexdigest()
+
+
+def preparar_modelo_compilado(pipeline):
+    if not config.INFERENCIA_COMPILADA:
+        return None
+    try:
+        compilado = compilar_modelo(pipeline)
+        diferencia = verificar_paridad(pipeline, compilado)
+        if diferencia > TOLERANCIA_PROBABILIDAD:
+            print(f"⚠️ Modelo compilado descartado: diferencia {diferencia:.2e} supera la tolerancia.")
+            return None
+        print(f"⚡ Inferencia compilada activa (diferencia máxima {diferencia:.2e}).")
+        return compilado
+    except Exception as e:
+        print(f"⚠️ Inferencia compilada no disponible, se usará el pipeline completo: {e}")
+        return None
+
+
+def ruta_tabla_riesgo(ruta_modelo):
+    return os.path.join(os.path.dirname(ruta_modelo), "tabla_riesgo")
+
+
+def cargar_tabla_riesgo(ruta_modelo, sha256):
+    """Tabla precalculada junto al modelo, solo si fue construida para este mismo archivo."""
+    if not config.TABLA_RIESGO:
+        return None
+    ruta_base = ruta_tabla_riesgo(ruta_modelo)
+    if not os.path.exists(ruta_base + ".json"):
+        return None
+    try:
+        tabla = TablaRiesgo.cargar(ruta_base, mmap_mode=config.MODEL_MMAP)
+    except Exception as e:
+        print(f"⚠️ No se pudo cargar la tabla de riesgo: {e}")
+        return None
+    if tabla.sha256_modelo != sha256:
+        print("⚠️ La tabla de riesgo corresponde a otro modelo; se ignora. Ejecute src/modeling/build_lookup_table.py.")
+        return None
+    print(f"📋 Tabla de riesgo activa ({tabla.n_celdas:,} celdas).")
+    return tabla
+
+
+def ruta_modelo_compacto(ruta_modelo):
+    return os.path.join(os.path.dirname(ruta_modelo), "modelo_compacto.npz")
+
+
+def cargar_modelo_compacto(ruta_modelo, sha256):
+    """Artefacto compacto junto al modelo, solo si fue exportado desde este mismo archivo."""
+    if not config.MODELO_COMPACTO:
+        return None
+    ruta = ruta_modelo_compacto(ruta_modelo)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        compacto = ModeloCompilado.cargar(ruta)
+    except Exception as e:
+        print(f"⚠️ No se pudo cargar el modelo compacto: {e}")
+        return None
+    if compacto.sha256_modelo != sha256:
+        print("⚠️ El modelo compacto corresponde a otro modelo; se ignora. Ejecute src/modeling/export_model.py.")
+        return None
+    print("📦 Modelo compacto activo (cargado sin sklearn).")
+    return compacto
+
+
+class VersionModelo:
+    """Modelo cargado e inmutable. Las solicitudes toman una referencia al inicio
+    y terminan con ella aunque mientras tanto se active otra versión.
+    Con el modelo compacto no hay pipeline: todo se evalúa con `compilado`."""
+
+    def __init__(self, pipeline, compilado, sha256, huella, cargado_en, tabla=None):
+        self.pipeline = pipeline
+        self.compilado = compilado
+        self.tabla = tabla
+        self.sha256 = sha256
+        self.version = sha256[:12]
+        self.huella = huella
+        self.cargado_en = cargado_en
+
+    def predecir(self, registros, tiempos=None):
+        """Probabilidad de inasistencia de cada registro.
+
+        Si se pasa `tiempos` (dict), se anotan los segundos de cada etapa: tabla,
+        dataframe, preprocesamiento y modelo.
+        """
+        if self.tabla is None:
+            return self._predecir_modelo(registros, tiempos)
+        # Búsqueda O(1) en la tabla; solo las citas fuera de ella van al modelo en vivo.
+        inicio = time.perf_counter()
+        probabilidades = np.empty(len(registros))
+        faltantes = []
+        for i, registro in enumerate(registros):
+            probabilidad = self.tabla.buscar(registro)
+            if probabilidad is None:
+                faltantes.append(i)
+            else:
+                probabilidades[i] = probabilidad
+        if tiempos is not None:
+            tiempos['tabla'] = time.perf_counter() - inicio
+        if faltantes:
+            probabilidades[faltantes] = self._predecir_modelo([registros[i] for i in faltantes], tiempos)
+        return probabilidades
+
+    @property
+    def columnas(self):
+        """Columnas de entrada del modelo."""
+        if self.pipeline is None:
+            return self.compilado.numeric_features + self.compilado.categorical_features
+        return list(self.pipeline.feature_names_in_)
+
+    def predecir_dataframe(self, df):
+        """Probabilidades para un DataFrame de citas con una sola llamada vectorizada al pipeline."""
+        if self.pipeline is None:
+            return self.compilado.predict_proba_transformado(self.compilado.transformar_columnas(df))
+        return self.pipeline.predict_proba(df)[:, 1]
+
+    def _predecir_modelo(self, registros, tiempos=None):
+        inicio = time.perf_counter()
+        if self.compilado is not None:
+            X = self.compilado.transformar(registros)
+            transformado = time.perf_counter()
+            probabilidades = self.compilado.predict_proba_transformado(X)
+        else:
+            import pandas as pd
+            # Las columnas que falten en los registros (p. ej. features opcionales) quedan como NaN.
+            df = pd.DataFrame(registros, columns=self.columnas)
+            construido = time.perf_counter()
+            # Igual que pipeline.predict_proba, pero separando el preprocesamiento del clasificador.
+            X = self.pipeline[:-1].transform(df)
+            transformado = time.perf_counter()
+            probabilidades = self.pipeline[-1].predict_proba(X)[:, 1]
+            if tiempos is not None:
+                tiempos['dataframe'] = construido - inicio
+                inicio = construido
+        if tiempos is not None:
+            tiempos['preprocesamiento'] = transformado - inicio
+            tiempos['modelo'] = time.perf_counter() - transformado
+        return probabilidades
+
+    def describir(self):
+        return {
+            "version": self.version,
+            "sha256": self.sha256,
+            "cargado_en": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.cargado_en)),
+            "inferencia_compilada": self.compilado is not None,
+            "tabla_riesgo": self.tabla is not None,
+            "modelo_compacto": self.pipeline is None,
+        }
+
+
+class GestorModelo:
+    """Carga el modelo activo y lo reemplaza en caliente cuando cambia el archivo.
+
+    La nueva versión se carga y valida con una predicción de prueba en segundo
+    plano; solo si pasa la validación se reemplaza la referencia activa
+    (asignación atómica), de modo que nunca se sirve un modelo a medio cargar.
+    """
+
+    def __init__(self, model_filename="model_pipeline.pkl", registro_ejemplo=None):
+        self.model_filename = model_filename
+        self.registro_ejemplo = registro_ejemplo
+        self.activo = None
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._vigilante = None
+        self._artefactos_vistos = None
+        self.recargas = 0
+        self.recargas_fallidas = 0
+        self.ultimo_error = None
+
+    def _construir(self, huella, sha256):
+        ruta = get_model_path(self.model_filename)
+        compacto = cargar_modelo_compacto(ruta, sha256)
+        if compacto is not None:
+            pipeline, compilado = None, compacto
+        else:
+            pipeline = load_model(self.model_filename, mmap_mode=config.MODEL_MMAP)
+            compilado = preparar_modelo_compilado(pipeline)
+        tabla = cargar_tabla_riesgo(ruta, sha256)
+        candidato = VersionModelo(pipeline, compilado, sha256, huella, time.time(), tabla)
+        self._validar(candidato)
+        return candidato
+
+    def _validar(self, candidato):
+        # Predicción de prueba: además de validar, deja la nueva versión "caliente" antes del swap.
+        registros = [self.registro_ejemplo] if self.registro_ejemplo is not None else []
+        if candidato.compilado is not None:
+            registros += registros_de_verificacion(candidato.compilado)
+        if not registros:
+            return
+        probabilidades = np.asarray(candidato.predecir(registros), dtype=float)
+        if probabilidades.shape != (len(registros),) or not np.all((probabilidades >= 0) & (probabilidades <= 1)):
+            raise ValueError("El modelo nuevo no entregó probabilidades válidas en la predicción de prueba.")
+
+    def cargar(self):
+        """Carga la versión inicial si aún no hay modelo activo. Devuelve True si la cargó esta llamada."""
+        with self._lock:
+            if self.activo is not None:
+                return False
+            ruta = get_model_path(self.model_filename)
+            huella = huella_modelo(self.model_filename)
+            self.activo = self._construir(huella, hash_archivo(ruta))
+            return True
+
+    def recargar(self, forzar=False):
+        """Carga la versión del disco si difiere de la activa y la activa tras validarla."""
+        with self._lock:
+            anterior = self.activo
+            try:
+                ruta = get_model_path(self.model_filename)
+                huella = huella_modelo(self.model_filename)
+                if anterior is not None and not forzar and huella == anterior.huella:
+                    return {"recargado": False, "motivo": "sin cambios", "version": anterior.version}
+
+                sha256 = hash_archivo(ruta)
+                if anterior is not None and not forzar and sha256 == anterior.sha256:
+                    anterior.huella = huella
+                    return {"recargado": False, "motivo": "mismo contenido", "version": anterior.version}
+
+                candidato = self._construir(huella, sha256)
+            except Exception as e:
+                self.recargas_fallidas += 1
+                self.ultimo_error = str(e)
+                print(f"❌ Recarga del modelo fallida, se mantiene la versión activa: {e}")
+                return {
+                    "recargado": False,
+                    "motivo": f"error: {e}",
+                    "version": anterior.version if anterior is not None else None
+                }
+
+            self.activo = candidato
+            self.recargas += 1
+            self.ultimo_error = None
+            print(f"🔁 Modelo recargado: {anterior.version if anterior else None} -> {candidato.version}")
+            return {
+                "recargado": True,
+                "version": candidato.version,
+                "version_anterior": anterior.version if anterior is not None else None
+            }
+
+    def iniciar_vigilancia(self, intervalo_segundos):
+        if self._vigilante is not None:
+            return
+        self._detener.clear()
+
+        def vigilar():
+            while not self._detener.wait(intervalo_segundos):
+                activo = self.activo
+                try:
+                    if activo is not None and huella_modelo(self.model_filename) != activo.huella:
+                        self.recargar()
+                    elif activo is not None:
+                        # La tabla de riesgo y el modelo compacto se generan después de train.py:
+                        # cuando aparece uno nuevo que la versión activa no usa, se recarga una
+                        # vez la misma versión para incorporarlo.
+                        ruta_modelo = get_model_path(self.model_filename)
+                        pendientes = []
+                        if activo.tabla is None and config.TABLA_RIESGO:
+                            pendientes.append(ruta_tabla_riesgo(ruta_modelo) + ".json")
+                        if activo.pipeline is not None and config.MODELO_COMPACTO:
+                            pendientes.append(ruta_modelo_compacto(ruta_modelo))
+                        vistos = tuple(os.stat(r).st_mtime_ns if os.path.exists(r) else None for r in pendientes)
+                        if any(v is not None for v in vistos) and vistos != self._artefactos_vistos:
+                            self._artefactos_vistos = vistos
+                            self.recargar(forzar=True)
+                except OSError:
+                    # El archivo puede no existir un instante mientras se reemplaza.
+                    pass
+
+        self._vigilante = threading.Thread(target=vigilar, name="vigilancia-modelo", daemon=True)
+        self._vigilante.start()
+
+    def detener_vigilancia(self):
+        if self._vigilante is not None:
+            self._detener.set()
+            self._vigilante.join(timeout=5)
+            self._vigilante = None
+
+    def estadisticas(self):
+        return {
+            "activo": self.activo.describir() if self.activo is not None else None,
+            "recargas": self.recargas,
+            "recargas_fallidas": self.recargas_fallidas,
+            "ultimo_error": self.ultimo_error,
+            "vigilancia": self._vigilante is not None,
+        }
@@ -0,0 +1,237 @@
+import copy
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from src.data_prep.stream_reader import LectorIncremental
+
+COLUMNAS_CORRELACION = ['paciente_id', 'edad', 'tiempo_espera_dias', 'inasistencias_previas', 'target_no_asiste']
+COLUMNAS_CATEGORICAS = ['sexo', 'sector', 'prevision', 'especialidad', 'dia_semana', 'turno']
+BORDES_EDAD = np.arange(0, 105, 5)
+# Columnas que se leen del dataset para construir los agregados.
+COLUMNAS_EDA = COLUMNAS_CORRELACION + COLUMNAS_CATEGORICAS
+
+
+class ConteoPorCategoria:
+    """Citas y no-shows por valor de una columna categórica."""
+
+    def __init__(self, columna):
+        self.columna = columna
+        self.conteos = {}
+
+    def actualizar(self, df):
+        grupos = df.groupby(self.columna, observed=True)['target_no_asiste'].agg(['size', 'sum'])
+        for valor, n, suma in zip(grupos.index, grupos['size'], grupos['sum']):
+            previo_n, previo_suma = self.conteos.get(valor, (0, 0))
+            self.conteos[valor] = (previo_n + int(n), previo_suma + int(suma))
+
+    def combinar(self, otro):
+        for valor, (n, suma) in otro.conteos.items():
+            previo_n, previo_suma = self.conteos.get(valor, (0, 0))
+            self.conteos[valor] = (previo_n + n, previo_suma + suma)
+
+    def tasas(self):
+        return pd.Series({valor: suma / n for valor, (n, suma) in self.conteos.items()}, name='target_no_asiste')
+
+
+class HistogramaPorClase:
+    """Histograma de bordes fijos separado por clase del target; los valores fuera de rango van a los extremos."""
+
+    def __init__(self, columna, bordes):
+        self.columna = columna
+        self.bordes = np.asarray(bordes)
+        self.conteos = np.zeros((2, len(self.bordes) - 1), dtype=np.int64)
+
+    def actualizar(self, df):
+        valores = np.clip(df[self.columna].to_numpy(), self.bordes[0], self.bordes[-1] - 1)
+        target = df['target_no_asiste'].to_numpy()
+        for clase in (0, 1):
+            self.conteos[clase] += np.histogram(valores[target == clase], bins=self.bordes)[0]
+
+    def combinar(self, otro):
+        self.conteos += otro.conteos
+
+
+class Covarianza:
+    """Medias y co-momentos (Welford) combinables con la fórmula de Chan et al.
+
+    A diferencia de acumular sumas de productos, no pierde precisión cuando las
+    medias son grandes respecto de la varianza (p. ej. paciente_id con millones de filas).
+    """
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        k = len(self.columnas)
+        self.n = 0
+        self.media = np.zeros(k)
+        self.m2 = np.zeros((k, k))
+
+    def _combinar(self, n, media, m2):
+        if n == 0:
+            return
+        total = self.n + n
+        delta = media - self.media
+        self.media = self.media + delta * (n / total)
+        self.m2 = self.m2 + m2 + np.outer(delta, delta) * (self.n * n / total)
+        self.n = total
+
+    def actualizar(self, df):
+        X = df[self.columnas].to_numpy(dtype=np.float64)
+        if len(X) == 0:
+            return
+        media = X.mean(axis=0)
+        centrado = X - media
+        self._combinar(len(X), media, centrado.T @ centrado)
+
+    def combinar(self, otro):
+        self._combinar(otro.n, otro.media, otro.m2)
+
+    def correlacion(self):
+        desviacion = np.sqrt(np.diag(self.m2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.m2 / np.outer(desviacion, desviacion)
+        return pd.DataFrame(corr, index=self.columnas, columns=self.columnas)
+
+
+class AgregadosEDA:
+    """Resumen acumulado de las citas para la página de EDA.
+
+    Cada lote se resume en un agregado parcial (`desde_lote`) en O(filas del lote);
+    los parciales se combinan entre sí sin volver a las filas, de modo que da lo
+    mismo agregar lote a lote, por archivo o en paralelo y combinar al final.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.no_asisten = 0
+        self.por_categoria = {c: ConteoPorCategoria(c) for c in COLUMNAS_CATEGORICAS}
+        self.edad = HistogramaPorClase('edad', BORDES_EDAD)
+        self.covarianza = Covarianza(COLUMNAS_CORRELACION)
+
+    @classmethod
+    def desde_lote(cls, df):
+        parcial = cls()
+        if df is None or df.empty:
+            return parcial
+        parcial.total = len(df)
+        parcial.no_asisten = int(df['target_no_asiste'].sum())
+        for columna, conteo in parcial.por_categoria.items():
+            if columna in df.columns:
+                conteo.actualizar(df)
+        parcial.edad.actualizar(df)
+        parcial.covarianza.actualizar(df)
+        return parcial
+
+    def combinar(self, otro):
+        self.total += otro.total
+        self.no_asisten += otro.no_asisten
+        for columna, conteo in self.por_categoria.items():
+            conteo.combinar(otro.por_categoria[columna])
+        self.edad.combinar(otro.edad)
+        self.covarianza.combinar(otro.covarianza)
+        return self
+
+    def actualizar(self, df):
+        return self.combinar(AgregadosEDA.desde_lote(df))
+
+    def tasa_no_show(self):
+        return self.no_asisten / self.total if self.total else 0.0
+
+    def tasas_por(self, columna):
+        return self.por_categoria[columna].tasas()
+
+    def tasas_por_especialidad(self):
+        return self.tasas_por('especialidad')
+
+    @property
+    def hist_edad(self):
+        return self.edad.conteos
+
+    def correlacion(self):
+        return self.covarianza.correlacion()
+
+
+class SeguidorAgregados:
+    """Mantiene un AgregadosEDA al día con el CSV de streaming.
+
+    Si el archivo no cambió (mismo inode, tamaño y mtime) no se lee nada. Cada
+    actualización publica un agregado nuevo en vez de modificar el anterior, así
+    varias sesiones pueden compartir el seguidor y graficar mientras otra lo actualiza.
+    """
+
+    def __init__(self, path, columnas=COLUMNAS_EDA):
+        self.lector = LectorIncremental(path, columnas=columnas)
+        self.agregados = AgregadosEDA()
+        self.tiempos = {}
+        self._estado_archivo = None
+        self._lock = threading.Lock()
+
+    @property
+    def clave(self):
+        """Identifica el contenido agregado: cambia solo cuando se incorporan filas nuevas."""
+        return (self.lector.reinicios, self.lector.offset)
+
+    def actualizar(self):
+        """Devuelve (agregados, clave), o (None, None) si el archivo no existe."""
+        with self._lock:
+            inicio = time.perf_counter()
+            try:
+                stat = os.stat(self.lector.path)
+            except FileNotFoundError:
+                return None, None
+            estado = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if estado == self._estado_archivo:
+                self.tiempos = {"lectura": time.perf_counter() - inicio, "agregacion": 0.0, "filas_nuevas": 0}
+                return self.agregados, self.clave
+
+            lectura = agregacion = 0.0
+            filas_nuevas = 0
+            agregados = self.agregados
+            while True:
+                nuevas, reiniciado = self.lector.leer_nuevas()
+                lectura += time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                if reiniciado:
+                    agregados = AgregadosEDA()
+                if nuevas is None or nuevas.empty:
+                    break
+                if agregados is self.agregados:
+                    agregados = copy.deepcopy(agregados)
+                agregados.actualizar(nuevas)
+                filas_nuevas += len(nuevas)
+                agregacion += time.perf_counter() - inicio
+                inicio = time.perf_counter()
+
+            self.agregados = agregados
+            self._estado_archivo = estado
+            self.tiempos = {"lectura": lectura, "agregacion": agregacion, "filas_nuevas": filas_nuevas}
+            return self.agregados, self.clave
+
+
+def graficar_tasas(agregados, ax, columna='especialidad'):
+    tasas = agregados.tasas_por(columna)
+    sns.barplot(x=tasas.index, y=tasas.values, hue=tasas.index, legend=False, palette="Blues_r", ax=ax)
+    ax.tick_params(axis='x', rotation=45)
+    ax.set_ylabel("Probabilidad de No-Show")
+
+
+def graficar_histograma(agregados, ax, colores):
+    bordes = agregados.edad.bordes
+    ancho = bordes[1] - bordes[0]
+    asisten, no_asisten = agregados.edad.conteos
+    ax.bar(bordes[:-1], asisten, width=ancho, align='edge', color=colores[0], label='0')
+    ax.bar(bordes[:-1], no_asisten, width=ancho, align='edge', bottom=asisten, color=colores[1], label='1')
+    ax.set_xlabel(agregados.edad.columna)
+    ax.set_ylabel("Count")
+    ax.legend(title='target_no_asiste')
+
+
+def graficar_correlacion(agregados, ax):
+    sns.heatmap(agregados.correlacion(), annot=True, cmap='mako', ax=ax)
+    ax.tick_params(axis='x', rotation=45)
+    for etiqueta in ax.get_xticklabels():
+        etiqueta.set_horizontalalignment('right')
+    ax.tick_params(axis='y', rotation=0)
@@ -0,0 +1,104 @@
+import os
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE_URL = os.getenv("CESFAM_API_URL", "http://127.0.0.1:8000")
+# (conexión, lectura) en segundos.
+TIMEOUT_SEGUNDOS = (3.05, 30)
+REINTENTOS = 3
+# Debe ser <= CESFAM_MAX_BATCH_SIZE de la API.
+TAMANO_BLOQUE = 1000
+
+CAMPOS_CITA = [
+    'edad', 'sexo', 'sector', 'prevision', 'especialidad',
+    'dia_semana', 'turno', 'tiempo_espera_dias', 'inasistencias_previas'
+]
+
+
+class ClienteAPI:
+    """Cliente HTTP de la API de predicción con conexiones reutilizables.
+
+    Una sola `requests.Session` mantiene el pool de conexiones keep-alive. Los
+    errores de conexión y las respuestas 502/503/504 se reintentan con backoff
+    exponencial, respetando el encabezado Retry-After que envía la API cuando su
+    cola de inferencia está llena. Predecir es idempotente, así que también se
+    reintentan los POST.
+    """
+
+    def __init__(self, base_url=API_BASE_URL, timeout=TIMEOUT_SEGUNDOS, reintentos=REINTENTOS,
+                 backoff=0.3, conexiones=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        reintento = Retry(
+            total=reintentos,
+            connect=reintentos,
+            read=0,
+            status=reintentos,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adaptador = HTTPAdapter(max_retries=reintento, pool_connections=conexiones, pool_maxsize=conexiones)
+        self.session = requests.Session()
+        self.session.mount("http://", adaptador)
+        self.session.mount("https://", adaptador)
+
+    def predecir(self, cita):
+        """POST /predict. Devuelve la respuesta; los errores de conexión se propagan."""
+        return self.session.post(f"{self.base_url}/predict", json=cita, timeout=self.timeout)
+
+    def predecir_lote(self, citas, tamano_bloque=TAMANO_BLOQUE, al_avanzar=None):
+        """Evalúa `citas` con /predict/batch en bloques y devuelve los resultados en el mismo orden.
+
+        `al_avanzar(procesadas, total)` se llama después de cada bloque.
+        Lanza requests.HTTPError si la API rechaza un bloque.
+        """
+        resultados = []
+        total = len(citas)
+        for inicio in range(0, total, tamano_bloque):
+            bloque = citas[inicio:inicio + tamano_bloque]
+            response = self.session.post(f"{self.base_url}/predict/batch", json={"citas": bloque}, timeout=self.timeout)
+            response.raise_for_status()
+            resultados.extend(response.json()["resultados"])
+            if al_avanzar is not None:
+                al_avanzar(len(resultados), total)
+        return resultados
+
+    def cerrar(self):
+        self.session.close()
+
+
+def citas_desde_dataframe(df):
+    """Convierte un CSV de citas en registros para la API.
+
+    Devuelve (citas, filas_validas): las filas con campos vacíos se excluyen y
+    `filas_validas` es la máscara para alinear los resultados con el DataFrame.
+    Lanza ValueError si falta alguna columna requerida o si un campo entero trae
+    un valor no numérico o con decimales (no se trunca en silencio).
+    """
+    faltantes = [c for c in CAMPOS_CITA if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas requeridas: {', '.join(faltantes)}")
+    filas_validas = df[CAMPOS_CITA].notna().all(axis=1)
+    datos = df.loc[filas_validas, CAMPOS_CITA]
+    enteros = ['edad', 'tiempo_espera_dias', 'inasistencias_previas']
+    for columna in enteros:
+        valores = pd.to_numeric(datos[columna], errors='coerce')
+        invalidas = valores.isna() | (valores != valores.round())
+        if invalidas.any():
+            filas = ', '.join(str(i) for i in datos.index[invalidas][:5])
+            raise ValueError(f"La columna '{columna}' debe contener enteros (filas {filas})")
+    datos = datos.astype({c: 'int64' for c in enteros} | {c: str for c in CAMPOS_CITA if c not in enteros})
+    return datos.to_dict('records'), filas_validas
+
+
+def resultados_ordenados(df, filas_validas, resultados):
+    """Agrega probabilidad y predicción a las filas evaluadas y las ordena de mayor a menor riesgo."""
+    evaluadas = df.loc[filas_validas].copy()
+    evaluadas['probabilidad'] = [r['probabilidad'] for r in resultados]
+    evaluadas['prediccion'] = [r['prediccion'] for r in resultados]
+    return evaluadas.sort_values('probabilidad', ascending=False, kind='stable').reset_index(drop=True)
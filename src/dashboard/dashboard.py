@@ -1,14 +1,29 @@
 import streamlit as st
 import pandas as pd
-import seaborn as sns
 import matplotlib.pyplot as plt
 import requests
 import os
+import io
 import time
 import subprocess 
 import sys 
 import signal 
 
+sys.path.append(os.getcwd())
+try:
+    from src.data_prep.storage import CSV_PATH, PARQUET_DIR, hay_parquet
+    from src.dashboard.aggregates import (
+        SeguidorAgregados, graficar_tasas, graficar_histograma, graficar_correlacion
+    )
+    from src.dashboard.api_client import ClienteAPI, citas_desde_dataframe, resultados_ordenados
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.data_prep.storage import CSV_PATH, PARQUET_DIR, hay_parquet
+    from src.dashboard.aggregates import (
+        SeguidorAgregados, graficar_tasas, graficar_histograma, graficar_correlacion
+    )
+    from src.dashboard.api_client import ClienteAPI, citas_desde_dataframe, resultados_ordenados
+
 st.set_page_config(
     page_title="Dashboard CESFAM - Predicción No-Show",
     page_icon="🏥",
@@ -19,22 +34,115 @@ plt.style.use('seaborn-v0_8-whitegrid')
 CELSTE_PRINCIPAL = "#B80B9B"
 AZUL_CLARO = "#16E643" 
 
-API_URL = "http://127.0.0.1:8000/predict"
 GENERATOR_SCRIPT = "src/data_prep/stream_generator.py"
+INTERVALO_REFRESCO = int(os.getenv("CESFAM_DASHBOARD_REFRESCO_SEGUNDOS", "3"))
 
 if 'stream_pid' not in st.session_state:
     st.session_state.stream_pid = None
 if 'stream_active' not in st.session_state:
     st.session_state.stream_active = False
 
-def load_data(path="data/raw/dataset_cesfam_stream.csv"):
-    if not os.path.exists(path):
-        return None
+@st.cache_resource
+def obtener_seguidor(path=CSV_PATH):
+    # Un único lector por servidor: todas las sesiones comparten los mismos agregados.
+    return SeguidorAgregados(path)
+
+def load_data():
+    """Incorpora solo las filas nuevas del CSV de streaming. Devuelve (agregados, clave)."""
     try:
-        df = pd.read_csv(path)
-        return df
-    except (pd.errors.EmptyDataError, Exception):
-        return None
+        agregados, clave = obtener_seguidor().actualizar()
+    except (pd.errors.ParserError, ValueError):
+        return None, None
+    if agregados is None or not agregados.total:
+        return None, None
+    return agregados, clave
+
+def figura_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def render_graficos(clave, _agregados):
+    """Gráficos de la página EDA como PNG; se vuelven a dibujar solo si cambia la clave de los datos."""
+    fig, ax = plt.subplots()
+    graficar_tasas(_agregados, ax, 'especialidad')
+    especialidad = figura_png(fig)
+
+    fig, ax = plt.subplots()
+    graficar_histograma(_agregados, ax, [AZUL_CLARO, CELSTE_PRINCIPAL])
+    edad = figura_png(fig)
+
+    fig_corr, ax_corr = plt.subplots(figsize=(10, 4))
+    graficar_correlacion(_agregados, ax_corr)
+    fig_corr.tight_layout()
+    return especialidad, edad, figura_png(fig_corr)
+
+@st.cache_resource
+def obtener_cliente():
+    # Cliente compartido: reutiliza las conexiones a la API entre reruns y sesiones.
+    return ClienteAPI()
+
+def tamano_datos_mb():
+    if hay_parquet():
+        archivos = [os.path.join(PARQUET_DIR, a) for a in os.listdir(PARQUET_DIR)]
+        return sum(os.path.getsize(a) for a in archivos if os.path.isfile(a)) / (1024*1024), "Parquet"
+    if os.path.exists(CSV_PATH):
+        return os.path.getsize(CSV_PATH) / (1024*1024), "CSV"
+    return None, None
+
+def panel_eda():
+    agregados, clave = load_data()
+    hay_novedades = clave != st.session_state.get('clave_eda')
+    st.session_state.clave_eda = clave
+
+    estado = '🟢 ONLINE' if st.session_state.stream_active else '🔴 OFFLINE'
+    novedades = "" if hay_novedades else " | Sin datos nuevos"
+    st.info(f"Estado del Sistema: {estado} | Última Lectura: **{pd.Timestamp.now().strftime('%H:%M:%S')}**{novedades}")
+
+    if agregados is None:
+        st.warning("⚠️ Esperando datos... Presiona '▶️ Iniciar'.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    total_citas = agregados.total
+    tasa_noshow = agregados.tasa_no_show() * 100
+
+    col1.metric("Total Citas Acumuladas", f"{total_citas}")
+    col2.metric("Tasa Global de No-Show", f"{tasa_noshow:.2f}%")
+
+    tamano, formato = tamano_datos_mb()
+    if tamano is not None:
+        col3.metric(f"Tamaño de los Datos ({formato})", f"{tamano:.2f} MB")
+
+    st.markdown("---")
+
+    # Sin datos nuevos la clave no cambia y los gráficos salen del cache sin redibujarse.
+    inicio_render = time.perf_counter()
+    png_especialidad, png_edad, png_corr = render_graficos(clave, agregados)
+    segundos_render = time.perf_counter() - inicio_render
+
+    col_g1, col_g2 = st.columns(2)
+
+    with col_g1:
+        st.subheader("Inasistencia por Especialidad")
+        st.image(png_especialidad, width="stretch")
+
+    with col_g2:
+        st.subheader("Inasistencia por Edad")
+        st.image(png_edad, width="stretch")
+
+    st.subheader("Matriz de Correlación")
+    st.image(png_corr, width="stretch")
+
+    tiempos = obtener_seguidor().tiempos
+    with st.expander("⏱️ Tiempos del último refresco"):
+        col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+        col_t1.metric("Lectura", f"{tiempos.get('lectura', 0) * 1000:.1f} ms")
+        col_t2.metric("Agregación", f"{tiempos.get('agregacion', 0) * 1000:.1f} ms")
+        col_t3.metric("Render", f"{segundos_render * 1000:.1f} ms")
+        col_t4.metric("Filas nuevas", f"{tiempos.get('filas_nuevas', 0)}")
 
 st.sidebar.image("https://cdn-icons-png.flaticon.com/512/2966/2966327.png", width=100)
 st.sidebar.markdown("<h3 style='color: #006dfc;'>Navegación</h3>", unsafe_allow_html=True)
@@ -100,141 +208,135 @@ if page == "Inicio":
 # --- PÁGINA 2: EDA ---
 elif page == "Análisis de Datos (EDA)":
     st.title("📊 Análisis Exploratorio de Datos (Proactivo)")
-    
-    update_container = st.empty()
-    streaming_mode = st.session_state.stream_active
-    
-    while True:
-        df = load_data()
-        
-        with update_container.container():
-            st.info(f"Estado del Sistema: {'🟢 ONLINE' if st.session_state.stream_active else '🔴 OFFLINE'} | Última Lectura: **{pd.Timestamp.now().strftime('%H:%M:%S')}**")
-            
-            if df is None:
-                st.warning("⚠️ Esperando datos... Presiona '▶️ Iniciar'.")
-            else:
-                col1, col2, col3 = st.columns(3)
-                total_citas = len(df)
-                tasa_noshow = df['target_no_asiste'].mean() * 100
-                
-                col1.metric("Total Citas Acumuladas", f"{total_citas}")
-                col2.metric("Tasa Global de No-Show", f"{tasa_noshow:.2f}%")
-                
-                file_path = load_data.__defaults__[0]
-                if os.path.exists(file_path):
-                    col3.metric("Tamaño del Archivo", f"{os.path.getsize(file_path) / (1024*1024):.2f} MB")
-                
-                st.markdown("---")
-                
-                col_g1, col_g2 = st.columns(2)
-
-                with col_g1:
-                    st.subheader("Inasistencia por Especialidad")
-                    fig, ax = plt.subplots()
-                    sns.barplot(data=df, x='especialidad', y='target_no_asiste',
-                                errorbar=None, palette="Blues_r", ax=ax)
-                    plt.xticks(rotation=45)
-                    plt.ylabel("Probabilidad de No-Show")
-                    st.pyplot(fig, clear_figure=True)
-
-                with col_g2:
-                    st.subheader("Inasistencia por Edad")
-                    fig, ax = plt.subplots()
-                    sns.histplot(data=df, x='edad', hue='target_no_asiste',
-                                 multiple="stack", bins=20,
-                                 palette=[AZUL_CLARO, CELSTE_PRINCIPAL], ax=ax)
-                    st.pyplot(fig, clear_figure=True)
-
-                st.subheader("Matriz de Correlación")
-                fig_corr, ax_corr = plt.subplots(figsize=(10, 4))
-                numeric_df = df.select_dtypes(include=['float64', 'int64'])
-                sns.heatmap(numeric_df.corr(), annot=True, cmap='mako', ax=ax_corr)
-                plt.xticks(rotation=45, ha="right")
-                plt.yticks(rotation=0)
-                plt.tight_layout()
-                st.pyplot(fig_corr, clear_figure=True)
-
-        if not st.session_state.stream_active:
-            break
-
-        time.sleep(3)
+
+    intervalo = st.sidebar.slider("🔄 Refresco automático (segundos)", 1, 30, INTERVALO_REFRESCO)
+    # Solo mientras hay streaming el fragmento se vuelve a ejecutar solo; el resto de la
+    # página (y las otras sesiones) no se bloquea esperando el siguiente refresco.
+    panel = st.fragment(run_every=intervalo if st.session_state.stream_active else None)(panel_eda)
+    panel()
 
 elif page == "Predicción en Tiempo Real":
     st.title("🤖 Predicción de Riesgo de No-Show")
-    st.markdown("Ingrese los datos de la cita para evaluar el riesgo de inasistencia.")
+    tab_individual, tab_masivo = st.tabs(["Cita individual", "Carga masiva (CSV)"])
+
+    with tab_individual:
+        st.markdown("Ingrese los datos de la cita para evaluar el riesgo de inasistencia.")
     
-    with st.form("prediction_form"):
-        col1, col2, col3 = st.columns(3)
+        with st.form("prediction_form"):
+            col1, col2, col3 = st.columns(3)
         
-        with col1:
-            edad = st.slider("Edad del Paciente", 0, 100, 30)
-            sexo = st.selectbox("Sexo", ["Femenino", "Masculino"])
-            sector = st.selectbox("Sector", ["Norte", "Sur", "Centro", "Rural"])
+            with col1:
+                edad = st.slider("Edad del Paciente", 0, 100, 30)
+                sexo = st.selectbox("Sexo", ["Femenino", "Masculino"])
+                sector = st.selectbox("Sector", ["Norte", "Sur", "Centro", "Rural"])
             
-        with col2:
-            prevision = st.selectbox("Previsión", ["Fonasa A", "Fonasa B", "Fonasa C", "Fonasa D"])
-            especialidad = st.selectbox("Especialidad", 
-                                         ['Medicina General', 'Dental', 'Matrona', 'Salud Mental', 'Kinesiologia', 'Nutricionista'])
-            inasistencias = st.number_input("Inasistencias Previas", 0, 20, 0)
-
-        with col3:
-            dia = st.selectbox("Día de la Semana", ["Lunes", "Martes", "Miercoles", "Jueves", "Viernes"])
-            turno = st.radio("Turno", ["Mañana", "Tarde"])
-            espera = st.slider("Días de Espera (Anticipación)", 0, 60, 5)
+            with col2:
+                prevision = st.selectbox("Previsión", ["Fonasa A", "Fonasa B", "Fonasa C", "Fonasa D"])
+                especialidad = st.selectbox("Especialidad", 
+                                             ['Medicina General', 'Dental', 'Matrona', 'Salud Mental', 'Kinesiologia', 'Nutricionista'])
+                inasistencias = st.number_input("Inasistencias Previas", 0, 20, 0)
+
+            with col3:
+                dia = st.selectbox("Día de la Semana", ["Lunes", "Martes", "Miercoles", "Jueves", "Viernes"])
+                turno = st.radio("Turno", ["Mañana", "Tarde"])
+                espera = st.slider("Días de Espera (Anticipación)", 0, 60, 5)
         
-        submit_button = st.form_submit_button("Calcular Riesgo")
+            submit_button = st.form_submit_button("Calcular Riesgo")
         
-    if submit_button:
-        datos_entrada = {
-            "edad": edad,
-            "sexo": sexo,
-            "sector": sector,
-            "prevision": prevision,
-            "especialidad": especialidad,
-            "dia_semana": dia,
-            "turno": turno,
-            "tiempo_espera_dias": espera,
-            "inasistencias_previas": inasistencias
-        }
+        if submit_button:
+            datos_entrada = {
+                "edad": edad,
+                "sexo": sexo,
+                "sector": sector,
+                "prevision": prevision,
+                "especialidad": especialidad,
+                "dia_semana": dia,
+                "turno": turno,
+                "tiempo_espera_dias": espera,
+                "inasistencias_previas": inasistencias
+            }
         
-        try:
-            with st.spinner("Consultando al oráculo del Machine Learning..."):
-                try:
-                    response = requests.post(API_URL, json=datos_entrada)
-                    if response.status_code == 200:
-                        result = response.json()
-                        prediccion = result["prediccion"] 
-                        probabilidad = result["probabilidad"] 
-                    else:
-                        st.error(f"Error en la API: {response.status_code}")
-                        st.stop()
-                except requests.exceptions.ConnectionError:
-                    st.warning("⚠️ No se pudo conectar con la API.")
-                    st.info("ℹ️ Mostrando simulación:")
-                    probabilidad = 0.85 if inasistencias > 2 or espera > 30 else 0.15
-                    prediccion = 1 if probabilidad > 0.5 else 0
-
-            st.markdown("---")
-            col_res1, col_res2 = st.columns([1, 2])
+            try:
+                with st.spinner("Consultando al oráculo del Machine Learning..."):
+                    try:
+                        response = obtener_cliente().predecir(datos_entrada)
+                        if response.status_code == 200:
+                            result = response.json()
+                            prediccion = result["prediccion"] 
+                            probabilidad = result["probabilidad"] 
+                        else:
+                            st.error(f"Error en la API: {response.status_code}")
+                            st.stop()
+                    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                        st.warning("⚠️ No se pudo conectar con la API.")
+                        st.info("ℹ️ Mostrando simulación:")
+                        probabilidad = 0.85 if inasistencias > 2 or espera > 30 else 0.15
+                        prediccion = 1 if probabilidad > 0.5 else 0
+
+                st.markdown("---")
+                col_res1, col_res2 = st.columns([1, 2])
             
-            with col_res1:
-                if prediccion == 1:
-                    st.error("🔴 ALTO RIESGO DE NO-SHOW")
-                    st.metric("Probabilidad de Falta", f"{probabilidad:.1%}")
-                else:
-                    st.success("🟢 ASISTENCIA PROBABLE")
-                    st.metric("Probabilidad de Falta", f"{probabilidad:.1%}")
+                with col_res1:
+                    if prediccion == 1:
+                        st.error("🔴 ALTO RIESGO DE NO-SHOW")
+                        st.metric("Probabilidad de Falta", f"{probabilidad:.1%}")
+                    else:
+                        st.success("🟢 ASISTENCIA PROBABLE")
+                        st.metric("Probabilidad de Falta", f"{probabilidad:.1%}")
             
-            with col_res2:
-                st.write("Nivel de Riesgo:")
-                st.progress(float(probabilidad))
-                if prediccion == 1:
-                    st.warning("💡 Recomendación: Enviar recordatorio o sobre-agendar.")
-                else:
-                    st.info("💡 Flujo normal.")
+                with col_res2:
+                    st.write("Nivel de Riesgo:")
+                    st.progress(float(probabilidad))
+                    if prediccion == 1:
+                        st.warning("💡 Recomendación: Enviar recordatorio o sobre-agendar.")
+                    else:
+                        st.info("💡 Flujo normal.")
                         
-        except Exception as e:
-            st.error(f"Ocurrió un error inesperado: {e}")
+            except Exception as e:
+                st.error(f"Ocurrió un error inesperado: {e}")
+
+    with tab_masivo:
+        st.markdown("Suba un CSV con las próximas citas (mismas columnas del formulario) para evaluarlas todas de una vez.")
+        archivo = st.file_uploader("Archivo CSV de citas", type=["csv"])
+        if archivo is not None and st.button("Evaluar agenda"):
+            try:
+                agenda = pd.read_csv(archivo)
+                citas, filas_validas = citas_desde_dataframe(agenda)
+            except (ValueError, pd.errors.ParserError) as e:
+                st.error(f"Archivo inválido: {e}")
+                st.stop()
+
+            if (~filas_validas).any():
+                st.warning(f"⚠️ Se omiten {(~filas_validas).sum()} filas con campos vacíos.")
+            if not citas:
+                st.stop()
+
+            barra = st.progress(0.0, text=f"Evaluando {len(citas)} citas...")
+            try:
+                resultados = obtener_cliente().predecir_lote(
+                    citas, al_avanzar=lambda hechas, total: barra.progress(hechas / total, text=f"{hechas}/{total} citas evaluadas")
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                st.warning("⚠️ No se pudo conectar con la API.")
+                st.stop()
+            except requests.exceptions.HTTPError as e:
+                st.error(f"Error en la API: {e.response.status_code} {e.response.text[:200]}")
+                st.stop()
+
+            st.session_state.resultados_masivos = resultados_ordenados(agenda, filas_validas, resultados)
+
+        if st.session_state.get('resultados_masivos') is not None:
+            tabla = st.session_state.resultados_masivos
+            col_m1, col_m2 = st.columns(2)
+            col_m1.metric("Citas Evaluadas", f"{len(tabla)}")
+            col_m2.metric("Alto Riesgo", f"{int(tabla['prediccion'].sum())}")
+            st.dataframe(tabla, width="stretch")
+            st.download_button(
+                "⬇️ Descargar resultados (CSV)",
+                tabla.to_csv(index=False).encode("utf-8"),
+                file_name="agenda_riesgo_no_show.csv",
+                mime="text/csv"
+            )
 
 st.sidebar.markdown("---")
 st.sidebar.caption(
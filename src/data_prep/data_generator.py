@@ -1,61 +1,92 @@
 import pandas as pd
 import numpy as np
 import os
-import random
 import time
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-GUARDAR_PATH = "data/raw/dataset_cesfam_stream.csv"
+sys.path.append(os.getcwd())
+
+try:
+    from src.data_prep.storage import CSV_PATH, reiniciar_citas, agregar_citas, escribir_parte, vaciar_parquet
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.data_prep.storage import CSV_PATH, reiniciar_citas, agregar_citas, escribir_parte, vaciar_parquet
+
+GUARDAR_PATH = CSV_PATH
 SEMBRAR_INICIAL = 10000 
 SEMBRAR_INCREMENTO = 50  
 INTERVALO_SEGUNDOS = 3
 
-np.random.seed(42)
-random.seed(42)
-
-def generar_registros_cesfam(n_registros, start_id):
-   
+SEMILLA = 42
+# Filas por shard en la generación masiva. Es fijo (no depende de los workers)
+# para que el shard i reciba siempre la misma semilla y las mismas filas.
+FILAS_POR_SHARD = 1_000_000
+# Destino por defecto de la generación masiva: un directorio aparte del dataset vivo
+# (storage.PARQUET_DIR), que se mantiene junto al CSV.
+GENERADO_DIR = "data/processed/citas_generadas"
+
+SEXOS = (['Femenino', 'Masculino'], [0.55, 0.45])
+SECTORES = (['Norte', 'Sur', 'Centro', 'Rural'], [0.3, 0.3, 0.3, 0.1])
+PREVISIONES = (['Fonasa A', 'Fonasa B', 'Fonasa C', 'Fonasa D'], None)
+ESPECIALIDADES = (
+    ['Medicina General', 'Dental', 'Matrona', 'Salud Mental', 'Kinesiologia', 'Nutricionista'],
+    [0.40, 0.20, 0.15, 0.10, 0.10, 0.05]
+)
+DIAS_SEMANA = (['Lunes', 'Martes', 'Miercoles', 'Jueves', 'Viernes'], None)
+TURNOS = (['Mañana', 'Tarde'], None)
+# (desde, hasta, proporción) de cada tramo de edad.
+TRAMOS_EDAD = [(0, 15, 0.15), (15, 65, 0.60), (65, 95, 0.25)]
+
+# Generador por defecto del módulo, para quien no pasa el suyo (p. ej. el streaming).
+_rng = np.random.default_rng(SEMILLA)
+
+def _categoria(rng, valores_y_probabilidades, n):
+    valores, p = valores_y_probabilidades
+    codigos = rng.choice(len(valores), size=n, p=p).astype(np.int8)
+    return pd.Categorical.from_codes(codigos, categories=valores), codigos
+
+def generar_registros_cesfam(n_registros, start_id, rng=None):
+    """Genera `n_registros` citas sintéticas con ids consecutivos desde `start_id`.
+
+    Usa un `numpy.random.Generator` (el del módulo si no se pasa uno) y trabaja
+    con códigos enteros: las columnas de texto salen como categorías y los
+    conteos como enteros pequeños, con los mismos tipos que storage.TIPOS_CITAS.
+    """
     if n_registros <= 0:
         return pd.DataFrame()
+    rng = _rng if rng is None else rng
 
-    ids = range(start_id, start_id + n_registros)
-
-    edades = np.concatenate([
-        np.random.randint(0, 15, int(n_registros * 0.15)),
-        np.random.randint(15, 65, int(n_registros * 0.60)),
-        np.random.randint(65, 95, int(n_registros * 0.25))
-    ])
-    edades = np.resize(edades, n_registros) 
-    np.random.shuffle(edades) 
-
-    sexos = np.random.choice(['Femenino', 'Masculino'], n_registros, p=[0.55, 0.45])
-    sectores = np.random.choice(['Norte', 'Sur', 'Centro', 'Rural'], n_registros, p=[0.3, 0.3, 0.3, 0.1])
-    prevision = np.random.choice(['Fonasa A', 'Fonasa B', 'Fonasa C', 'Fonasa D'], n_registros)
-    especialidades = np.random.choice(
-        ['Medicina General', 'Dental', 'Matrona', 'Salud Mental', 'Kinesiologia', 'Nutricionista'], 
-        n_registros, 
-        p=[0.40, 0.20, 0.15, 0.10, 0.10, 0.05]
-    )
-
-    dias_semana = np.random.choice(['Lunes', 'Martes', 'Miercoles', 'Jueves', 'Viernes'], n_registros)
-    turnos = np.random.choice(['Mañana', 'Tarde'], n_registros)
-    tiempo_espera_dias = np.random.exponential(scale=10, size=n_registros).astype(int)
-    inasistencias_previas = np.random.poisson(lam=0.5, size=n_registros)
-
-    scores = np.random.uniform(0, 1, n_registros)
-    
-    mask_espera_larga = tiempo_espera_dias > 20
-    scores[mask_espera_larga] -= 0.15
-    mask_viernes_tarde = (dias_semana == 'Viernes') & (turnos == 'Tarde')
-    scores[mask_viernes_tarde] -= 0.10
-    mask_jovenes = (edades >= 20) & (edades <= 35)
-    scores[mask_jovenes] -= 0.05
+    ids = np.arange(start_id, start_id + n_registros, dtype=np.int64)
+
+    tramo = rng.choice(len(TRAMOS_EDAD), size=n_registros, p=[t[2] for t in TRAMOS_EDAD])
+    desde = np.array([t[0] for t in TRAMOS_EDAD])[tramo]
+    hasta = np.array([t[1] for t in TRAMOS_EDAD])[tramo]
+    edades = rng.integers(desde, hasta).astype(np.int16)
+
+    sexos, _ = _categoria(rng, SEXOS, n_registros)
+    sectores, _ = _categoria(rng, SECTORES, n_registros)
+    prevision, _ = _categoria(rng, PREVISIONES, n_registros)
+    especialidades, cod_especialidad = _categoria(rng, ESPECIALIDADES, n_registros)
+    dias_semana, cod_dia = _categoria(rng, DIAS_SEMANA, n_registros)
+    turnos, cod_turno = _categoria(rng, TURNOS, n_registros)
+
+    tiempo_espera_dias = rng.exponential(scale=10, size=n_registros).astype(np.int32)
+    inasistencias_previas = rng.poisson(lam=0.5, size=n_registros).astype(np.int16)
+
+    scores = rng.uniform(0, 1, n_registros)
+
+    scores[tiempo_espera_dias > 20] -= 0.15
+    viernes, tarde = DIAS_SEMANA[0].index('Viernes'), TURNOS[0].index('Tarde')
+    scores[(cod_dia == viernes) & (cod_turno == tarde)] -= 0.10
+    scores[(edades >= 20) & (edades <= 35)] -= 0.05
     scores -= (inasistencias_previas * 0.05)
-    mask_mayores = edades > 65
-    scores[mask_mayores] += 0.10
-    mask_complejos = np.isin(especialidades, ['Salud Mental', 'Dental'])
-    scores[mask_complejos] -= 0.05
+    scores[edades > 65] += 0.10
+    complejos = [ESPECIALIDADES[0].index(e) for e in ('Salud Mental', 'Dental')]
+    scores[np.isin(cod_especialidad, complejos)] -= 0.05
 
-    target = np.where(scores < 0.20, 1, 0)
+    target = (scores < 0.20).astype(np.int8)
 
     df_lote = pd.DataFrame({
         'paciente_id': ids,
@@ -73,13 +104,43 @@ def generar_registros_cesfam(n_registros, start_id):
 
     return df_lote
 
+def _generar_shard(destino, n_filas, start_id, semilla):
+    rng = np.random.default_rng(semilla)
+    escribir_parte(generar_registros_cesfam(n_filas, start_id, rng), destino)
+    return n_filas
+
+def generar_dataset(total_filas, destino=GENERADO_DIR, workers=None, semilla=SEMILLA, filas_por_shard=FILAS_POR_SHARD):
+    """Genera `total_filas` citas en shards Parquet independientes, en paralelo.
+
+    Cada shard tiene su propio Generator hijo de `SeedSequence(semilla).spawn`, así
+    el resultado es idéntico con cualquier cantidad de workers. Cada proceso escribe
+    su shard directo a disco, sin pasar las filas por el proceso principal.
+
+    Los ids parten en 1, así que el contenido previo de `destino` se reemplaza.
+    Solo se escribe Parquet, no el CSV: para usarlo como dataset de entrenamiento
+    se pasa `destino` como `ruta` a storage.leer_citas.
+    """
+    workers = workers or os.cpu_count()
+    n_shards = -(-total_filas // filas_por_shard)
+    semillas = np.random.SeedSequence(semilla).spawn(n_shards)
+    tareas = [
+        (destino, min(filas_por_shard, total_filas - i * filas_por_shard), i * filas_por_shard + 1, semillas[i])
+        for i in range(n_shards)
+    ]
+    os.makedirs(destino, exist_ok=True)
+    vaciar_parquet(destino)
+    if workers == 1:
+        return sum(_generar_shard(*t) for t in tareas)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(_generar_shard, *zip(*tareas)))
+
 def simular_streaming_cesfam(guardar_path=GUARDAR_PATH, inicial=SEMBRAR_INICIAL, incremento=SEMBRAR_INCREMENTO, intervalo_segundos=INTERVALO_SEGUNDOS):
     
     os.makedirs(os.path.dirname(guardar_path), exist_ok=True)
     
     print(f"⌛ Generando siembra inicial de {inicial} registros...")
     df_inicial = generar_registros_cesfam(inicial, start_id=1)
-    df_inicial.to_csv(guardar_path, index=False) 
+    reiniciar_citas(df_inicial, guardar_path) 
     
     print(f"✅ Siembra inicial de 10,000 registros guardada instantáneamente.")
     
@@ -94,7 +155,7 @@ def simular_streaming_cesfam(guardar_path=GUARDAR_PATH, inicial=SEMBRAR_INICIAL,
             df_nuevo_lote = generar_registros_cesfam(incremento, start_id=siguiente_id)
             
             if not df_nuevo_lote.empty:
-                df_nuevo_lote.to_csv(guardar_path, mode='a', header=False, index=False)
+                agregar_citas(df_nuevo_lote, guardar_path)
                 
                 siguiente_id += incremento
                 lote_count += 1
@@ -115,4 +176,20 @@ def simular_streaming_cesfam(guardar_path=GUARDAR_PATH, inicial=SEMBRAR_INICIAL,
 
 
 if __name__ == "__main__":
-    simular_streaming_cesfam()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generador de citas sintéticas del CESFAM.")
+    parser.add_argument("--filas", type=int, default=None,
+                        help="Genera este total de filas en shards Parquet en vez de simular el streaming")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, todos los núcleos)")
+    parser.add_argument("--destino", default=GENERADO_DIR,
+                        help="Directorio de salida de los shards; su contenido Parquet se reemplaza (no escribe el CSV)")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    args = parser.parse_args()
+
+    if args.filas is None:
+        simular_streaming_cesfam()
+    else:
+        print(f"⌛ Generando {args.filas:,} citas en {args.destino}...")
+        inicio = time.perf_counter()
+        total = generar_dataset(args.filas, args.destino, args.workers, args.semilla)
+        segundos = time.perf_counter() - inicio
+        print(f"✅ {total:,} citas en {segundos:.1f} s ({total / segundos:,.0f} filas/s).")
\ No newline at end of file
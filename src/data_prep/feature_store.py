@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+try:
+    from src.data_prep.storage import CSV_PATH
+    from src.data_prep.stream_reader import LectorIncremental
+    from src.data_prep.historial import (
+        HISTORIAL_PATH, HISTORIAL_FEATURES, INTERVALO_SEGUNDOS, HistorialPacientes, HistorialVigente,
+        completar_dataframe, completar_registros, usa_historial
+    )
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.data_prep.storage import CSV_PATH
+    from src.data_prep.stream_reader import LectorIncremental
+    from src.data_prep.historial import (
+        HISTORIAL_PATH, HISTORIAL_FEATURES, INTERVALO_SEGUNDOS, HistorialPacientes, HistorialVigente,
+        completar_dataframe, completar_registros, usa_historial
+    )
+
+COLUMNAS_HISTORIAL = ['paciente_id', 'especialidad', 'target_no_asiste']
+
+
+def actualizar_historial(csv_path=CSV_PATH, ruta=HISTORIAL_PATH):
+    """Incorpora al historial guardado las citas agregadas al CSV desde la última actualización.
+
+    Si el CSV fue reemplazado (nueva siembra) el historial se reconstruye desde cero.
+    Devuelve el historial y las citas nuevas incorporadas.
+    """
+    historial = HistorialPacientes.cargar(ruta) if os.path.exists(ruta) else HistorialPacientes()
+    lector = LectorIncremental(csv_path, columnas=COLUMNAS_HISTORIAL)
+    if historial.estado_lector is not None:
+        lector.restaurar(historial.estado_lector)
+    nuevas = 0
+    while True:
+        df, reiniciado = lector.leer_nuevas()
+        if reiniciado and historial.citas:
+            historial = HistorialPacientes()
+        if df is None or df.empty:
+            break
+        historial.agregar(df)
+        nuevas += len(df)
+    historial.estado_lector = lector.estado()
+    historial.guardar(ruta)
+    return historial, nuevas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye y actualiza el historial de pacientes desde el CSV de streaming.")
+    parser.add_argument("--entrada", default=CSV_PATH)
+    parser.add_argument("--salida", default=HISTORIAL_PATH)
+    parser.add_argument("--seguir", action="store_true", help="Seguir actualizando a medida que llegan citas")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_SEGUNDOS)
+    args = parser.parse_args()
+    while True:
+        inicio = time.perf_counter()
+        historial, nuevas = actualizar_historial(args.entrada, args.salida)
+        if nuevas or not args.seguir:
+            print(f"✅ {nuevas:,} citas nuevas incorporadas en {time.perf_counter() - inicio:.2f} s "
+                  f"({len(historial):,} pacientes, {historial.citas:,} citas).")
+        if not args.seguir:
+            break
+        time.sleep(args.intervalo)
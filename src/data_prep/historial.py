@@ -0,0 +1,265 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+
+# Parte del historial de pacientes que usa la API: solo depende de NumPy, para no
+# cargar pandas ni pyarrow al importarla (pandas se importa solo en los métodos que
+# construyen el historial desde un DataFrame). La actualización desde el CSV está en
+# feature_store.py.
+HISTORIAL_PATH = "data/processed/historial_pacientes.npz"
+# Versión del formato del archivo; cambia si cambia su contenido.
+FORMATO_HISTORIAL = 1
+# Features que agrega el historial. La tasa queda NaN para un paciente sin citas previas
+# (el imputador del pipeline la reemplaza por la mediana).
+HISTORIAL_FEATURES = ['hist_citas', 'hist_tasa_no_show', 'hist_citas_especialidad']
+INTERVALO_SEGUNDOS = 5
+
+
+class _TablaContadores:
+    """Contadores enteros indexados por una clave hashable: un dict clave -> fila
+    y arreglos de NumPy que crecen al doble, así consultar o sumar es O(1) por clave."""
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        self.filas = {}
+        self.valores = np.zeros((len(self.columnas), 1024), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.filas)
+
+    def indices(self, claves, crear=False):
+        """Fila de cada clave; -1 si no existe (o se crea con ceros si `crear`)."""
+        if not crear:
+            obtener = self.filas.get
+            return np.fromiter((obtener(c, -1) for c in claves), dtype=np.int64, count=len(claves))
+        filas = self.filas
+        indices = np.fromiter((filas.setdefault(c, len(filas)) for c in claves), dtype=np.int64, count=len(claves))
+        if len(filas) > self.valores.shape[1]:
+            capacidad = max(len(filas), 2 * self.valores.shape[1])
+            self.valores = np.pad(self.valores, ((0, 0), (0, capacidad - self.valores.shape[1])))
+        return indices
+
+    def consultar(self, claves):
+        """Contadores de cada clave (0 si no existe), una fila por columna."""
+        indices = self.indices(claves)
+        return np.where(indices >= 0, self.valores[:, indices.clip(0)], 0)
+
+    def sumar(self, claves, incrementos):
+        """Suma `incrementos` (columnas x claves) a claves sin repetir."""
+        indices = self.indices(claves, crear=True)
+        self.valores[:, indices] += incrementos
+
+    def arreglos(self):
+        return list(self.filas), self.valores[:, :len(self.filas)]
+
+
+class HistorialPacientes:
+    """Historial de citas por paciente_id acumulado desde el stream.
+
+    Guarda por paciente las citas y las inasistencias, y por (paciente,
+    especialidad) las citas, con índice hash en memoria. Las features de una
+    cita son siempre las del historial *anterior* a ella: así el entrenamiento
+    (que recorre el dataset en orden con `caracteristicas_y_agregar`) y la API
+    (que consulta el historial vigente con `caracteristicas`) calculan lo mismo.
+    """
+
+    def __init__(self):
+        self.pacientes = _TablaContadores(['citas', 'no_asiste'])
+        self.especialidades = _TablaContadores(['citas'])
+        self.citas = 0
+        # Posición del LectorIncremental en el CSV, para actualizar solo con las citas nuevas.
+        self.estado_lector = None
+
+    def __len__(self):
+        return len(self.pacientes)
+
+    def caracteristicas(self, paciente_ids, especialidades):
+        """Features de una próxima cita de cada paciente según el historial actual (sin modificarlo).
+
+        Devuelve un dict feature -> arreglo, para no pagar un DataFrame en cada solicitud.
+        """
+        paciente_ids = [int(i) for i in paciente_ids]
+        citas, no_asiste = self.pacientes.consultar(paciente_ids)
+        (por_especialidad,) = self.especialidades.consultar(list(zip(paciente_ids, map(str, especialidades))))
+        return _features(citas, no_asiste, por_especialidad)
+
+    def agregar(self, df):
+        """Incorpora citas con resultado conocido (columnas de COLUMNAS_HISTORIAL)."""
+        if df.empty:
+            return
+        import pandas as pd
+        ids = df['paciente_id'].to_numpy(dtype=np.int64)
+        target = df['target_no_asiste'].to_numpy(dtype=np.int64)
+        por_paciente = pd.DataFrame({'id': ids, 'no': target}).groupby('id', sort=False)['no'].agg(['size', 'sum'])
+        self.pacientes.sumar(por_paciente.index.tolist(), por_paciente.to_numpy().T)
+        claves = pd.Series(list(zip(ids.tolist(), df['especialidad'].astype(str))))
+        por_especialidad = claves.value_counts(sort=False)
+        self.especialidades.sumar(por_especialidad.index.tolist(), por_especialidad.to_numpy()[None, :])
+        self.citas += len(df)
+
+    def caracteristicas_y_agregar(self, df):
+        """Features de cada cita de `df` con el historial previo a ella (incluidas las
+        anteriores del mismo bloque, en el orden de las filas) e incorpora el bloque.
+
+        Es la forma de construir las features de entrenamiento sin filtrar el
+        resultado de la propia cita.
+        """
+        import pandas as pd
+        ids = df['paciente_id'].to_numpy(dtype=np.int64)
+        especialidades = df['especialidad'].astype(str).to_numpy()
+        target = df['target_no_asiste'].to_numpy(dtype=np.int64)
+        citas, no_asiste = self.pacientes.consultar(ids.tolist())
+        (por_especialidad,) = self.especialidades.consultar(list(zip(ids.tolist(), especialidades)))
+
+        bloque = pd.DataFrame({'id': ids, 'esp': especialidades, 'no': target})
+        por_paciente = bloque.groupby('id', sort=False)
+        citas = citas + por_paciente.cumcount().to_numpy()
+        no_asiste = no_asiste + por_paciente['no'].cumsum().to_numpy() - target
+        por_especialidad = por_especialidad + bloque.groupby(['id', 'esp'], sort=False).cumcount().to_numpy()
+
+        self.agregar(df)
+        return pd.DataFrame(_features(citas, no_asiste, por_especialidad), index=df.index)
+
+    def guardar(self, ruta):
+        """Escribe el historial en un .npz sin pickle, con reemplazo atómico."""
+        ids, pacientes = self.pacientes.arreglos()
+        claves, especialidades = self.especialidades.arreglos()
+        # Las especialidades se guardan como códigos enteros de un vocabulario en los metadatos.
+        vocabulario, codigos = np.unique(np.array([c[1] for c in claves], dtype=object).astype(str), return_inverse=True)
+        meta = {"formato": FORMATO_HISTORIAL, "citas": self.citas, "estado_lector": self.estado_lector,
+                "especialidades": vocabulario.tolist()}
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        tmp = ruta + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, meta=np.array(json.dumps(meta)),
+                paciente_id=np.array(ids, dtype=np.int64), pacientes=pacientes,
+                especialidad_paciente=np.array([c[0] for c in claves], dtype=np.int64),
+                especialidad=codigos.astype(np.int32), especialidades=especialidades,
+            )
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta, allow_pickle=False) as datos:
+            meta = json.loads(str(datos["meta"]))
+            if meta["formato"] != FORMATO_HISTORIAL:
+                raise ValueError(f"Formato de historial no soportado: {meta['formato']}")
+            historial = cls()
+            historial.citas = meta["citas"]
+            historial.estado_lector = meta["estado_lector"]
+            historial.pacientes.sumar(datos["paciente_id"].tolist(), datos["pacientes"])
+            vocabulario = meta["especialidades"]
+            claves = list(zip(datos["especialidad_paciente"].tolist(), [vocabulario[c] for c in datos["especialidad"].tolist()]))
+            historial.especialidades.sumar(claves, datos["especialidades"])
+        return historial
+
+
+def _features(citas, no_asiste, por_especialidad):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tasa = np.where(citas > 0, no_asiste / np.maximum(citas, 1), np.nan)
+    return {
+        'hist_citas': citas,
+        'hist_tasa_no_show': tasa,
+        'hist_citas_especialidad': por_especialidad,
+    }
+
+
+def usa_historial(columnas):
+    return any(c in HISTORIAL_FEATURES for c in columnas)
+
+
+def completar_dataframe(df, historial):
+    """`df` con las features de historial de cada cita según el historial vigente (NaN si no hay)."""
+    if historial is None:
+        return df.assign(**dict.fromkeys(HISTORIAL_FEATURES, np.nan))
+    features = historial.caracteristicas(df['paciente_id'].to_numpy(), df['especialidad'].to_numpy())
+    return df.assign(**features)
+
+
+def completar_registros(registros, historial):
+    """Agrega las features de historial a citas de la API (dicts con paciente_id opcional).
+
+    paciente_id no es una feature y se quita de los registros. Sin historial
+    cargado o sin paciente_id las features quedan vacías (None) y el pipeline
+    las imputa; un paciente sin citas previas tiene 0 citas.
+    """
+    con_id = [i for i, r in enumerate(registros) if r.get('paciente_id') is not None]
+    completos = [
+        dict({k: v for k, v in r.items() if k != 'paciente_id'}, **dict.fromkeys(HISTORIAL_FEATURES))
+        for r in registros
+    ]
+    if historial is None or not con_id:
+        return completos
+    features = historial.caracteristicas(
+        [registros[i]['paciente_id'] for i in con_id], [registros[i]['especialidad'] for i in con_id]
+    )
+    columnas = {k: v.tolist() for k, v in features.items()}
+    for j, i in enumerate(con_id):
+        completos[i].update({k: (None if v[j] != v[j] else v[j]) for k, v in columnas.items()})
+    return completos
+
+
+class HistorialVigente:
+    """Historial publicado en disco, recargado cuando el archivo cambia.
+
+    Con `iniciar_vigilancia` un hilo revisa el archivo cada `intervalo` segundos
+    y lo carga fuera de quien consulta; `actual` solo devuelve la referencia, que
+    se reemplaza de forma atómica y nunca se modifica después de cargada. Sin
+    vigilancia, `actual` revisa el archivo a lo más cada `intervalo` segundos y
+    lo carga en el momento (uso en scripts sin event loop).
+    """
+
+    def __init__(self, ruta=HISTORIAL_PATH, intervalo=INTERVALO_SEGUNDOS):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.historial = None
+        self._mtime = None
+        self._revisado = 0.0
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._vigilante = None
+
+    def actual(self):
+        if self._vigilante is None:
+            ahora = time.monotonic()
+            if ahora - self._revisado >= self.intervalo:
+                self._revisado = ahora
+                self.recargar()
+        return self.historial
+
+    def recargar(self):
+        """Carga el archivo si cambió desde la última carga y devuelve el historial vigente."""
+        with self._lock:
+            try:
+                mtime = os.stat(self.ruta).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._mtime:
+                try:
+                    self.historial = HistorialPacientes.cargar(self.ruta) if mtime is not None else None
+                    self._mtime = mtime
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ No se pudo cargar el historial de pacientes: {e}")
+        return self.historial
+
+    def iniciar_vigilancia(self):
+        if self._vigilante is not None:
+            return
+        self._detener.clear()
+
+        def vigilar():
+            self.recargar()
+            while not self._detener.wait(self.intervalo):
+                self.recargar()
+
+        self._vigilante = threading.Thread(target=vigilar, name="vigilancia-historial", daemon=True)
+        self._vigilante.start()
+
+    def detener_vigilancia(self):
+        if self._vigilante is not None:
+            self._detener.set()
+            self._vigilante.join(timeout=5)
+            self._vigilante = None
@@ -0,0 +1,304 @@
+import glob
+import os
+import sys
+import time
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Sin pyarrow todo se lee y escribe solo en CSV.
+    pa = pq = None
+
+CSV_PATH = "data/raw/dataset_cesfam_stream.csv"
+PARQUET_DIR = "data/processed/citas"
+
+# Cada lote agregado queda en su propio archivo; al acumularse muchos archivos
+# pequeños se fusionan en uno solo para que la lectura no pague el costo por archivo.
+MAX_PARTES_SIN_COMPACTAR = 64
+# Los compactos se agrupan por nivel según sus filas (nivel = log en base
+# FACTOR_COMPACTACION); al juntarse FACTOR_COMPACTACION compactos seguidos del mismo
+# nivel se fusionan en uno del nivel siguiente. Así la cantidad de archivos crece
+# como el logaritmo del total de filas y cada fila se reescribe pocas veces.
+FACTOR_COMPACTACION = 8
+# Filas por row group al fusionar; acota la memoria de una compactación.
+FILAS_POR_GRUPO = 250_000
+
+TIPOS_CITAS = {
+    'paciente_id': 'int64',
+    'edad': 'int16',
+    'sexo': 'category',
+    'sector': 'category',
+    'prevision': 'category',
+    'especialidad': 'category',
+    'dia_semana': 'category',
+    'turno': 'category',
+    'tiempo_espera_dias': 'int32',
+    'inasistencias_previas': 'int16',
+    'target_no_asiste': 'int8',
+}
+COLUMNAS_CITAS = list(TIPOS_CITAS)
+
+
+def parquet_disponible():
+    return pq is not None
+
+
+def normalizar_tipos(df):
+    """Aplica los tipos compactos del esquema; las columnas enteras con nulos quedan como float."""
+    tipos = {}
+    for columna in df.columns:
+        tipo = TIPOS_CITAS.get(columna)
+        if tipo is None or str(df[columna].dtype) == tipo:
+            continue
+        if tipo.startswith('int') and df[columna].isna().any():
+            tipo = 'float64'
+        tipos[columna] = tipo
+    return df.astype(tipos) if tipos else df
+
+
+def _rango_archivo(ruta):
+    """(primer_id, último_id) codificados en el nombre de una parte o de un compacto."""
+    partes = os.path.basename(ruta)[:-len(".parquet")].split("-")
+    return int(partes[1]), int(partes[-1])
+
+
+def _archivos_parquet(ruta=PARQUET_DIR):
+    """Archivos vigentes del dataset, en orden de paciente_id.
+
+    Una compactación escribe primero el archivo fusionado y después borra los de
+    origen; las partes y compactos ya cubiertos por otro compacto se ignoran para
+    no duplicar filas.
+    """
+    # A igual inicio, el compacto más amplio va primero y tapa a los que contiene.
+    compactos, rangos = [], []
+    for compacto in sorted(glob.glob(os.path.join(ruta, "compacto-*.parquet")),
+                           key=lambda c: (_rango_archivo(c)[0], -_rango_archivo(c)[1])):
+        inicio, fin = _rango_archivo(compacto)
+        if not any(i <= inicio <= f for i, f in rangos):
+            compactos.append(compacto)
+            rangos.append((inicio, fin))
+    partes = [
+        p for p in glob.glob(os.path.join(ruta, "parte-*.parquet"))
+        if not any(inicio <= _rango_archivo(p)[0] <= fin for inicio, fin in rangos)
+    ]
+    return sorted(compactos + partes, key=lambda r: _rango_archivo(r)[0])
+
+
+def _escribir_parquet_atomico(tabla, destino):
+    tmp = destino + ".tmp"
+    pq.write_table(tabla, tmp, compression="zstd")
+    os.replace(tmp, destino)
+
+
+def escribir_parte(df, ruta=PARQUET_DIR):
+    os.makedirs(ruta, exist_ok=True)
+    inicio, fin = int(df['paciente_id'].iloc[0]), int(df['paciente_id'].iloc[-1])
+    tabla = pa.Table.from_pandas(normalizar_tipos(df), preserve_index=False)
+    _escribir_parquet_atomico(tabla, os.path.join(ruta, f"parte-{inicio:012d}-{fin:012d}.parquet"))
+
+
+def _fusionar(archivos, ruta):
+    """Escribe `archivos` (consecutivos) en un compacto y los borra.
+
+    Se copian por row groups de a lo más FILAS_POR_GRUPO filas con ParquetWriter,
+    así la memoria usada no depende del tamaño de la fusión.
+    """
+    inicio, fin = _rango_archivo(archivos[0])[0], _rango_archivo(archivos[-1])[1]
+    destino = os.path.join(ruta, f"compacto-{inicio:012d}-{fin:012d}.parquet")
+    tmp = destino + ".tmp"
+    escritor, pendientes, filas = None, [], 0
+    try:
+        for archivo in archivos:
+            for lote in pq.ParquetFile(archivo).iter_batches(batch_size=FILAS_POR_GRUPO):
+                if escritor is None:
+                    escritor = pq.ParquetWriter(tmp, lote.schema, compression="zstd")
+                elif not lote.schema.equals(escritor.schema):
+                    lote = lote.cast(escritor.schema)
+                if pendientes and filas + lote.num_rows > FILAS_POR_GRUPO:
+                    escritor.write_table(pa.Table.from_batches(pendientes, escritor.schema))
+                    pendientes, filas = [], 0
+                pendientes.append(lote)
+                filas += lote.num_rows
+        if pendientes:
+            escritor.write_table(pa.Table.from_batches(pendientes, escritor.schema))
+    finally:
+        if escritor is not None:
+            escritor.close()
+    os.replace(tmp, destino)
+    for archivo in archivos:
+        os.remove(archivo)
+
+
+def _nivel(archivo, factor):
+    filas = pq.ParquetFile(archivo).metadata.num_rows
+    nivel = 0
+    while filas >= factor:
+        filas //= factor
+        nivel += 1
+    return nivel
+
+
+def _compactos_a_fusionar(ruta, factor):
+    """Primera racha de `factor` compactos seguidos del mismo nivel, o None."""
+    racha, nivel_racha = [], None
+    for archivo in _archivos_parquet(ruta):
+        if not os.path.basename(archivo).startswith("compacto-"):
+            racha, nivel_racha = [], None
+            continue
+        nivel = _nivel(archivo, factor)
+        if nivel != nivel_racha:
+            racha, nivel_racha = [], nivel
+        racha.append(archivo)
+        if len(racha) == factor:
+            return racha
+    return None
+
+
+def compactar(ruta=PARQUET_DIR, max_partes=MAX_PARTES_SIN_COMPACTAR, factor=FACTOR_COMPACTACION):
+    """Fusiona las partes sueltas en un compacto si superan `max_partes` y luego
+    los compactos por niveles. Devuelve cuántos archivos fusionó."""
+    if not parquet_disponible():
+        return 0
+    fusionados = 0
+    partes = [a for a in _archivos_parquet(ruta) if os.path.basename(a).startswith("parte-")]
+    if len(partes) > max_partes:
+        _fusionar(partes, ruta)
+        fusionados += len(partes)
+    # Cada fusión sube de nivel (factor compactos de nivel n suman al menos factor**(n+1) filas).
+    racha = _compactos_a_fusionar(ruta, factor)
+    while racha is not None:
+        _fusionar(racha, ruta)
+        fusionados += len(racha)
+        racha = _compactos_a_fusionar(ruta, factor)
+    return fusionados
+
+
+def vaciar_parquet(ruta=PARQUET_DIR):
+    """Borra los archivos Parquet (partes, compactos y temporales) del directorio."""
+    for archivo in glob.glob(os.path.join(ruta, "*.parquet")) + glob.glob(os.path.join(ruta, "*.parquet.tmp")):
+        os.remove(archivo)
+
+
+def reiniciar_citas(df, csv_path=CSV_PATH, ruta=PARQUET_DIR):
+    """Reemplaza el dataset completo (siembra inicial) en CSV y Parquet."""
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    df.to_csv(csv_path, index=False)
+    if parquet_disponible():
+        vaciar_parquet(ruta)
+        if not df.empty:
+            escribir_parte(df, ruta)
+
+
+def agregar_citas(df, csv_path=CSV_PATH, ruta=PARQUET_DIR, archivo_csv=None):
+    """Agrega un lote de citas nuevas.
+
+    El CSV sigue siendo el registro de solo-anexado que leen las herramientas
+    externas; el lote se escribe además como una parte Parquet con tipos compactos.
+    Quien escribe muchos lotes puede pasar `archivo_csv` ya abierto en modo
+    anexar para no reabrir el archivo en cada lote.
+    """
+    if df.empty:
+        return
+    if archivo_csv is not None:
+        df.to_csv(archivo_csv, header=archivo_csv.tell() == 0, index=False)
+        archivo_csv.flush()
+    else:
+        df.to_csv(csv_path, mode='a', header=not os.path.exists(csv_path), index=False)
+    if parquet_disponible():
+        escribir_parte(df, ruta)
+        compactar(ruta)
+
+
+def _leer_parquet(columnas, ruta, intentos=3):
+    for intento in range(intentos):
+        archivos = _archivos_parquet(ruta)
+        try:
+            tablas = [pq.read_table(a, columns=columnas) for a in archivos]
+            break
+        except FileNotFoundError:
+            # Una compactación borró partes entre el listado y la lectura.
+            if intento == intentos - 1:
+                raise
+            time.sleep(0.05)
+    tabla = pa.concat_tables(tablas).unify_dictionaries()
+    return normalizar_tipos(tabla.to_pandas())
+
+
+def hay_parquet(ruta=PARQUET_DIR):
+    return parquet_disponible() and bool(_archivos_parquet(ruta))
+
+
+def leer_citas(columnas=None, csv_path=CSV_PATH, ruta=PARQUET_DIR):
+    """Punto único de lectura del dataset de citas.
+
+    Lee del dataset Parquet si existe (solo las columnas pedidas) y si no, del
+    CSV. En ambos casos devuelve los mismos tipos (categorías y enteros pequeños).
+    Devuelve None si no hay datos.
+    """
+    if columnas is not None:
+        columnas = list(columnas)
+    if hay_parquet(ruta):
+        return _leer_parquet(columnas, ruta)
+    if not os.path.exists(csv_path):
+        return None
+    tipos = {c: t for c, t in TIPOS_CITAS.items() if columnas is None or c in columnas}
+    try:
+        df = pd.read_csv(csv_path, usecols=columnas, dtype={c: t for c, t in tipos.items() if t == 'category'})
+    except pd.errors.EmptyDataError:
+        return None
+    return normalizar_tipos(df)
+
+
+def leer_citas_por_bloques(columnas=None, filas_por_bloque=200_000, desde_id=None, csv_path=CSV_PATH, ruta=PARQUET_DIR):
+    """Recorre el dataset de citas en bloques de a lo más `filas_por_bloque` filas.
+
+    La memoria usada no depende del tamaño del dataset. Con `desde_id` solo se
+    entregan las citas con paciente_id > desde_id; en Parquet los archivos ya
+    cubiertos se saltan por el rango de su nombre, sin abrirlos.
+    """
+    if columnas is not None:
+        columnas = list(columnas)
+        if desde_id is not None and 'paciente_id' not in columnas:
+            columnas = ['paciente_id'] + columnas
+    if hay_parquet(ruta):
+        for archivo in _archivos_parquet(ruta):
+            if desde_id is not None and _rango_archivo(archivo)[1] <= desde_id:
+                continue
+            for lote in pq.ParquetFile(archivo).iter_batches(batch_size=filas_por_bloque, columns=columnas):
+                bloque = normalizar_tipos(lote.to_pandas())
+                if desde_id is not None:
+                    bloque = bloque[bloque['paciente_id'] > desde_id]
+                if not bloque.empty:
+                    yield bloque
+        return
+    if not os.path.exists(csv_path):
+        return
+    categoricas = {c: t for c, t in TIPOS_CITAS.items() if t == 'category' and (columnas is None or c in columnas)}
+    try:
+        for bloque in pd.read_csv(csv_path, usecols=columnas, dtype=categoricas, chunksize=filas_por_bloque):
+            if desde_id is not None:
+                bloque = bloque[bloque['paciente_id'] > desde_id]
+            if not bloque.empty:
+                yield normalizar_tipos(bloque)
+    except pd.errors.EmptyDataError:
+        return
+
+
+def migrar_csv_a_parquet(csv_path=CSV_PATH, ruta=PARQUET_DIR, filas_por_parte=1_000_000):
+    """Reconstruye el dataset Parquet a partir del CSV (p. ej. para un CSV ya existente)."""
+    if not parquet_disponible():
+        raise RuntimeError("pyarrow no está instalado; instálelo para usar el almacenamiento Parquet.")
+    vaciar_parquet(ruta)
+    filas = 0
+    for bloque in pd.read_csv(csv_path, chunksize=filas_por_parte):
+        escribir_parte(bloque, ruta)
+        filas += len(bloque)
+    return filas
+
+
+if __name__ == "__main__":
+    origen = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    inicio = time.perf_counter()
+    total = migrar_csv_a_parquet(origen)
+    print(f"✅ {total:,} citas migradas a {PARQUET_DIR} en {time.perf_counter() - inicio:.1f} s.")
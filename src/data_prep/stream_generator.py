@@ -1,83 +1,52 @@
-import pandas as pd
-import numpy as np
 import os
-import random
 import time
+import sys
+import signal
+import argparse
+import numpy as np
+import pandas as pd
 
-GUARDAR_PATH = "data/raw/dataset_cesfam_stream.csv"
+sys.path.append(os.getcwd())
+
+try:
+    from src.data_prep.storage import CSV_PATH, PARQUET_DIR, reiniciar_citas, agregar_citas
+    from src.data_prep.data_generator import generar_registros_cesfam
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.data_prep.storage import CSV_PATH, PARQUET_DIR, reiniciar_citas, agregar_citas
+    from src.data_prep.data_generator import generar_registros_cesfam
+
+GUARDAR_PATH = CSV_PATH
 SEMBRAR_INICIAL = 10000 
 SEMBRAR_INCREMENTO = 50 
 INTERVALO_SEGUNDOS = 3
+# Rango de --tasa (citas por segundo) que el simulador sostiene.
+TASA_MIN = 1
+TASA_MAX = 100_000
 
-np.random.seed(42)
-random.seed(42)
-
-def generar_registros_cesfam(n_registros, start_id):
-    if n_registros <= 0:
-        return pd.DataFrame()
-
-    ids = range(start_id, start_id + n_registros)
-
-    edades = np.concatenate([
-        np.random.randint(0, 15, int(n_registros * 0.15)),
-        np.random.randint(15, 65, int(n_registros * 0.60)),
-        np.random.randint(65, 95, int(n_registros * 0.25))
-    ])
-    edades = np.resize(edades, n_registros) 
-    np.random.shuffle(edades) 
-
-    sexos = np.random.choice(['Femenino', 'Masculino'], n_registros, p=[0.55, 0.45])
-    sectores = np.random.choice(['Norte', 'Sur', 'Centro', 'Rural'], n_registros, p=[0.3, 0.3, 0.3, 0.1])
-    prevision = np.random.choice(['Fonasa A', 'Fonasa B', 'Fonasa C', 'Fonasa D'], n_registros)
-    especialidades = np.random.choice(
-        ['Medicina General', 'Dental', 'Matrona', 'Salud Mental', 'Kinesiologia', 'Nutricionista'], 
-        n_registros, 
-        p=[0.40, 0.20, 0.15, 0.10, 0.10, 0.05]
-    )
-
-    dias_semana = np.random.choice(['Lunes', 'Martes', 'Miercoles', 'Jueves', 'Viernes'], n_registros)
-    turnos = np.random.choice(['Mañana', 'Tarde'], n_registros)
-    tiempo_espera_dias = np.random.exponential(scale=10, size=n_registros).astype(int)
-    inasistencias_previas = np.random.poisson(lam=0.5, size=n_registros)
-
-    scores = np.random.uniform(0, 1, n_registros)
-    
-    mask_espera_larga = tiempo_espera_dias > 20
-    scores[mask_espera_larga] -= 0.15
-    mask_viernes_tarde = (dias_semana == 'Viernes') & (turnos == 'Tarde')
-    scores[mask_viernes_tarde] -= 0.10
-    mask_jovenes = (edades >= 20) & (edades <= 35)
-    scores[mask_jovenes] -= 0.05
-    scores -= (inasistencias_previas * 0.05)
-    mask_mayores = edades > 65
-    scores[mask_mayores] += 0.10
-    mask_complejos = np.isin(especialidades, ['Salud Mental', 'Dental'])
-    scores[mask_complejos] -= 0.05
-
-    target = np.where(scores < 0.20, 1, 0)
-
-    df_lote = pd.DataFrame({
-        'paciente_id': ids,
-        'edad': edades,
-        'sexo': sexos,
-        'sector': sectores,
-        'prevision': prevision,
-        'especialidad': especialidades,
-        'dia_semana': dias_semana,
-        'turno': turnos,
-        'tiempo_espera_dias': tiempo_espera_dias,
-        'inasistencias_previas': inasistencias_previas,
-        'target_no_asiste': target
-    })
-
-    return df_lote
+# Pesos por hora del día (0-23) y por día hábil (lunes a viernes) de los perfiles de
+# llegada. Se normalizan a promedio 1, así la tasa pedida es la tasa media del perfil.
+PESOS_HORA_MANANA = np.array([
+    0.05, 0.05, 0.05, 0.05, 0.05, 0.1, 0.4, 1.2,
+    2.6, 3.0, 2.8, 2.2, 1.4, 1.0, 1.2, 1.4,
+    1.3, 1.0, 0.6, 0.3, 0.15, 0.1, 0.05, 0.05
+])
+PESOS_HORA_MANANA = PESOS_HORA_MANANA / PESOS_HORA_MANANA.mean()
+PESOS_DIA_LUNES = np.array([1.8, 1.0, 0.9, 0.9, 0.7])
+PESOS_DIA_LUNES = PESOS_DIA_LUNES / PESOS_DIA_LUNES.mean()
+
+PERFILES = {
+    'constante': lambda hora, dia: 1.0,
+    'manana': lambda hora, dia: PESOS_HORA_MANANA[int(hora)],
+    'lunes': lambda hora, dia: PESOS_DIA_LUNES[dia] * PESOS_HORA_MANANA[int(hora)],
+}
 
 def simular_streaming_cesfam(guardar_path=GUARDAR_PATH, inicial=SEMBRAR_INICIAL, incremento=SEMBRAR_INCREMENTO, intervalo_segundos=INTERVALO_SEGUNDOS):
     os.makedirs(os.path.dirname(guardar_path), exist_ok=True)
     
     print(f"⌛ Generando siembra inicial de {inicial} registros...")
     df_inicial = generar_registros_cesfam(inicial, start_id=1)
-    df_inicial.to_csv(guardar_path, index=False)
+    reiniciar_citas(df_inicial, guardar_path)
     
     print(f"✅ Siembra inicial guardada.")
     
@@ -88,7 +57,7 @@ def simular_streaming_cesfam(guardar_path=GUARDAR_PATH, inicial=SEMBRAR_INICIAL,
             df_nuevo_lote = generar_registros_cesfam(incremento, start_id=siguiente_id)
             
             if not df_nuevo_lote.empty:
-                df_nuevo_lote.to_csv(guardar_path, mode='a', header=False, index=False)
+                agregar_citas(df_nuevo_lote, guardar_path)
                 siguiente_id += incremento
             
             time.sleep(intervalo_segundos)
@@ -96,5 +65,165 @@ def simular_streaming_cesfam(guardar_path=GUARDAR_PATH, inicial=SEMBRAR_INICIAL,
     except KeyboardInterrupt:
         pass
 
+class EscritorCitas:
+    """Acumula citas y las escribe en bloque cuando se juntan `max_filas` o pasan `max_segundos`.
+
+    El CSV se mantiene abierto entre escrituras. Si el buffer llega a `max_filas`
+    la escritura se hace en el momento y el generador espera a que termine
+    (contrapresión): la memoria no crece aunque el disco no dé abasto.
+    """
+
+    def __init__(self, guardar_path, max_filas=10000, max_segundos=1.0, ruta_parquet=PARQUET_DIR):
+        self.guardar_path = guardar_path
+        self.ruta_parquet = ruta_parquet
+        self.max_filas = max_filas
+        self.max_segundos = max_segundos
+        self._archivo = open(guardar_path, "a", newline="")
+        self._lotes = []
+        self._filas = 0
+        self._llegada_mas_antigua = None
+        self._ultima_escritura = time.perf_counter()
+        self.filas_escritas = 0
+        self.escrituras = 0
+        self.escrituras_por_tamano = 0
+        self.retrasos = []
+
+    def agregar(self, df, llegada):
+        if df.empty:
+            return
+        if self._llegada_mas_antigua is None:
+            self._llegada_mas_antigua = llegada
+        self._lotes.append(df)
+        self._filas += len(df)
+        if self._filas >= self.max_filas:
+            self.escrituras_por_tamano += 1
+            self.escribir()
+        else:
+            self.escribir_si_vencido()
+
+    def escribir_si_vencido(self):
+        """Escribe lo pendiente si pasaron `max_segundos` desde la última escritura."""
+        if time.perf_counter() - self._ultima_escritura >= self.max_segundos:
+            self.escribir()
+
+    def escribir(self):
+        self._ultima_escritura = time.perf_counter()
+        if not self._lotes:
+            return
+        lote = pd.concat(self._lotes, ignore_index=True) if len(self._lotes) > 1 else self._lotes[0]
+        agregar_citas(lote, self.guardar_path, self.ruta_parquet, archivo_csv=self._archivo)
+        # Retraso: desde que llegó la cita más antigua del bloque hasta que quedó en disco.
+        self.retrasos.append(time.perf_counter() - self._llegada_mas_antigua)
+        self.filas_escritas += len(lote)
+        self.escrituras += 1
+        self._lotes, self._filas, self._llegada_mas_antigua = [], 0, None
+
+    def cerrar(self):
+        self.escribir()
+        self._archivo.close()
+
+
+def simular_a_tasa(tasa, perfil='constante', duracion_segundos=None, dia_segundos=60.0,
+                   max_filas_buffer=10000, max_segundos_buffer=1.0, guardar_path=GUARDAR_PATH,
+                   inicial=SEMBRAR_INICIAL, tick_segundos=0.05, reporte_segundos=5.0, semilla=42,
+                   ruta_parquet=PARQUET_DIR):
+    """Genera citas a `tasa` eventos/s en promedio, modulada por un perfil de llegada.
+
+    Las llegadas son un proceso de Poisson: en cada tick se generan Poisson(tasa *
+    perfil * dt) citas, con dt el tiempo real transcurrido, de modo que si un tick
+    se atrasa el siguiente genera lo que faltó. El día simulado dura `dia_segundos`
+    para poder recorrer el pico de la mañana o la semana en pocos minutos.
+    Devuelve un resumen con la tasa lograda y el retraso de escritura.
+    """
+    rng = np.random.default_rng(semilla)
+    ponderar = PERFILES[perfil]
+    os.makedirs(os.path.dirname(guardar_path), exist_ok=True)
+    reiniciar_citas(generar_registros_cesfam(inicial, start_id=1, rng=rng), guardar_path, ruta_parquet)
+    siguiente_id = inicial + 1
+
+    escritor = EscritorCitas(guardar_path, max_filas_buffer, max_segundos_buffer, ruta_parquet)
+    detener = []
+    # El dashboard detiene el generador con SIGTERM: se termina el bucle y se escribe lo pendiente.
+    senal_previa = signal.signal(signal.SIGTERM, lambda *_: detener.append(True))
+
+    inicio = anterior = time.perf_counter()
+    proximo_reporte = inicio + reporte_segundos
+    filas_desde_reporte, atraso_max_tick = 0, 0.0
+    # Citas que el perfil pide en el tiempo transcurrido; con perfiles no constantes
+    # la tasa lograda se compara con esta y no con la tasa media.
+    esperadas = 0.0
+    print(f"--- 🚀 Streaming a {tasa:,.0f} citas/s (perfil {perfil}, día simulado de {dia_segundos:g} s) ---")
+    try:
+        tick = 1
+        while not detener and (duracion_segundos is None or anterior - inicio < duracion_segundos):
+            objetivo = inicio + tick * tick_segundos
+            espera = objetivo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            ahora = time.perf_counter()
+            atraso_max_tick = max(atraso_max_tick, ahora - objetivo)
+            tick = max(tick + 1, int((ahora - inicio) / tick_segundos) + 1)
+
+            horas_simuladas = (ahora - inicio) / dia_segundos * 24
+            hora, dia = horas_simuladas % 24, int(horas_simuladas // 24) % len(PESOS_DIA_LUNES)
+            media = tasa * ponderar(hora, dia) * (ahora - anterior)
+            esperadas += media
+            n = rng.poisson(media)
+            anterior = ahora
+            if n:
+                escritor.agregar(generar_registros_cesfam(n, start_id=siguiente_id, rng=rng), llegada=ahora)
+                siguiente_id += n
+                filas_desde_reporte += n
+            else:
+                escritor.escribir_si_vencido()
+
+            if ahora >= proximo_reporte:
+                retrasos = escritor.retrasos[-100:] or [0.0]
+                print(f"[{time.strftime('%H:%M:%S')}] hora simulada {hora:04.1f} | "
+                      f"{filas_desde_reporte / (ahora - proximo_reporte + reporte_segundos):,.0f} citas/s | "
+                      f"retraso escritura máx {max(retrasos) * 1000:.0f} ms | atraso tick máx {atraso_max_tick * 1000:.0f} ms")
+                proximo_reporte, filas_desde_reporte, atraso_max_tick = ahora + reporte_segundos, 0, 0.0
+    except KeyboardInterrupt:
+        pass
+    finally:
+        escritor.cerrar()
+        signal.signal(signal.SIGTERM, senal_previa)
+
+    segundos = time.perf_counter() - inicio
+    retrasos = np.array(escritor.retrasos or [0.0])
+    resumen = {
+        "tasa_objetivo": tasa,
+        "tasa_perfil": esperadas / segundos,
+        "tasa_lograda": escritor.filas_escritas / segundos,
+        "filas": escritor.filas_escritas,
+        "segundos": segundos,
+        "escrituras": escritor.escrituras,
+        "escrituras_por_tamano": escritor.escrituras_por_tamano,
+        "retraso_p50_ms": float(np.percentile(retrasos, 50) * 1000),
+        "retraso_max_ms": float(retrasos.max() * 1000),
+    }
+    print(f"\n--- 🛑 Streaming detenido: {resumen['filas']:,} citas en {segundos:.1f} s | "
+          f"tasa lograda {resumen['tasa_lograda']:,.0f}/s (perfil {resumen['tasa_perfil']:,.0f}/s, media {tasa:,.0f}/s) | "
+          f"retraso p50 {resumen['retraso_p50_ms']:.0f} ms, máx {resumen['retraso_max_ms']:.0f} ms | "
+          f"{resumen['escrituras_por_tamano']} escrituras forzadas por buffer lleno ---")
+    return resumen
+
+
 if __name__ == "__main__":
-    simular_streaming_cesfam()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Simulador de citas en streaming.")
+    parser.add_argument("--tasa", type=float, default=None,
+                        help=f"Citas por segundo ({TASA_MIN} a {TASA_MAX}). Sin este argumento se agregan 50 citas cada 3 s")
+    parser.add_argument("--perfil", choices=list(PERFILES), default='constante')
+    parser.add_argument("--duracion", type=float, default=None, help="Segundos de simulación (por defecto, hasta Ctrl+C)")
+    parser.add_argument("--dia-segundos", type=float, default=60.0, help="Duración en segundos de un día simulado")
+    parser.add_argument("--buffer-filas", type=int, default=10000, help="Escribir al juntar esta cantidad de citas")
+    parser.add_argument("--buffer-segundos", type=float, default=1.0, help="Escribir al menos cada estos segundos")
+    args = parser.parse_args()
+    # La comparación también rechaza nan.
+    if args.tasa is not None and not TASA_MIN <= args.tasa <= TASA_MAX:
+        parser.error(f"--tasa debe estar entre {TASA_MIN} y {TASA_MAX} citas por segundo (recibido {args.tasa}).")
+
+    if args.tasa is None:
+        simular_streaming_cesfam()
+    else:
+        simular_a_tasa(args.tasa, args.perfil, args.duracion, args.dia_segundos, args.buffer_filas, args.buffer_segundos)
\ No newline at end of file
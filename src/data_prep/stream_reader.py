@@ -0,0 +1,105 @@
+import io
+import os
+import pandas as pd
+
+from src.data_prep.storage import CSV_PATH, normalizar_tipos
+
+BYTES_POR_LECTURA = 32 * 1024 * 1024
+BYTES_FIRMA = 4096
+
+
+class LectorIncremental:
+    """Lee solo las filas nuevas de un CSV de solo-anexado.
+
+    Recuerda el offset en bytes de la última línea completa leída; cada llamada
+    parsea únicamente lo agregado desde entonces. Una línea a medio escribir se
+    deja para la próxima lectura. Si el archivo se reemplaza o trunca (p. ej. al
+    volver a generar la siembra inicial) la lectura recomienza desde el inicio.
+    """
+
+    def __init__(self, path=CSV_PATH, columnas=None):
+        self.path = path
+        self.columnas = list(columnas) if columnas is not None else None
+        self.offset = 0
+        self.filas_leidas = 0
+        self.reinicios = 0
+        self._encabezado = None
+        self._firma = b""
+        self._inodo = None
+
+    def _reiniciar(self):
+        self.offset = 0
+        self.filas_leidas = 0
+        self._encabezado = None
+        self._firma = b""
+        self.reinicios += 1
+
+    def estado(self):
+        """Posición de lectura serializable en JSON, para retomar tras reiniciar el proceso."""
+        return {
+            "offset": self.offset,
+            "filas_leidas": self.filas_leidas,
+            "reinicios": self.reinicios,
+            "encabezado": self._encabezado.hex() if self._encabezado is not None else None,
+            "firma": self._firma.hex(),
+            "inodo": self._inodo,
+        }
+
+    def restaurar(self, estado):
+        """Retoma desde un `estado()` guardado; si el archivo cambió, la próxima lectura lo detecta y reinicia."""
+        self.offset = estado["offset"]
+        self.filas_leidas = estado["filas_leidas"]
+        self.reinicios = estado["reinicios"]
+        self._encabezado = bytes.fromhex(estado["encabezado"]) if estado["encabezado"] is not None else None
+        self._firma = bytes.fromhex(estado["firma"])
+        self._inodo = estado["inodo"]
+
+    def _archivo_reemplazado(self, f, stat):
+        if stat.st_ino != self._inodo or stat.st_size < self.offset:
+            return True
+        # Mismo inode pero reescrito desde cero: el comienzo del archivo ya no coincide.
+        f.seek(0)
+        if f.read(len(self._firma)) != self._firma:
+            return True
+        f.seek(self.offset - 1)
+        return f.read(1) != b"\n"
+
+    def leer_nuevas(self, max_bytes=BYTES_POR_LECTURA):
+        """Devuelve (filas_nuevas, reiniciado). filas_nuevas es None si el archivo no existe.
+
+        `reiniciado` indica que el archivo cambió por completo y quien acumula
+        resultados debe descartarlos antes de procesar estas filas.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return None, False
+        with f:
+            stat = os.fstat(f.fileno())
+            reiniciado = False
+            if self.offset and self._archivo_reemplazado(f, stat):
+                self._reiniciar()
+                reiniciado = True
+            self._inodo = stat.st_ino
+
+            if self._encabezado is None:
+                f.seek(0)
+                encabezado = f.readline()
+                if not encabezado.endswith(b"\n"):
+                    return pd.DataFrame(), reiniciado
+                self._encabezado = encabezado
+                self.offset = len(encabezado)
+
+            f.seek(self.offset)
+            datos = f.read(max_bytes)
+            fin = datos.rfind(b"\n") + 1
+            if fin == 0:
+                return pd.DataFrame(), reiniciado
+            if not self._firma:
+                f.seek(0)
+                self._firma = f.read(min(BYTES_FIRMA, self.offset + fin))
+            self.offset += fin
+
+        nuevas = pd.read_csv(io.BytesIO(self._encabezado + datos[:fin]), usecols=self.columnas)
+        self.filas_leidas += len(nuevas)
+        return normalizar_tipos(nuevas), reiniciado
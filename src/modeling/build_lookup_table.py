@@ -0,0 +1,181 @@
+import itertools
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import joblib
+
+sys.path.append(os.getcwd())
+
+try:
+    from src.api.lookup_table import TablaRiesgo, ESCALA_CUANTIZACION
+    from src.api.model_manager import hash_archivo
+    from src.api.compiled_model import compilar_modelo
+    from src.data_prep.storage import leer_citas
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.api.lookup_table import TablaRiesgo, ESCALA_CUANTIZACION
+    from src.api.model_manager import hash_archivo
+    from src.api.compiled_model import compilar_modelo
+    from src.data_prep.storage import leer_citas
+
+MODEL_PATH = "models/model_pipeline.pkl"
+TABLA_PATH = "models/tabla_riesgo"
+REPORTE_PATH = "models/tabla_riesgo_reporte.json"
+
+# Rango entero [inicio, fin) cubierto por la tabla para cada variable numérica;
+# los valores fuera de rango se evalúan con el modelo en vivo.
+RANGOS_NUMERICOS = {
+    'edad': (0, 121),
+    'tiempo_espera_dias': (0, 91),
+    'inasistencias_previas': (0, 21),
+}
+
+# Bordes uniformes para modelos cuyos umbrales no se pueden leer (no son GradientBoosting).
+PASO_UNIFORME = {'edad': 5, 'tiempo_espera_dias': 2, 'inasistencias_previas': 1}
+
+
+def bordes_desde_modelo(pipeline, rangos=RANGOS_NUMERICOS):
+    """Bordes en los que cambia alguna decisión de los árboles para entradas enteras.
+
+    Dentro de cada rango resultante todos los árboles toman el mismo camino, así
+    que evaluar cualquier entero del rango da exactamente la probabilidad del
+    modelo (salvo la cuantización a uint16).
+    """
+    compilado = compilar_modelo(pipeline)
+    es_hoja = compilado.izquierda == np.arange(len(compilado.izquierda))
+    bordes = {}
+    for j, feature in enumerate(compilado.numeric_features):
+        inicio, fin = rangos[feature]
+        valores = np.arange(inicio, fin)
+        # Igual que en la inferencia: valor escalado y comparado en float32.
+        escalados = ((valores - compilado.media[j]) / compilado.escala[j]).astype(np.float32).astype(np.float64)
+        umbrales = compilado.threshold[(~es_hoja) & (compilado.feature == compilado.columnas_num[j])]
+        cortes = valores[np.searchsorted(escalados, umbrales, side='right').clip(0, len(valores) - 1)]
+        bordes[feature] = sorted(set(cortes.tolist()) | {inicio, fin})
+    return bordes
+
+
+def bordes_uniformes(rangos=RANGOS_NUMERICOS, pasos=PASO_UNIFORME):
+    return {f: sorted(set(range(inicio, fin, pasos[f])) | {fin}) for f, (inicio, fin) in rangos.items()}
+
+
+def construir_tabla(pipeline, sha256_modelo, bordes_numericos):
+    preprocessor = pipeline.named_steps['preprocessor']
+    # Último paso de la rama categórica: OneHotEncoder (gbm) u OrdinalEncoder (hgb).
+    codificador = preprocessor.named_transformers_['cat'][-1]
+    if not hasattr(codificador, 'categories_'):
+        raise ValueError("La tabla de riesgo requiere un codificador con vocabulario (no hashing).")
+    categorical_features = [cols for name, _, cols in preprocessor.transformers_ if name == 'cat'][0]
+    numeric_features = list(bordes_numericos)
+    faltantes = set([cols for name, _, cols in preprocessor.transformers_ if name == 'num'][0]) - set(numeric_features)
+    if faltantes:
+        raise ValueError(f"La tabla de riesgo no cubre las variables {sorted(faltantes)} (p. ej. historial).")
+    categorias = [list(c) for c in codificador.categories_]
+
+    # Cada rango se evalúa en su primer entero.
+    malla = np.meshgrid(*[np.asarray(bordes_numericos[f][:-1]) for f in numeric_features], indexing='ij')
+    bloque_numerico = pd.DataFrame({f: m.ravel() for f, m in zip(numeric_features, malla)})
+    forma_numerica = malla[0].shape
+
+    probabilidades = np.empty([len(c) for c in categorias] + list(forma_numerica), dtype=np.uint16)
+    for indices in itertools.product(*[range(len(c)) for c in categorias]):
+        bloque = bloque_numerico.assign(**{
+            feature: cats[i] for feature, cats, i in zip(categorical_features, categorias, indices)
+        })
+        proba = pipeline.predict_proba(bloque)[:, 1]
+        probabilidades[indices] = np.rint(proba * ESCALA_CUANTIZACION).astype(np.uint16).reshape(forma_numerica)
+
+    return TablaRiesgo(
+        categorical_features=categorical_features,
+        categorias=categorias,
+        numeric_features=numeric_features,
+        bordes=[bordes_numericos[f] for f in numeric_features],
+        probabilidades=probabilidades,
+        sha256_modelo=sha256_modelo,
+    )
+
+
+def evaluar_error(tabla, pipeline, registros):
+    en_tabla = [(r, p) for r in registros if (p := tabla.buscar(r)) is not None]
+    if not en_tabla:
+        return {"registros": len(registros), "cobertura": 0.0}
+    vivos = pipeline.predict_proba(pd.DataFrame([r for r, _ in en_tabla]))[:, 1]
+    errores = np.abs(vivos - np.array([p for _, p in en_tabla]))
+    return {
+        "registros": len(registros),
+        "cobertura": round(len(en_tabla) / len(registros), 4),
+        "error_max": float(errores.max()),
+        "error_medio": float(errores.mean()),
+        "error_p99": float(np.percentile(errores, 99)),
+    }
+
+
+def muestra_aleatoria(tabla, n, seed=42):
+    rng = np.random.default_rng(seed)
+    registros = []
+    for _ in range(n):
+        registro = {f: cats[rng.integers(len(cats))] for f, cats in zip(tabla.categorical_features, tabla.categorias)}
+        for f, bordes in zip(tabla.numeric_features, tabla.bordes):
+            registro[f] = int(rng.integers(bordes[0], bordes[-1]))
+        registros.append(registro)
+    return registros
+
+
+def build_lookup_table(model_path=MODEL_PATH, tabla_path=TABLA_PATH, reporte_path=REPORTE_PATH):
+    print("🧮 Construyendo tabla de riesgo precalculada...")
+    pipeline = joblib.load(model_path)
+    sha256_modelo = hash_archivo(model_path)
+
+    try:
+        bordes = bordes_desde_modelo(pipeline)
+        origen_bordes = "umbrales del modelo"
+    except ValueError as e:
+        print(f"⚠️ No se pudieron leer los umbrales del modelo ({e}); se usan rangos uniformes.")
+        bordes = bordes_uniformes()
+        origen_bordes = "uniformes"
+    print(f"🔹 Rangos numéricos ({origen_bordes}): " + ", ".join(f"{f}={len(b) - 1}" for f, b in bordes.items()))
+
+    inicio = time.perf_counter()
+    tabla = construir_tabla(pipeline, sha256_modelo, bordes)
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {tabla.n_celdas:,} celdas calculadas en {segundos:.1f} s.")
+
+    # Se escribe primero el arreglo y al final los metadatos (que contienen el hash del
+    # modelo), cada uno con reemplazo atómico, para que la API nunca lea una tabla a medias.
+    tabla.guardar(tabla_path + ".tmp")
+    os.replace(tabla_path + ".tmp.npy", tabla_path + ".npy")
+    os.replace(tabla_path + ".tmp.json", tabla_path + ".json")
+    print(f"💾 Tabla guardada en {tabla_path}.npy ({tabla.probabilidades.nbytes / (1024 * 1024):.1f} MB, uint16).")
+
+    reporte = {
+        "sha256_modelo": sha256_modelo,
+        "celdas": tabla.n_celdas,
+        "segundos_construccion": round(segundos, 2),
+        "origen_bordes": origen_bordes,
+        "bordes": dict(zip(tabla.numeric_features, tabla.bordes)),
+        "muestra_aleatoria": evaluar_error(tabla, pipeline, muestra_aleatoria(tabla, 20000)),
+    }
+    df = leer_citas()
+    if df is not None:
+        df = df.head(20000)
+        registros = df.drop(columns=['paciente_id', 'target_no_asiste']).to_dict('records')
+        reporte["dataset"] = evaluar_error(tabla, pipeline, registros)
+
+    with open(reporte_path, "w") as f:
+        json.dump(reporte, f, indent=2)
+
+    print("\n--- 📏 Error máximo contra el modelo en vivo ---")
+    for nombre in ("muestra_aleatoria", "dataset"):
+        if nombre in reporte:
+            r = reporte[nombre]
+            print(f"{nombre}: cobertura {r['cobertura']:.1%} | error máx {r.get('error_max', 0):.2e} | "
+                  f"medio {r.get('error_medio', 0):.2e} | p99 {r.get('error_p99', 0):.2e}")
+    print(f"Reporte guardado en {reporte_path}")
+    return reporte
+
+
+if __name__ == "__main__":
+    build_lookup_table()
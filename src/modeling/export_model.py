@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import joblib
+
+sys.path.append(os.getcwd())
+
+try:
+    from src.api.compiled_model import ModeloCompilado, compilar_modelo, registros_de_verificacion, TOLERANCIA_PROBABILIDAD
+    from src.api.model_manager import hash_archivo
+    from src.data_prep.storage import leer_citas
+    from src.data_prep.historial import HistorialPacientes, usa_historial
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.api.compiled_model import ModeloCompilado, compilar_modelo, registros_de_verificacion, TOLERANCIA_PROBABILIDAD
+    from src.api.model_manager import hash_archivo
+    from src.data_prep.storage import leer_citas
+    from src.data_prep.historial import HistorialPacientes, usa_historial
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+MODEL_PATH = "models/model_pipeline.pkl"
+COMPACTO_PATH = "models/modelo_compacto.npz"
+REPORTE_PATH = "models/modelo_compacto_reporte.json"
+
+# Carga en un proceso nuevo, como un worker recién iniciado: incluye los imports.
+CARGA_PICKLE = """
+import time, sys
+inicio = time.perf_counter()
+import joblib
+modelo = joblib.load({ruta!r})
+fin = time.perf_counter()
+print(fin - inicio, fin - inicio, 'sklearn' in sys.modules)
+"""
+CARGA_COMPACTO = """
+import time, sys
+inicio = time.perf_counter()
+sys.path.insert(0, {raiz!r})
+from src.api.compiled_model import ModeloCompilado
+inicio_lectura = time.perf_counter()
+modelo = ModeloCompilado.cargar({ruta!r})
+fin = time.perf_counter()
+print(fin - inicio, fin - inicio_lectura, 'sklearn' in sys.modules)
+"""
+
+
+def medir_carga(plantilla, ruta, repeticiones=5):
+    """Mejor tiempo (ms) en procesos nuevos con imports y solo de lectura del archivo, y si se importó sklearn."""
+    totales, lecturas = [], []
+    for _ in range(repeticiones):
+        codigo = plantilla.format(ruta=os.path.abspath(ruta), raiz=PROJECT_ROOT)
+        salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+        total, lectura, sklearn = salida.stdout.split()
+        totales.append(float(total) * 1000)
+        lecturas.append(float(lectura) * 1000)
+    return min(totales), min(lecturas), sklearn == "True"
+
+
+def exportar_modelo(model_path=MODEL_PATH, compacto_path=COMPACTO_PATH, reporte_path=REPORTE_PATH):
+    """Exporta el pipeline a un artefacto compacto que la API carga solo con NumPy.
+
+    Lanza ValueError si el modelo no es compilable (p. ej. backend hgb) o si el
+    artefacto no reproduce las probabilidades del pickle.
+    """
+    print(f"📦 Exportando {model_path} a formato compacto...")
+    pipeline = joblib.load(model_path)
+    sha256_modelo = hash_archivo(model_path)
+    compilado = compilar_modelo(pipeline)
+
+    # Se escribe a un temporal y se verifica la versión leída del disco antes de publicarla.
+    tmp = compacto_path + ".tmp"
+    compilado.guardar(tmp, sha256_modelo)
+    cargado = ModeloCompilado.cargar(tmp)
+
+    import pandas as pd
+    registros = registros_de_verificacion(cargado)
+    df = leer_citas()
+    if df is not None:
+        df = df.head(20000)
+        if usa_historial(cargado.numeric_features):
+            # Mismas features de historial que en el entrenamiento (train.py --historial).
+            df = pd.concat([df, HistorialPacientes().caracteristicas_y_agregar(df)], axis=1)
+        registros += df.drop(columns=['paciente_id', 'target_no_asiste']).astype(object).to_dict('records')
+    esperado = pipeline.predict_proba(pd.DataFrame(registros))[:, 1]
+    diferencia = float(np.max(np.abs(esperado - cargado.predict_proba(registros))))
+    if diferencia > TOLERANCIA_PROBABILIDAD:
+        os.remove(tmp)
+        raise ValueError(f"El artefacto compacto difiere del pickle en {diferencia:.2e}; no se publica.")
+    os.replace(tmp, compacto_path)
+
+    carga_pickle, _, sklearn_pickle = medir_carga(CARGA_PICKLE, model_path)
+    carga_compacto, lectura_compacto, sklearn_compacto = medir_carga(CARGA_COMPACTO, compacto_path)
+    reporte = {
+        "sha256_modelo": sha256_modelo,
+        "tamano_pickle_kb": round(os.path.getsize(model_path) / 1024, 1),
+        "tamano_compacto_kb": round(os.path.getsize(compacto_path) / 1024, 1),
+        "carga_pickle_ms": round(carga_pickle, 1),
+        "carga_compacto_ms": round(carga_compacto, 1),
+        "lectura_compacto_ms": round(lectura_compacto, 2),
+        "pickle_importa_sklearn": sklearn_pickle,
+        "compacto_importa_sklearn": sklearn_compacto,
+        "registros_verificados": len(registros),
+        "diferencia_maxima": diferencia,
+    }
+    with open(reporte_path, "w") as f:
+        json.dump(reporte, f, indent=2)
+
+    print(f"✅ Artefacto guardado en {compacto_path}.")
+    print(f"   Tamaño: {reporte['tamano_pickle_kb']} KB (pickle) -> {reporte['tamano_compacto_kb']} KB (compacto)")
+    print(f"   Carga en un proceso nuevo (con imports): {reporte['carga_pickle_ms']} ms -> {reporte['carga_compacto_ms']} ms "
+          f"(lectura del .npz: {reporte['lectura_compacto_ms']} ms)")
+    print(f"   Paridad con el pickle: diferencia máxima {diferencia:.2e} en {len(registros):,} citas")
+    print(f"Reporte guardado en {reporte_path}")
+    return reporte
+
+
+if __name__ == "__main__":
+    exportar_modelo()
@@ -1,31 +1,107 @@
+import os
+import sys
 import pandas as pd
+import numpy as np
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder, FunctionTransformer
+from sklearn.feature_extraction import FeatureHasher
 
-def get_preprocessing_pipeline():
+sys.path.append(os.getcwd())
+
+try:
+    from src.data_prep.historial import HISTORIAL_FEATURES
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.data_prep.historial import HISTORIAL_FEATURES
+
+NUMERIC_FEATURES = ['edad', 'tiempo_espera_dias', 'inasistencias_previas']
+CATEGORICAL_FEATURES = ['sexo', 'sector', 'prevision', 'especialidad', 'dia_semana', 'turno']
+
+
+def tokens_categoricos(X):
+    """Cada fila como tokens 'columna=valor' para FeatureHasher.
+
+    La columna va en el token para que un mismo valor en dos variables no
+    caiga siempre en el mismo hash.
+    """
+    X = np.asarray(X, dtype=object)
+    return [[f"{j}={valor}" for j, valor in enumerate(fila)] for fila in X]
+
+
+def get_preprocessing_pipeline(categorias_nativas=False, disperso=False, min_frecuencia=None,
+                               max_categorias=None, n_hash=None, historial=False):
+    """Preprocesamiento de las citas.
+
+    Con categorias_nativas=True las categorías se codifican como enteros (una
+    columna por variable, desconocidas como NaN) y los numéricos no se escalan,
+    para modelos con soporte nativo de categorías como HistGradientBoostingClassifier.
+    Las columnas categóricas quedan siempre después de las numéricas.
+
+    Para variables con muchas categorías:
+    - disperso=True entrega una matriz CSR en vez de densa; la memoria crece con
+      las filas y no con filas × categorías.
+    - min_frecuencia / max_categorias agrupan las categorías poco frecuentes en
+      una sola columna "infrecuente" (también aplican al OrdinalEncoder nativo).
+    - n_hash reemplaza el one-hot por FeatureHasher con n_hash columnas fijas, sin
+      vocabulario; siempre es disperso.
+
+    Con historial=True se agregan como numéricas las features de historial por
+    paciente (HISTORIAL_FEATURES de feature_store.py).
+    """
     
-    numeric_features = ['edad', 'tiempo_espera_dias', 'inasistencias_previas']
-    categorical_features = ['sexo', 'sector', 'prevision', 'especialidad', 'dia_semana', 'turno']
+    numeric_features = list(NUMERIC_FEATURES) + (list(HISTORIAL_FEATURES) if historial else [])
+    categorical_features = list(CATEGORICAL_FEATURES)
+    topes = {'min_frequency': min_frecuencia, 'max_categories': max_categorias}
+
+    if categorias_nativas:
+        if disperso or n_hash is not None:
+            raise ValueError("Las categorías nativas no admiten salida dispersa ni hashing.")
+        return ColumnTransformer(
+            transformers=[
+                ('num', SimpleImputer(strategy='median', keep_empty_features=True), numeric_features),
+                ('cat', Pipeline(steps=[
+                    ('imputer', SimpleImputer(strategy='most_frequent')),
+                    ('ordinal', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=np.nan, **topes))
+                ]), categorical_features)
+            ],
+            verbose_feature_names_out=False
+        )
 
    
+    # keep_empty_features: una columna sin ningún valor observado (p. ej. la tasa de
+    # historial cuando ningún paciente se repite) se conserva con 0 en vez de eliminarse.
     numeric_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='median')),
+        ('imputer', SimpleImputer(strategy='median', keep_empty_features=True)),
         ('scaler', StandardScaler())
     ])
 
     
+    if n_hash is not None:
+        if min_frecuencia is not None or max_categorias is not None:
+            raise ValueError("El hashing no usa vocabulario: no se combina con min_frecuencia ni max_categorias.")
+        codificador = [
+            ('tokens', FunctionTransformer(tokens_categoricos)),
+            ('hash', FeatureHasher(n_features=n_hash, input_type='string', alternate_sign=False))
+        ]
+        disperso = True
+    else:
+        # Con topes, las categorías desconocidas van a la columna de infrecuentes.
+        desconocidas = 'infrequent_if_exist' if min_frecuencia is not None or max_categorias is not None else 'ignore'
+        codificador = [('onehot', OneHotEncoder(handle_unknown=desconocidas, sparse_output=disperso, **topes))]
+
     categorical_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='most_frequent')),
-        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
-    ])
+        ('imputer', SimpleImputer(strategy='most_frequent'))
+    ] + codificador)
 
     preprocessor = ColumnTransformer(
         transformers=[
             ('num', numeric_transformer, numeric_features),
             ('cat', categorical_transformer, categorical_features)
         ],
+        # 1.0: con una rama dispersa la salida es siempre CSR, sin importar la densidad.
+        sparse_threshold=1.0 if disperso else 0.0,
         verbose_feature_names_out=False 
     )
 
@@ -2,30 +2,116 @@ import pandas as pd
 import sys
 import os
 import joblib
+import argparse
+import shutil
+import tempfile
+import time
 
 
 sys.path.append(os.getcwd())
 
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (habilita HalvingRandomSearchCV)
+from sklearn.model_selection import train_test_split, HalvingRandomSearchCV, StratifiedKFold
+from scipy.stats import loguniform, randint
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
 
 try:
-    from src.modeling.pipeline import get_preprocessing_pipeline
+    from src.modeling.pipeline import get_preprocessing_pipeline, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    from src.data_prep.storage import leer_citas
+    from src.data_prep.feature_store import HistorialPacientes, HISTORIAL_FEATURES
 except ImportError:
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-    from src.modeling.pipeline import get_preprocessing_pipeline
-
-def train_model():
-    print("🚀 Iniciando proceso de entrenamiento del modelo CESFAM...")
-
-    data_path = "data/raw/dataset_cesfam_stream.csv"
-    if not os.path.exists(data_path):
-        raise FileNotFoundError(f"No se encontró el dataset en {data_path}. Ejecuta primero data_generator.py")
-    
-    df = pd.read_csv(data_path)
+    from src.modeling.pipeline import get_preprocessing_pipeline, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    from src.data_prep.storage import leer_citas
+    from src.data_prep.feature_store import HistorialPacientes, HISTORIAL_FEATURES
+
+BACKENDS = ('gbm', 'hgb')
+# HistGradientBoosting admite a lo más 255 categorías por variable (max_bins).
+MAX_CATEGORIAS_HGB = 255
+MODEL_PATH = "models/model_pipeline.pkl"
+LEADERBOARD_PATH = "models/leaderboard.csv"
+
+# Espacios de la búsqueda de hiperparámetros (--buscar), sobre el Pipeline completo.
+ESPACIOS_BUSQUEDA = {
+    'gbm': {
+        'classifier__n_estimators': randint(50, 400),
+        'classifier__learning_rate': loguniform(0.02, 0.3),
+        'classifier__max_depth': [2, 3, 4, 5],
+        'classifier__subsample': [0.7, 0.85, 1.0],
+        'classifier__min_samples_leaf': [1, 20, 100],
+    },
+    'hgb': {
+        'classifier__learning_rate': loguniform(0.02, 0.3),
+        'classifier__max_iter': randint(100, 500),
+        'classifier__max_leaf_nodes': [7, 15, 31, 63],
+        'classifier__min_samples_leaf': [20, 100, 500],
+        'classifier__l2_regularization': loguniform(1e-3, 10),
+    },
+}
+
+def construir_pipeline(backend='gbm', memory=None, disperso=False, min_frecuencia=None, max_categorias=None,
+                       n_hash=None, historial=False):
+    """Pipeline completo (preprocesamiento + clasificador) del backend pedido.
+
+    gbm: GradientBoostingClassifier sobre el one-hot; es el que la API puede compilar
+         a NumPy y del que se leen los umbrales exactos para la tabla de riesgo.
+    hgb: HistGradientBoostingClassifier con categorías nativas; discretiza los
+         features en histogramas y los construye en paralelo con todos los núcleos.
+    Ambos se guardan como el mismo Pipeline('preprocessor', 'classifier') que carga la API.
+    `memory` (ruta o joblib.Memory) cachea el preprocesamiento ya ajustado entre candidatos.
+    `disperso`, `min_frecuencia`, `max_categorias` y `n_hash` se pasan a
+    get_preprocessing_pipeline para variables con muchas categorías; hgb solo
+    admite los topes de frecuencia (y limita las categorías a 255).
+    Con `historial` el modelo usa además las features de historial por paciente.
+    """
+    numericas = len(NUMERIC_FEATURES) + (len(HISTORIAL_FEATURES) if historial else 0)
+    if backend == 'gbm':
+        preprocessor = get_preprocessing_pipeline(disperso=disperso, min_frecuencia=min_frecuencia,
+                                                  max_categorias=max_categorias, n_hash=n_hash, historial=historial)
+        model = GradientBoostingClassifier(
+            n_estimators=100,
+            learning_rate=0.1,
+            max_depth=3,
+            random_state=42
+        )
+    elif backend == 'hgb':
+        preprocessor = get_preprocessing_pipeline(
+            categorias_nativas=True, disperso=disperso, n_hash=n_hash, min_frecuencia=min_frecuencia,
+            max_categorias=min(max_categorias or MAX_CATEGORIAS_HGB, MAX_CATEGORIAS_HGB), historial=historial
+        )
+        model = HistGradientBoostingClassifier(
+            learning_rate=0.1,
+            max_iter=200,
+            max_leaf_nodes=31,
+            categorical_features=[False] * numericas + [True] * len(CATEGORICAL_FEATURES),
+            early_stopping='auto',
+            random_state=42
+        )
+    else:
+        raise ValueError(f"Backend de entrenamiento desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+
+    return Pipeline([
+        ('preprocessor', preprocessor),
+        ('classifier', model)
+    ], memory=memory)
+
+def agregar_historial(df):
+    """Features de historial de cada cita, con las citas anteriores del dataset (en orden de llegada)."""
+    inicio = time.perf_counter()
+    historial = HistorialPacientes()
+    features = historial.caracteristicas_y_agregar(df)
+    print(f"🔹 Historial calculado para {len(historial):,} pacientes en {time.perf_counter() - inicio:.1f} s.")
+    return pd.concat([df, features], axis=1)
+
+def cargar_datos(historial=False):
+    df = leer_citas()
+    if df is None:
+        raise FileNotFoundError("No se encontró el dataset de citas. Ejecuta primero data_generator.py")
     print(f"✅ Datos cargados: {df.shape[0]} registros.")
+    if historial:
+        df = agregar_historial(df)
 
     target = 'target_no_asiste'
     X = df.drop(columns=[target, 'paciente_id']) 
@@ -37,24 +123,9 @@ def train_model():
     )
     print(f"🔹 Datos de entrenamiento: {X_train.shape[0]}")
     print(f"🔹 Datos de prueba: {X_test.shape[0]}")
+    return X_train, X_test, y_train, y_test
 
-    
-    model = GradientBoostingClassifier(
-        n_estimators=100,
-        learning_rate=0.1,
-        max_depth=3,
-        random_state=42
-    )
-
-    full_pipeline = Pipeline([
-        ('preprocessor', get_preprocessing_pipeline()),
-        ('classifier', model)
-    ])
-
-    print("⏳ Entrenando el modelo (esto puede tardar unos segundos)...")
-    full_pipeline.fit(X_train, y_train)
-    print("✅ Entrenamiento completado.")
-
+def evaluar_modelo(full_pipeline, X_test, y_test):
     print("\n--- 📊 Evaluación del Modelo (Set de Prueba) ---")
     y_pred = full_pipeline.predict(X_test)
     y_proba = full_pipeline.predict_proba(X_test)[:, 1] 
@@ -70,14 +141,113 @@ def train_model():
     print(f"Falsos Positivos (Error tipo 1): {fp}")
     print(f"Falsos Negativos (Error grave - No asiste y no avisamos): {fn}")
     print(f"Verdaderos Positivos (No asiste detectado): {tp}")
+    return auc
 
-    model_dir = "models"
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = os.path.join(model_dir, "model_pipeline.pkl")
-    
-    joblib.dump(full_pipeline, model_path)
+def guardar_modelo(full_pipeline, model_path=MODEL_PATH):
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+
+    # Escritura atómica: la API vigila este archivo y puede tenerlo mapeado en memoria,
+    # así que nunca debe ver un pickle a medio escribir ni sobrescrito en el mismo inode.
+    tmp_path = model_path + ".tmp"
+    joblib.dump(full_pipeline, tmp_path)
+    os.replace(tmp_path, model_path)
     print(f"\n💾 Modelo guardado exitosamente en: {model_path}")
     print("Listo para ser usado por la API.")
 
+def train_model(backend='gbm', historial=False, **codificacion):
+    print("🚀 Iniciando proceso de entrenamiento del modelo CESFAM...")
+    X_train, X_test, y_train, y_test = cargar_datos(historial)
+
+    full_pipeline = construir_pipeline(backend, historial=historial, **codificacion)
+
+    print(f"⏳ Entrenando el modelo ({backend}, esto puede tardar unos segundos)...")
+    full_pipeline.fit(X_train, y_train)
+    print("✅ Entrenamiento completado.")
+
+    evaluar_modelo(full_pipeline, X_test, y_test)
+    guardar_modelo(full_pipeline)
+
+def buscar_hiperparametros(backend='gbm', n_candidatos=32, folds=5, n_jobs=-1, datos=None,
+                           model_path=MODEL_PATH, leaderboard_path=LEADERBOARD_PATH, cachear=True, historial=False,
+                           **codificacion):
+    """Búsqueda aleatoria con successive halving y validación cruzada sobre el Pipeline completo.
+
+    Los candidatos empiezan con una fracción de las filas y solo el mejor tercio
+    pasa a la siguiente ronda con el triple de filas. Los folds y candidatos se
+    reparten entre `n_jobs` procesos; el preprocesamiento de cada fold se ajusta
+    una vez y se reutiliza desde el cache de Pipeline(memory=...). Guarda la tabla
+    de resultados en `leaderboard_path` y el mejor modelo, reentrenado con todo el
+    set de entrenamiento, en `model_path`.
+    """
+    print(f"🔎 Búsqueda de hiperparámetros ({backend}, {n_candidatos} candidatos, {folds} folds, n_jobs={n_jobs})...")
+    X_train, X_test, y_train, y_test = datos if datos is not None else cargar_datos(historial)
+
+    cache = tempfile.mkdtemp(prefix="cesfam_pipeline_cache_")
+    try:
+        busqueda = HalvingRandomSearchCV(
+            construir_pipeline(backend, memory=joblib.Memory(cache, verbose=0) if cachear else None,
+                               historial=historial, **codificacion),
+            ESPACIOS_BUSQUEDA[backend],
+            n_candidates=n_candidatos,
+            factor=3,
+            # La última ronda usa todas las filas de entrenamiento; las anteriores, un tercio de la siguiente.
+            min_resources='exhaust',
+            cv=StratifiedKFold(folds, shuffle=True, random_state=42),
+            scoring='roc_auc',
+            n_jobs=n_jobs,
+            random_state=42,
+        )
+        inicio = time.perf_counter()
+        busqueda.fit(X_train, y_train)
+        segundos = time.perf_counter() - inicio
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+    print(f"✅ Búsqueda completada en {segundos:.1f} s ({len(busqueda.cv_results_['params'])} ajustes de candidatos).")
+
+    resultados = pd.DataFrame(busqueda.cv_results_)
+    columnas = ['rank_test_score', 'iter', 'n_resources', 'mean_test_score', 'std_test_score',
+                'mean_fit_time', 'std_fit_time', 'mean_score_time']
+    parametros = [c for c in resultados.columns if c.startswith('param_')]
+    leaderboard = resultados[columnas + parametros].rename(columns=lambda c: c.replace('param_classifier__', ''))
+    leaderboard = leaderboard.sort_values(['iter', 'mean_test_score'], ascending=[False, False])
+    os.makedirs(os.path.dirname(leaderboard_path), exist_ok=True)
+    leaderboard.to_csv(leaderboard_path, index=False)
+    print("\n--- 🏁 Mejores candidatos (ROC-AUC en validación cruzada) ---")
+    print(leaderboard.head(5).to_string(index=False))
+    print(f"Tabla completa en {leaderboard_path}")
+
+    # El cache es temporal: el artefacto no debe conservar la referencia.
+    mejor = busqueda.best_estimator_.set_params(memory=None)
+    auc = evaluar_modelo(mejor, X_test, y_test)
+    guardar_modelo(mejor, model_path)
+    return {"segundos": segundos, "mejores_parametros": busqueda.best_params_,
+            "roc_auc_cv": float(busqueda.best_score_), "roc_auc_prueba": auc}
+
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Entrena el modelo de inasistencias del CESFAM.")
+    parser.add_argument("--backend", choices=BACKENDS, default='gbm',
+                        help="gbm: GradientBoosting (compatible con la inferencia compilada); hgb: HistGradientBoosting")
+    parser.add_argument("--buscar", action="store_true",
+                        help="Búsqueda de hiperparámetros con validación cruzada en paralelo en vez de la configuración fija")
+    parser.add_argument("--candidatos", type=int, default=32)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Procesos para la búsqueda (-1: todos los núcleos)")
+    parser.add_argument("--disperso", action="store_true", help="One-hot como matriz dispersa CSR (solo gbm)")
+    parser.add_argument("--min-frecuencia", type=float, default=None,
+                        help="Agrupa como infrecuentes las categorías con menos citas (entero) o menor fracción (float < 1)")
+    parser.add_argument("--max-categorias", type=int, default=None,
+                        help="Máximo de columnas por variable categórica, incluida la de infrecuentes")
+    parser.add_argument("--hashing", type=int, default=None, metavar="N",
+                        help="Reemplaza el one-hot por FeatureHasher con N columnas (disperso, solo gbm)")
+    parser.add_argument("--historial", action="store_true",
+                        help="Agrega las features de historial por paciente (src/data_prep/feature_store.py)")
+    args = parser.parse_args()
+    min_frecuencia = args.min_frecuencia
+    if min_frecuencia is not None and min_frecuencia >= 1:
+        min_frecuencia = int(min_frecuencia)
+    codificacion = dict(disperso=args.disperso, min_frecuencia=min_frecuencia,
+                        max_categorias=args.max_categorias, n_hash=args.hashing, historial=args.historial)
+    if args.buscar:
+        buscar_hiperparametros(args.backend, args.candidatos, args.folds, args.n_jobs, **codificacion)
+    else:
+        train_model(args.backend, **codificacion)
\ No newline at end of file
@@ -0,0 +1,305 @@
+import os
+import sys
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import roc_auc_score, log_loss
+
+try:
+    from src.modeling.pipeline import get_preprocessing_pipeline, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    from src.modeling.train import guardar_modelo, MODEL_PATH
+    from src.data_prep.storage import CSV_PATH, PARQUET_DIR, leer_citas_por_bloques
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.modeling.pipeline import get_preprocessing_pipeline, NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    from src.modeling.train import guardar_modelo, MODEL_PATH
+    from src.data_prep.storage import CSV_PATH, PARQUET_DIR, leer_citas_por_bloques
+
+ESTADO_PATH = "models/incremental_estado.joblib"
+FILAS_POR_BLOQUE = 200_000
+# Una de cada N citas (por paciente_id) se reserva para evaluar y nunca se usa para entrenar.
+MODULO_EVALUACION = 10
+# Citas de evaluación que se conservan (las más recientes) para calcular el ROC-AUC.
+MAX_FILAS_EVALUACION = 200_000
+
+
+class BocetoMediana:
+    """Conteo por valor redondeado a `resolucion` para estimar la mediana en streaming.
+
+    La memoria depende de la cantidad de valores distintos y no de las filas; para
+    las variables numéricas del dataset (enteros en rangos acotados) con resolución 1
+    la mediana es exacta.
+    """
+
+    def __init__(self, resolucion=1.0):
+        self.resolucion = resolucion
+        self.conteos = {}
+
+    def actualizar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        cubetas, n = np.unique(np.round(valores / self.resolucion).astype(np.int64), return_counts=True)
+        for cubeta, conteo in zip(cubetas.tolist(), n.tolist()):
+            self.conteos[cubeta] = self.conteos.get(cubeta, 0) + conteo
+
+    def mediana(self):
+        if not self.conteos:
+            return np.nan
+        cubetas = np.array(sorted(self.conteos))
+        acumulado = np.cumsum([self.conteos[c] for c in cubetas])
+        total = acumulado[-1]
+        # Igual que np.median: con un total par se promedian los dos valores centrales.
+        bajo = cubetas[np.searchsorted(acumulado, (total + 1) // 2)]
+        alto = cubetas[np.searchsorted(acumulado, total // 2 + 1)]
+        return (bajo + alto) / 2 * self.resolucion
+
+
+class EstadisticasPreprocesamiento:
+    """Estadísticas del preprocesamiento de pipeline.py acumuladas bloque a bloque:
+    medianas (bocetos), media y varianza (StandardScaler.partial_fit) y conteos por categoría."""
+
+    def __init__(self):
+        self.medianas = {f: BocetoMediana() for f in NUMERIC_FEATURES}
+        self.escalador = StandardScaler()
+        self.categorias = {f: {} for f in CATEGORICAL_FEATURES}
+        self.filas = 0
+
+    def actualizar(self, X):
+        if X.empty:
+            return
+        for feature, boceto in self.medianas.items():
+            boceto.actualizar(X[feature].to_numpy(dtype=np.float64))
+        self.escalador.partial_fit(X[NUMERIC_FEATURES].to_numpy(dtype=np.float64))
+        for feature, conteos in self.categorias.items():
+            for valor, n in X[feature].value_counts().items():
+                if n:
+                    conteos[valor] = conteos.get(valor, 0) + int(n)
+        self.filas += len(X)
+
+    def construir_preprocesador(self):
+        """ColumnTransformer de get_preprocessing_pipeline(disperso=True) ajustado con estas estadísticas.
+
+        La salida es CSR: SGDClassifier la usa directamente y la memoria de cada
+        bloque no crece con el número de categorías.
+        """
+        vocabularios = {f: sorted(c) for f, c in self.categorias.items()}
+        n = max(len(v) for v in vocabularios.values())
+        # Un marco mínimo con cada categoría conocida fija el vocabulario del one-hot;
+        # después se reemplazan las medianas, la escala y las modas por las acumuladas.
+        marco = pd.DataFrame(
+            {f: np.zeros(n) for f in NUMERIC_FEATURES} |
+            {f: [v[i % len(v)] for i in range(n)] for f, v in vocabularios.items()}
+        )
+        preprocesador = get_preprocessing_pipeline(disperso=True).fit(marco)
+
+        num = preprocesador.named_transformers_['num']
+        num.named_steps['imputer'].statistics_ = np.array([self.medianas[f].mediana() for f in NUMERIC_FEATURES])
+        escalador = num.named_steps['scaler']
+        for atributo in ('mean_', 'var_', 'scale_', 'n_samples_seen_'):
+            setattr(escalador, atributo, np.copy(getattr(self.escalador, atributo)))
+        cat = preprocesador.named_transformers_['cat']
+        cat.named_steps['imputer'].statistics_ = np.array(
+            [max(self.categorias[f], key=self.categorias[f].get) for f in CATEGORICAL_FEATURES], dtype=object
+        )
+        return preprocesador
+
+
+def reexpresar_coeficientes(clasificador, anterior, nuevo):
+    """Adapta los coeficientes del modelo lineal a un preprocesador actualizado.
+
+    Con z = (x - media) / escala, el término w·z_anterior equivale a
+    (w·escala_nueva/escala_anterior)·z_nuevo + w·(media_nueva - media_anterior)/escala_anterior,
+    así que las predicciones no cambian al actualizar la escala. Las categorías
+    nuevas entran con coeficiente 0, igual que una categoría desconocida antes.
+    Solo el cambio de las medianas (que afecta a los valores faltantes) no se compensa.
+    """
+    posicion = {nombre: i for i, nombre in enumerate(nuevo.get_feature_names_out())}
+    pesos = np.zeros(len(posicion))
+    for nombre, peso in zip(anterior.get_feature_names_out(), clasificador.coef_[0]):
+        pesos[posicion[nombre]] = peso
+
+    escala_anterior = anterior.named_transformers_['num'].named_steps['scaler']
+    escala_nueva = nuevo.named_transformers_['num'].named_steps['scaler']
+    columnas = [posicion[f] for f in NUMERIC_FEATURES]
+    pesos_numericos = pesos[columnas]
+    pesos[columnas] = pesos_numericos * escala_nueva.scale_ / escala_anterior.scale_
+    intercepto = clasificador.intercept_[0] + np.sum(
+        pesos_numericos * (escala_nueva.mean_ - escala_anterior.mean_) / escala_anterior.scale_
+    )
+
+    clasificador.coef_ = pesos[np.newaxis, :]
+    clasificador.intercept_ = np.array([intercepto])
+    clasificador.n_features_in_ = len(pesos)
+
+
+class EntrenadorIncremental:
+    """Entrena el modelo por bloques, sin cargar el dataset completo en memoria.
+
+    El preprocesamiento se ajusta con estadísticas en streaming y el clasificador
+    (regresión logística con SGDClassifier) se actualiza con partial_fit. Tras cada
+    ejecución se guarda el estado y el id de la última cita vista, de modo que una
+    actualización posterior entrena solo con las citas nuevas.
+    """
+
+    def __init__(self, filas_por_bloque=FILAS_POR_BLOQUE, csv_path=CSV_PATH, ruta=PARQUET_DIR):
+        self.filas_por_bloque = filas_por_bloque
+        self.csv_path = csv_path
+        self.ruta = ruta
+        self.estadisticas = EstadisticasPreprocesamiento()
+        # Tasa de aprendizaje constante: converge como LogisticRegression en una pasada y
+        # sigue adaptándose igual en las actualizaciones, en lugar de decaer con el total de filas vistas.
+        self.clasificador = SGDClassifier(loss='log_loss', alpha=1e-5, learning_rate='constant', eta0=0.001,
+                                          random_state=42)
+        self.preprocesador = None
+        self.ultimo_id = 0
+        self.filas_entrenadas = 0
+        self._evaluacion = []
+
+    def _bloques(self, desde_id=None):
+        return leer_citas_por_bloques(
+            filas_por_bloque=self.filas_por_bloque, desde_id=desde_id, csv_path=self.csv_path, ruta=self.ruta
+        )
+
+    @staticmethod
+    def _dividir(bloque):
+        evaluacion = (bloque['paciente_id'] % MODULO_EVALUACION) == 0
+        return bloque[~evaluacion], bloque[evaluacion]
+
+    def _guardar_evaluacion(self, bloque):
+        if bloque.empty:
+            return
+        self._evaluacion.append(bloque)
+        filas = sum(len(b) for b in self._evaluacion)
+        while filas - len(self._evaluacion[0]) >= MAX_FILAS_EVALUACION:
+            filas -= len(self._evaluacion.pop(0))
+
+    def _actualizar_preprocesador(self):
+        nuevo = self.estadisticas.construir_preprocesador()
+        if self.preprocesador is not None and hasattr(self.clasificador, 'coef_'):
+            reexpresar_coeficientes(self.clasificador, self.preprocesador, nuevo)
+        self.preprocesador = nuevo
+
+    def _entrenar_bloque(self, entrenamiento):
+        if entrenamiento.empty:
+            return
+        X = self.preprocesador.transform(entrenamiento.drop(columns=['paciente_id', 'target_no_asiste']))
+        self.clasificador.partial_fit(X, entrenamiento['target_no_asiste'].to_numpy(), classes=np.array([0, 1]))
+        self.filas_entrenadas += len(entrenamiento)
+
+    def entrenar_completo(self, epocas=1):
+        """Entrena desde cero: una pasada para las estadísticas y `epocas` pasadas de partial_fit."""
+        for bloque in self._bloques():
+            entrenamiento, _ = self._dividir(bloque)
+            self.estadisticas.actualizar(entrenamiento)
+            self.ultimo_id = max(self.ultimo_id, int(bloque['paciente_id'].max()))
+        if self.estadisticas.filas == 0:
+            raise FileNotFoundError("No se encontró el dataset de citas. Ejecuta primero data_generator.py")
+        self._actualizar_preprocesador()
+
+        for epoca in range(epocas):
+            for bloque in self._bloques():
+                if bloque['paciente_id'].iloc[0] > self.ultimo_id:
+                    break
+                bloque = bloque[bloque['paciente_id'] <= self.ultimo_id]
+                entrenamiento, evaluacion = self._dividir(bloque)
+                self._entrenar_bloque(entrenamiento)
+                if epoca == epocas - 1:
+                    self._guardar_evaluacion(evaluacion)
+        return self.filas_entrenadas
+
+    def actualizar(self):
+        """Entrena solo con las citas posteriores a la última ejecución.
+
+        Cada bloque primero actualiza las estadísticas (re-expresando el modelo
+        para el nuevo preprocesamiento) y luego se usa en partial_fit.
+        """
+        filas = 0
+        for bloque in self._bloques(desde_id=self.ultimo_id):
+            entrenamiento, evaluacion = self._dividir(bloque)
+            self.estadisticas.actualizar(entrenamiento)
+            self._actualizar_preprocesador()
+            self._entrenar_bloque(entrenamiento)
+            self._guardar_evaluacion(evaluacion)
+            self.ultimo_id = max(self.ultimo_id, int(bloque['paciente_id'].max()))
+            filas += len(entrenamiento)
+        return filas
+
+    def pipeline(self):
+        """Mismo contrato que train.py: Pipeline('preprocessor', 'classifier') que carga la API."""
+        return Pipeline([('preprocessor', self.preprocesador), ('classifier', self.clasificador)])
+
+    def evaluar(self):
+        if not self._evaluacion:
+            return None
+        evaluacion = pd.concat(self._evaluacion, ignore_index=True)
+        y = evaluacion['target_no_asiste'].to_numpy()
+        proba = self.pipeline().predict_proba(evaluacion.drop(columns=['paciente_id', 'target_no_asiste']))[:, 1]
+        return {
+            "filas": len(evaluacion),
+            "roc_auc": float(roc_auc_score(y, proba)) if len(np.unique(y)) == 2 else None,
+            "log_loss": float(log_loss(y, proba, labels=[0, 1])),
+        }
+
+    def guardar(self, estado_path=ESTADO_PATH):
+        self._evaluacion = []
+        tmp = estado_path + ".tmp"
+        joblib.dump(self, tmp)
+        os.replace(tmp, estado_path)
+
+    @staticmethod
+    def cargar(estado_path=ESTADO_PATH):
+        entrenador = joblib.load(estado_path)
+        entrenador._evaluacion = []
+        return entrenador
+
+
+def entrenar_incremental(completo=False, epocas=1, filas_por_bloque=FILAS_POR_BLOQUE, csv_path=CSV_PATH,
+                         ruta=PARQUET_DIR, model_path=MODEL_PATH, estado_path=ESTADO_PATH):
+    inicio = time.perf_counter()
+    if completo or not os.path.exists(estado_path):
+        print(f"🚀 Entrenamiento incremental desde cero (bloques de {filas_por_bloque:,} filas)...")
+        entrenador = EntrenadorIncremental(filas_por_bloque, csv_path, ruta)
+        filas = entrenador.entrenar_completo(epocas)
+    else:
+        entrenador = EntrenadorIncremental.cargar(estado_path)
+        entrenador.filas_por_bloque, entrenador.csv_path, entrenador.ruta = filas_por_bloque, csv_path, ruta
+        print(f"🔁 Actualizando el modelo con las citas posteriores a paciente_id {entrenador.ultimo_id:,}...")
+        filas = entrenador.actualizar()
+        if filas == 0:
+            print("✅ No hay citas nuevas; el modelo no cambia.")
+            return None
+
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {filas:,} citas usadas en {segundos:.1f} s ({entrenador.filas_entrenadas:,} en total).")
+    metricas = entrenador.evaluar()
+    if metricas is not None and metricas["roc_auc"] is not None:
+        print(f"🏆 ROC-AUC {metricas['roc_auc']:.4f} | log-loss {metricas['log_loss']:.4f} "
+              f"({metricas['filas']:,} citas reservadas para evaluación)")
+
+    # El modelo se publica antes que el estado: si el proceso se interrumpe entre
+    # ambos, la próxima actualización vuelve a usar esas citas en vez de saltárselas.
+    guardar_modelo(entrenador.pipeline(), model_path)
+    entrenador.guardar(estado_path)
+    print(f"💾 Estado incremental guardado en {estado_path}.")
+    return metricas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrenamiento incremental (por bloques) del modelo de inasistencias.")
+    parser.add_argument("--completo", action="store_true",
+                        help="Reentrena desde cero; por defecto solo se usan las citas nuevas desde la última ejecución")
+    parser.add_argument("--epocas", type=int, default=1, help="Pasadas sobre el dataset al entrenar desde cero")
+    parser.add_argument("--filas-por-bloque", type=int, default=FILAS_POR_BLOQUE)
+    args = parser.parse_args()
+    # El estado se serializa con pickle: se usa la versión importada del módulo para que
+    # sus clases queden registradas como src.modeling.train_incremental y no como __main__.
+    from src.modeling.train_incremental import entrenar_incremental
+    entrenar_incremental(args.completo, args.epocas, args.filas_por_bloque)
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+
+try:
+    from src.api import config
+    from src.api.model_manager import GestorModelo
+    from src.data_prep.storage import CSV_PATH
+    from src.data_prep.stream_reader import LectorIncremental, BYTES_POR_LECTURA
+    from src.data_prep.feature_store import HistorialVigente, HISTORIAL_FEATURES, completar_dataframe, usa_historial
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.api import config
+    from src.api.model_manager import GestorModelo
+    from src.data_prep.storage import CSV_PATH
+    from src.data_prep.stream_reader import LectorIncremental, BYTES_POR_LECTURA
+    from src.data_prep.feature_store import HistorialVigente, HISTORIAL_FEATURES, completar_dataframe, usa_historial
+
+SALIDA_PATH = "data/processed/predicciones.csv"
+INTERVALO_SEGUNDOS = 0.5
+# Lotes recientes sobre los que se calculan los percentiles de retraso.
+LOTES_EN_METRICAS = 200
+# Ventana para la tasa de filas puntuadas por segundo.
+VENTANA_TASA_SEGUNDOS = 60
+REPORTE_SEGUNDOS = 10
+
+
+def _escribir_json_atomico(datos, ruta):
+    tmp = ruta + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(datos, f, indent=2)
+    os.replace(tmp, ruta)
+
+
+class PuntuadorStream:
+    """Puntúa las citas nuevas del CSV de streaming a medida que se agregan.
+
+    Cada lote de filas nuevas se evalúa con una sola llamada vectorizada al
+    pipeline y sus predicciones se anexan a `salida`. Después de cada lote se
+    guarda un checkpoint con la posición del lector y el largo de la salida;
+    al reiniciar, la salida se trunca a ese largo y la lectura sigue desde esa
+    posición, así ninguna cita queda sin puntuar ni se puntúa dos veces.
+    Si el CSV de entrada se reemplaza (nueva siembra), la salida se vacía.
+    """
+
+    def __init__(self, entrada=CSV_PATH, salida=SALIDA_PATH, gestor=None, umbral=None,
+                 checkpoint=None, metricas=None):
+        self.salida = salida
+        base = os.path.splitext(salida)[0]
+        self.checkpoint = checkpoint or base + "_checkpoint.json"
+        self.metricas_path = metricas or base + "_metricas.json"
+        self.umbral = config.UMBRAL_DECISION if umbral is None else umbral
+        self.gestor = gestor if gestor is not None else GestorModelo()
+        self.gestor.cargar()
+        self.historial = HistorialVigente(config.HISTORIAL_PATH)
+        self.lector = LectorIncremental(entrada)
+        self._version_columnas = None
+        self.filas_puntuadas = 0
+        self.lotes = 0
+        self.iniciado_en = time.time()
+        # (fin, filas, retraso_segundos, segundos_puntuacion) de los últimos lotes.
+        self._historial = deque(maxlen=LOTES_EN_METRICAS)
+        os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+        self._retomar()
+
+    def _retomar(self):
+        if not os.path.exists(self.checkpoint):
+            self._vaciar_salida()
+            return
+        with open(self.checkpoint) as f:
+            estado = json.load(f)
+        self.lector.restaurar(estado["lector"])
+        self.filas_puntuadas = estado["filas_puntuadas"]
+        # Lo escrito después del último checkpoint se descarta: el lector volverá a entregar esas filas.
+        if os.path.exists(self.salida):
+            with open(self.salida, "r+b") as f:
+                f.truncate(estado["bytes_salida"])
+        print(f"↩️ Retomando desde el checkpoint: {self.filas_puntuadas:,} citas ya puntuadas.")
+
+    def _vaciar_salida(self):
+        with open(self.salida, "wb"):
+            pass
+        self.filas_puntuadas = 0
+
+    def _guardar_checkpoint(self, bytes_salida):
+        _escribir_json_atomico({
+            "lector": self.lector.estado(),
+            "bytes_salida": bytes_salida,
+            "filas_puntuadas": self.filas_puntuadas,
+            "actualizado_en": time.time(),
+        }, self.checkpoint)
+
+    def _columnas_de(self, modelo):
+        """Ajusta las columnas que lee el lector a las del modelo; cambian si una recarga trae otro modelo."""
+        if modelo.version != self._version_columnas:
+            # Las features de historial no vienen en el CSV: se consultan en el historial de pacientes.
+            self.lector.columnas = ['paciente_id'] + [c for c in modelo.columnas if c not in HISTORIAL_FEATURES]
+            self._version_columnas = modelo.version
+
+    def _puntuar(self, lote, escrito_en, modelo):
+        inicio = time.perf_counter()
+        if usa_historial(modelo.columnas):
+            lote = completar_dataframe(lote, self.historial.actual())
+        probabilidades = modelo.predecir_dataframe(lote)
+        predicciones = pd.DataFrame({
+            'paciente_id': lote['paciente_id'].to_numpy(),
+            'probabilidad': np.round(probabilidades, 6),
+            'prediccion': (probabilidades >= self.umbral).astype(np.int8),
+            'version_modelo': modelo.version,
+            'puntuado_en': round(time.time(), 3),
+        })
+        with open(self.salida, "a", newline="") as f:
+            predicciones.to_csv(f, header=f.tell() == 0, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+            bytes_salida = f.tell()
+        self.filas_puntuadas += len(lote)
+        self.lotes += 1
+        self._guardar_checkpoint(bytes_salida)
+        fin = time.time()
+        self._historial.append((fin, len(lote), fin - escrito_en, time.perf_counter() - inicio))
+
+    def procesar_pendientes(self, max_bytes=BYTES_POR_LECTURA):
+        """Puntúa todas las filas nuevas disponibles y devuelve cuántas fueron."""
+        total = 0
+        while True:
+            try:
+                escrito_en = os.stat(self.lector.path).st_mtime
+            except FileNotFoundError:
+                return total
+            # El lote se lee y se puntúa con la misma versión aunque mientras tanto se recargue el modelo.
+            modelo = self.gestor.activo
+            self._columnas_de(modelo)
+            nuevas, reiniciado = self.lector.leer_nuevas(max_bytes)
+            if reiniciado:
+                print("🔄 El CSV de entrada fue reemplazado; se reinician las predicciones.")
+                self._vaciar_salida()
+                self._guardar_checkpoint(0)
+            if nuevas is None or nuevas.empty:
+                return total
+            self._puntuar(nuevas, escrito_en, modelo)
+            total += len(nuevas)
+
+    def metricas(self):
+        """Rendimiento y retraso de punta a punta.
+
+        El retraso de un lote es el tiempo entre la última escritura del CSV de
+        entrada antes de leerlo y el momento en que sus predicciones quedaron en
+        disco; las filas más antiguas del lote esperaron además hasta un intervalo de sondeo.
+        """
+        ahora = time.time()
+        ventana = min(VENTANA_TASA_SEGUNDOS, max(ahora - self.iniciado_en, 1e-9))
+        recientes = sum(filas for fin, filas, _, _ in self._historial if fin >= ahora - ventana)
+        try:
+            pendientes = max(os.stat(self.lector.path).st_size - self.lector.offset, 0)
+        except FileNotFoundError:
+            pendientes = 0
+        metricas = {
+            "filas_puntuadas": self.filas_puntuadas,
+            "lotes": self.lotes,
+            "filas_por_segundo": recientes / ventana,
+            "retraso_ultimo_s": None,
+            "retraso_p50_s": None,
+            "retraso_p95_s": None,
+            "retraso_max_s": None,
+            "puntuacion_ms_p50": None,
+            "bytes_pendientes": pendientes,
+            "version_modelo": self.gestor.activo.version,
+            "actualizado_en": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ahora)),
+        }
+        if self._historial:
+            retrasos = np.array([r for _, _, r, _ in self._historial])
+            metricas.update({
+                "retraso_ultimo_s": float(retrasos[-1]),
+                "retraso_p50_s": float(np.percentile(retrasos, 50)),
+                "retraso_p95_s": float(np.percentile(retrasos, 95)),
+                "retraso_max_s": float(retrasos.max()),
+                "puntuacion_ms_p50": float(np.percentile([s for _, _, _, s in self._historial], 50) * 1000),
+            })
+        return metricas
+
+    def ejecutar(self, intervalo_segundos=INTERVALO_SEGUNDOS, duracion_segundos=None, reporte_segundos=REPORTE_SEGUNDOS):
+        detener = []
+        senal_previa = signal.signal(signal.SIGTERM, lambda *_: detener.append(True))
+        if config.VIGILAR_MODELO:
+            self.gestor.iniciar_vigilancia(config.VIGILANCIA_SEGUNDOS)
+        inicio = time.monotonic()
+        proximo_reporte = inicio + reporte_segundos
+        print(f"🎯 Puntuando {self.lector.path} -> {self.salida} (umbral {self.umbral}).")
+        try:
+            while not detener:
+                self.procesar_pendientes()
+                metricas = self.metricas()
+                _escribir_json_atomico(metricas, self.metricas_path)
+                ahora = time.monotonic()
+                if ahora >= proximo_reporte:
+                    proximo_reporte = ahora + reporte_segundos
+                    retraso = metricas["retraso_p50_s"] or 0.0
+                    print(f"📈 {metricas['filas_puntuadas']:,} citas puntuadas | "
+                          f"{metricas['filas_por_segundo']:,.0f} citas/s | "
+                          f"retraso p50 {retraso:.2f} s | "
+                          f"{metricas['bytes_pendientes']:,} bytes pendientes")
+                if duracion_segundos is not None and ahora - inicio >= duracion_segundos:
+                    break
+                time.sleep(intervalo_segundos)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.gestor.detener_vigilancia()
+            signal.signal(signal.SIGTERM, senal_previa)
+        print(f"\n--- 🛑 Puntuación detenida: {self.filas_puntuadas:,} citas puntuadas en total ---")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Puntúa en línea las citas que llegan al CSV de streaming.")
+    parser.add_argument("--entrada", default=CSV_PATH)
+    parser.add_argument("--salida", default=SALIDA_PATH)
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_SEGUNDOS, help="Segundos entre revisiones del CSV")
+    parser.add_argument("--reiniciar", action="store_true", help="Descarta el checkpoint y vuelve a puntuar desde el inicio")
+    args = parser.parse_args()
+
+    if args.reiniciar:
+        checkpoint = os.path.splitext(args.salida)[0] + "_checkpoint.json"
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    PuntuadorStream(args.entrada, args.salida).ejecutar(args.intervalo)
@@ -0,0 +1,61 @@
+"""Benchmark de refresco de datos de la página EDA: relectura completa vs lectura incremental.
+
+Para cada tamaño de archivo simula refrescos del dashboard tras agregar un lote de
+50 citas (como stream_generator.py) y mide el tiempo de releer el CSV completo con
+pd.read_csv frente a leer solo las filas nuevas y actualizar los agregados.
+
+Uso: python tests/bench_eda_refresh.py [filas ...]
+"""
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.data_prep.stream_reader import LectorIncremental
+from src.dashboard.aggregates import AgregadosEDA, COLUMNAS_EDA
+
+REFRESCOS = 10
+FILAS_POR_LOTE = 50
+
+
+def preparar(ruta, filas, bloque=1_000_000):
+    for inicio in range(0, filas, bloque):
+        lote = generar_registros_cesfam(min(bloque, filas - inicio), start_id=inicio + 1)
+        lote.to_csv(ruta, mode='a', header=inicio == 0, index=False)
+
+
+def main(tamanos=(100_000, 1_000_000)):
+    print(f"{'filas':>10} {'relectura completa (ms)':>24} {'incremental (ms)':>17}")
+    for filas in tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "citas.csv")
+            preparar(ruta, filas)
+
+            lector, agregados = LectorIncremental(ruta, columnas=COLUMNAS_EDA), AgregadosEDA()
+            agregados.actualizar(lector.leer_nuevas()[0])  # carga inicial, no se mide
+
+            completa, incremental = [], []
+            siguiente = filas + 1
+            for _ in range(REFRESCOS):
+                generar_registros_cesfam(FILAS_POR_LOTE, start_id=siguiente).to_csv(ruta, mode='a', header=False, index=False)
+                siguiente += FILAS_POR_LOTE
+
+                inicio = time.perf_counter()
+                pd.read_csv(ruta)
+                completa.append(time.perf_counter() - inicio)
+
+                inicio = time.perf_counter()
+                agregados.actualizar(lector.leer_nuevas()[0])
+                incremental.append(time.perf_counter() - inicio)
+
+            assert agregados.total == siguiente - 1
+            print(f"{filas:>10,} {np.median(completa) * 1000:>24.1f} {np.median(incremental) * 1000:>17.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or (100_000, 1_000_000))
@@ -0,0 +1,95 @@
+"""Benchmark de render de la página EDA: seaborn sobre el DataFrame completo vs gráficos desde agregados.
+
+Para cada tamaño arma los tres gráficos de la página (inasistencia por especialidad,
+histograma de edad y matriz de correlación) y los renderiza a PNG, como hace
+st.pyplot. El camino "filas" es el original (sns.barplot, sns.histplot y df.corr
+sobre todas las filas); el camino "agregados" grafica desde AgregadosEDA ya
+actualizado. También se informa el costo de resumir un lote nuevo de 50 filas.
+
+Uso: python tests/bench_eda_render.py [filas ...]
+"""
+import sys
+import os
+import io
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.data_prep.storage import normalizar_tipos
+from src.dashboard.aggregates import AgregadosEDA, graficar_tasas, graficar_histograma, graficar_correlacion
+
+COLORES = ["#16E643", "#B80B9B"]
+REPETICIONES = 3
+
+
+def a_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+
+
+def render_filas(df):
+    fig, ax = plt.subplots()
+    sns.barplot(data=df, x='especialidad', y='target_no_asiste', errorbar=None, palette="Blues_r", ax=ax)
+    a_png(fig)
+    fig, ax = plt.subplots()
+    sns.histplot(data=df, x='edad', hue='target_no_asiste', multiple="stack", bins=20, palette=COLORES, ax=ax)
+    a_png(fig)
+    fig, ax = plt.subplots(figsize=(10, 4))
+    sns.heatmap(df.select_dtypes(include='number').corr(), annot=True, cmap='mako', ax=ax)
+    a_png(fig)
+
+
+def render_agregados(agregados):
+    fig, ax = plt.subplots()
+    graficar_tasas(agregados, ax)
+    a_png(fig)
+    fig, ax = plt.subplots()
+    graficar_histograma(agregados, ax, COLORES)
+    a_png(fig)
+    fig, ax = plt.subplots(figsize=(10, 4))
+    graficar_correlacion(agregados, ax)
+    a_png(fig)
+
+
+def mediana_segundos(funcion, *args):
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    return float(np.median(tiempos))
+
+
+def main(tamanos=(100_000, 1_000_000, 10_000_000), bloque=1_000_000):
+    warnings.filterwarnings("ignore")
+    print(f"{'filas':>11} {'render filas (s)':>17} {'render agregados (s)':>21} {'lote de 50 (ms)':>16}")
+    for filas in tamanos:
+        partes = [normalizar_tipos(generar_registros_cesfam(min(bloque, filas - i), start_id=i + 1))
+                  for i in range(0, filas, bloque)]
+        df = pd.concat(partes, ignore_index=True)
+        del partes
+
+        agregados = AgregadosEDA()
+        for inicio in range(0, filas, bloque):
+            agregados.actualizar(df.iloc[inicio:inicio + bloque])
+
+        lote = normalizar_tipos(generar_registros_cesfam(50, start_id=filas + 1))
+        segundos_lote = mediana_segundos(agregados.actualizar, lote)
+
+        segundos_filas = mediana_segundos(render_filas, df)
+        segundos_agregados = mediana_segundos(render_agregados, agregados)
+        print(f"{filas:>11,} {segundos_filas:>17.2f} {segundos_agregados:>21.2f} {segundos_lote * 1000:>16.2f}")
+        del df
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or (100_000, 1_000_000, 10_000_000))
@@ -0,0 +1,61 @@
+"""Benchmark del historial de pacientes (src/data_prep/feature_store.py).
+
+Genera citas con pacientes repetidos y mide:
+- la reconstrucción de las features de entrenamiento recorriendo el dataset en bloques;
+- guardar y cargar el .npz;
+- la consulta de una cita (como /predict) y de un lote de 1000 (como /predict/batch).
+
+Uso: python tests/bench_feature_store.py [--filas 1000000] [--pacientes 200000]
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.data_prep.feature_store import HistorialPacientes, completar_registros
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--pacientes", type=int, default=200_000)
+    parser.add_argument("--filas-por-bloque", type=int, default=200_000)
+    args = parser.parse_args()
+
+    df = generar_registros_cesfam(args.filas, start_id=1, rng=np.random.default_rng(42))
+    df['paciente_id'] = np.random.default_rng(0).integers(0, args.pacientes, len(df))
+
+    historial = HistorialPacientes()
+    inicio = time.perf_counter()
+    for i in range(0, len(df), args.filas_por_bloque):
+        historial.caracteristicas_y_agregar(df.iloc[i:i + args.filas_por_bloque])
+    segundos = time.perf_counter() - inicio
+    print(f"Features de entrenamiento: {args.filas:,} citas en {segundos:.2f} s ({args.filas / segundos:,.0f} citas/s); "
+          f"{len(historial):,} pacientes, {len(historial.especialidades):,} pares paciente-especialidad.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "historial.npz")
+        inicio = time.perf_counter()
+        historial.guardar(ruta)
+        guardar = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        cargado = HistorialPacientes.cargar(ruta)
+        cargar = time.perf_counter() - inicio
+        print(f"Archivo: {os.path.getsize(ruta) / 1024 ** 2:.1f} MB; guardar {guardar:.2f} s, cargar {cargar:.2f} s.")
+
+    registros = df.head(1000).drop(columns=['target_no_asiste']).to_dict('records')
+    tiempos = []
+    for registro in registros:
+        inicio = time.perf_counter()
+        completar_registros([registro], cargado)
+        tiempos.append(time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    completar_registros(registros, cargado)
+    lote = time.perf_counter() - inicio
+    print(f"Consulta de 1 cita: p50 {np.median(tiempos) * 1e6:.0f} µs, p99 {np.percentile(tiempos, 99) * 1e6:.0f} µs; "
+          f"lote de 1000: {lote * 1000:.1f} ms.")
@@ -0,0 +1,82 @@
+"""Benchmark del generador de datos sintéticos (filas por segundo).
+
+Compara el generador original (estado global de np.random, edades con
+concatenate/resize/shuffle y columnas de texto) con el nuevo basado en
+numpy.random.Generator, primero en memoria y luego la generación masiva en
+shards Parquet con 1, 2, ... hasta todos los núcleos.
+
+Uso: python tests/bench_generator.py [filas]
+"""
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.data_generator import generar_registros_cesfam, generar_dataset
+
+
+def generar_legacy(n_registros, start_id):
+    """Copia del generador anterior, solo como referencia de rendimiento."""
+    ids = range(start_id, start_id + n_registros)
+    edades = np.concatenate([
+        np.random.randint(0, 15, int(n_registros * 0.15)),
+        np.random.randint(15, 65, int(n_registros * 0.60)),
+        np.random.randint(65, 95, int(n_registros * 0.25))
+    ])
+    edades = np.resize(edades, n_registros)
+    np.random.shuffle(edades)
+    sexos = np.random.choice(['Femenino', 'Masculino'], n_registros, p=[0.55, 0.45])
+    sectores = np.random.choice(['Norte', 'Sur', 'Centro', 'Rural'], n_registros, p=[0.3, 0.3, 0.3, 0.1])
+    prevision = np.random.choice(['Fonasa A', 'Fonasa B', 'Fonasa C', 'Fonasa D'], n_registros)
+    especialidades = np.random.choice(
+        ['Medicina General', 'Dental', 'Matrona', 'Salud Mental', 'Kinesiologia', 'Nutricionista'],
+        n_registros, p=[0.40, 0.20, 0.15, 0.10, 0.10, 0.05]
+    )
+    dias_semana = np.random.choice(['Lunes', 'Martes', 'Miercoles', 'Jueves', 'Viernes'], n_registros)
+    turnos = np.random.choice(['Mañana', 'Tarde'], n_registros)
+    tiempo_espera_dias = np.random.exponential(scale=10, size=n_registros).astype(int)
+    inasistencias_previas = np.random.poisson(lam=0.5, size=n_registros)
+    scores = np.random.uniform(0, 1, n_registros)
+    scores[tiempo_espera_dias > 20] -= 0.15
+    scores[(dias_semana == 'Viernes') & (turnos == 'Tarde')] -= 0.10
+    scores[(edades >= 20) & (edades <= 35)] -= 0.05
+    scores -= (inasistencias_previas * 0.05)
+    scores[edades > 65] += 0.10
+    scores[np.isin(especialidades, ['Salud Mental', 'Dental'])] -= 0.05
+    return pd.DataFrame({
+        'paciente_id': ids, 'edad': edades, 'sexo': sexos, 'sector': sectores, 'prevision': prevision,
+        'especialidad': especialidades, 'dia_semana': dias_semana, 'turno': turnos,
+        'tiempo_espera_dias': tiempo_espera_dias, 'inasistencias_previas': inasistencias_previas,
+        'target_no_asiste': np.where(scores < 0.20, 1, 0)
+    })
+
+
+def filas_por_segundo(funcion, filas):
+    inicio = time.perf_counter()
+    funcion()
+    return filas / (time.perf_counter() - inicio)
+
+
+def main(filas=10_000_000):
+    bloque = min(filas, 1_000_000)
+    print(f"{'generador':<44} {'filas/s':>14}")
+    legado = filas_por_segundo(lambda: generar_legacy(bloque, 1), bloque)
+    print(f"{'original en memoria (' + format(bloque, ',') + ' filas)':<44} {legado:>14,.0f}")
+    nuevo = filas_por_segundo(lambda: generar_registros_cesfam(bloque, 1, np.random.default_rng(0)), bloque)
+    print(f"{'Generator en memoria (' + format(bloque, ',') + ' filas)':<44} {nuevo:>14,.0f}")
+
+    workers = 1
+    while workers <= os.cpu_count():
+        with tempfile.TemporaryDirectory() as destino:
+            tasa = filas_por_segundo(lambda: generar_dataset(filas, destino, workers=workers), filas)
+        print(f"{f'shards Parquet, {workers} worker(s), {filas:,} filas':<44} {tasa:>14,.0f}")
+        workers *= 2
+    print(f"Núcleos disponibles: {os.cpu_count()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
@@ -0,0 +1,69 @@
+"""Benchmark del entrenamiento incremental: tiempo y pico de memoria según el tamaño del dataset.
+
+Genera datasets Parquet sintéticos de 1M y 10M filas en un directorio temporal y,
+en un proceso aparte para cada medición, registra el tiempo y el pico de RSS de:
+cargar el dataset completo como hace train.py (solo la lectura, sin entrenar),
+el entrenamiento incremental desde cero y una actualización con un 1% de citas nuevas.
+
+Uso: python tests/bench_incremental.py [filas ...]
+"""
+import sys
+import os
+import json
+import tempfile
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MEDICIONES = {
+    "leer_citas (train.py, solo carga)": "storage.leer_citas(csv_path=csv_path, ruta=ruta)",
+    "incremental desde cero": "entrenar_incremental(completo=True, **rutas)",
+    "actualización (+1% filas)": "entrenar_incremental(**rutas)",
+}
+
+PLANTILLA = """
+import sys, os, time, json, contextlib, io
+sys.path.insert(0, {raiz!r})
+from src.data_prep import storage
+from src.modeling.train_incremental import entrenar_incremental
+csv_path, ruta, tmp = {csv!r}, {ruta!r}, {tmp!r}
+rutas = dict(csv_path=csv_path, ruta=ruta, model_path=os.path.join(tmp, "modelo.pkl"),
+             estado_path=os.path.join(tmp, "estado.joblib"))
+inicio = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    resultado = {medicion}
+segundos = time.perf_counter() - inicio
+pico = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmHWM:"))
+auc = resultado.get("roc_auc") if isinstance(resultado, dict) else None
+print(json.dumps({{"segundos": segundos, "pico_mb": pico / 1024, "roc_auc": auc}}))
+"""
+
+
+def medir(medicion, csv_path, ruta, tmp):
+    codigo = PLANTILLA.format(raiz=PROJECT_ROOT, csv=csv_path, ruta=ruta, tmp=tmp, medicion=medicion)
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main(tamanos=(1_000_000, 10_000_000)):
+    from src.data_prep import storage
+    from src.data_prep.data_generator import generar_dataset, generar_registros_cesfam
+
+    print(f"{'filas':>12} {'medición':<36} {'tiempo (s)':>11} {'pico RSS (MB)':>14} {'ROC-AUC':>8}")
+    for filas in tamanos:
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = os.path.join(tmp, "citas")
+            csv_path = os.path.join(tmp, "no_existe.csv")
+            generar_dataset(filas, destino=ruta)
+            for nombre, medicion in MEDICIONES.items():
+                if nombre.startswith("actualización"):
+                    storage.escribir_parte(generar_registros_cesfam(filas // 100, start_id=filas + 1), ruta)
+                r = medir(medicion, csv_path, ruta, tmp)
+                auc = f"{r['roc_auc']:.4f}" if r['roc_auc'] is not None else "-"
+                print(f"{filas:>12,} {nombre:<36} {r['segundos']:>11.1f} {r['pico_mb']:>14.0f} {auc:>8}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or (1_000_000, 10_000_000))
@@ -0,0 +1,58 @@
+"""Benchmark de latencia de inferencia de una cita: pipeline de sklearn vs modo compilado.
+
+Uso: python tests/bench_inference.py [repeticiones]
+"""
+import sys
+import os
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import joblib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.main import PacienteInput
+from src.api.compiled_model import compilar_modelo, verificar_paridad
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def medir(funcion, entradas, repeticiones):
+    tiempos = np.empty(repeticiones)
+    for i in range(repeticiones):
+        entrada = entradas[i % len(entradas)]
+        inicio = time.perf_counter()
+        funcion(entrada)
+        tiempos[i] = time.perf_counter() - inicio
+    return tiempos * 1e6
+
+
+def main(repeticiones=2000):
+    warnings.filterwarnings("ignore")
+    pipeline = joblib.load(os.path.join(PROJECT_ROOT, 'models', 'model_pipeline.pkl'))
+    compilado = compilar_modelo(pipeline)
+
+    df = pd.read_csv(os.path.join(PROJECT_ROOT, 'data', 'raw', 'dataset_cesfam_stream.csv'), nrows=500)
+    entradas = [PacienteInput(**r) for r in df.drop(columns=['paciente_id', 'target_no_asiste']).to_dict('records')]
+
+    caminos = {
+        "pipeline (DataFrame + predict_proba)": lambda p: pipeline.predict_proba(pd.DataFrame([p.dict()]))[0, 1],
+        "compilado (NumPy)": lambda p: compilado.predict_proba([p.dict()])[0],
+    }
+
+    print(f"Diferencia máxima de probabilidad: {verificar_paridad(pipeline, compilado, [p.dict() for p in entradas]):.2e}")
+    print(f"{'camino':<40} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+    resultados = {}
+    for nombre, funcion in caminos.items():
+        medir(funcion, entradas, 50)  # calentamiento
+        tiempos = medir(funcion, entradas, repeticiones)
+        resultados[nombre] = np.percentile(tiempos, [50, 99])
+        print(f"{nombre:<40} {resultados[nombre][0]:>10.1f} {resultados[nombre][1]:>10.1f}")
+
+    base, rapido = resultados.values()
+    print(f"Aceleración p50: {base[0] / rapido[0]:.1f}x | p99: {base[1] / rapido[1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,59 @@
+"""Benchmark de latencia de una cita: pipeline de sklearn vs modo compilado vs tabla de riesgo.
+
+Requiere haber construido la tabla con src/modeling/build_lookup_table.py.
+
+Uso: python tests/bench_lookup.py [repeticiones]
+"""
+import sys
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import joblib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.main import PacienteInput
+from src.api.compiled_model import compilar_modelo
+from src.api.lookup_table import TablaRiesgo
+from tests.bench_inference import medir, PROJECT_ROOT
+
+
+def main(repeticiones=2000):
+    warnings.filterwarnings("ignore")
+    pipeline = joblib.load(os.path.join(PROJECT_ROOT, 'models', 'model_pipeline.pkl'))
+    compilado = compilar_modelo(pipeline)
+    tabla = TablaRiesgo.cargar(os.path.join(PROJECT_ROOT, 'models', 'tabla_riesgo'), mmap_mode="r")
+
+    df = pd.read_csv(os.path.join(PROJECT_ROOT, 'data', 'raw', 'dataset_cesfam_stream.csv'), nrows=500)
+    entradas = [PacienteInput(**r) for r in df.drop(columns=['paciente_id', 'target_no_asiste']).to_dict('records')]
+
+    registros = [p.dict() for p in entradas]
+    en_tabla = [tabla.buscar(r) for r in registros]
+    cubiertos = [i for i, p in enumerate(en_tabla) if p is not None]
+    if cubiertos:
+        vivos = compilado.predict_proba([registros[i] for i in cubiertos])
+        error = np.max(np.abs(vivos - np.array([en_tabla[i] for i in cubiertos])))
+        print(f"Cobertura de la tabla: {len(cubiertos) / len(registros):.1%} | error máximo: {error:.2e}")
+
+    caminos = {
+        "pipeline (DataFrame + predict_proba)": lambda p: pipeline.predict_proba(pd.DataFrame([p.dict()]))[0, 1],
+        "compilado (NumPy)": lambda p: compilado.predict_proba([p.dict()])[0],
+        "tabla de riesgo (lookup)": lambda p: tabla.buscar(p.dict()),
+    }
+
+    print(f"{'camino':<40} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+    resultados = {}
+    for nombre, funcion in caminos.items():
+        medir(funcion, entradas, 50)  # calentamiento
+        tiempos = medir(funcion, entradas, repeticiones)
+        resultados[nombre] = np.percentile(tiempos, [50, 99])
+        print(f"{nombre:<40} {resultados[nombre][0]:>10.1f} {resultados[nombre][1]:>10.1f}")
+
+    base = resultados["pipeline (DataFrame + predict_proba)"]
+    for nombre in list(caminos)[1:]:
+        print(f"Aceleración {nombre}: p50 {base[0] / resultados[nombre][0]:.1f}x | p99 {base[1] / resultados[nombre][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
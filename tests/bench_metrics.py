@@ -0,0 +1,177 @@
+"""Benchmark del costo de las métricas y del perfilador por muestreo en /predict.
+
+Cada configuración corre en un proceso nuevo (las métricas se activan al importar
+la API) con la API en el mismo proceso (transporte ASGI de httpx), un cliente y el
+cache desactivado para que todas las solicitudes lleguen al modelo. Las
+configuraciones se alternan por rondas para que el ruido de la máquina las afecte
+por igual; aun así, la diferencia de punta a punta entre procesos varía en decenas
+de µs. Por eso el presupuesto se compara con el costo medido directamente: el
+middleware alrededor de una app ASGI vacía más el registro de todas las métricas
+de una solicitud, y, para el perfilador, lo que tarda tomar una muestra.
+
+Uso: python tests/bench_metrics.py [--solicitudes 2000] [--rondas 3]
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Costo adicional máximo aceptado por solicitud (mediana), en microsegundos.
+PRESUPUESTO_US = 100
+
+CONFIGURACIONES = {
+    "sin métricas": {"CESFAM_METRICAS": "0"},
+    "métricas": {"CESFAM_METRICAS": "1"},
+    # Umbral alto: mide el muestreo continuo sin escribir archivos.
+    "métricas + perfilador": {"CESFAM_METRICAS": "1", "CESFAM_PERFILADOR": "1", "CESFAM_PERFILADOR_UMBRAL_MS": "60000"},
+}
+
+PAYLOAD = {
+    "edad": 45,
+    "sexo": "Femenino",
+    "sector": "Norte",
+    "prevision": "Fonasa B",
+    "especialidad": "Medicina General",
+    "dia_semana": "Lunes",
+    "turno": "Mañana",
+    "tiempo_espera_dias": 5,
+    "inasistencias_previas": 0
+}
+
+
+async def latencias_en_proceso(solicitudes):
+    import httpx
+    from src.api.main import app
+
+    latencias = np.empty(solicitudes)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as http:
+            for _ in range(200):  # calentamiento
+                await http.post("/predict", json=PAYLOAD)
+            for i in range(solicitudes):
+                inicio = time.perf_counter()
+                response = await http.post("/predict", json=PAYLOAD)
+                latencias[i] = time.perf_counter() - inicio
+                assert response.status_code == 200, response.text
+    return latencias * 1e6
+
+
+def medir_configuracion(entorno_extra, solicitudes):
+    entorno = {**os.environ, "CESFAM_CACHE_MAX": "0", "CESFAM_VIGILAR_MODELO": "0", **entorno_extra}
+    salida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--interno", "--solicitudes", str(solicitudes)],
+        cwd=PROJECT_ROOT, env=entorno, capture_output=True, text=True, check=True
+    )
+    return np.array(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+
+async def costo_middleware_us(repeticiones=100_000):
+    """Microsegundos que agrega MiddlewareMetricas a una solicitud (incluye registrar latencia y estado)."""
+    from src.api.metrics import MetricasAPI, MiddlewareMetricas
+
+    class Ruta:
+        path = "/predict"
+
+    async def app_vacia(scope, receive, send):
+        scope["route"] = Ruta
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def recibir():
+        return {"type": "http.request"}
+
+    async def enviar(mensaje):
+        pass
+
+    async def medir(app):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            await app({"type": "http", "path": "/predict", "method": "POST"}, recibir, enviar)
+        return time.perf_counter() - inicio
+
+    sin = min([await medir(app_vacia) for _ in range(3)])
+    con = min([await medir(MiddlewareMetricas(app_vacia, MetricasAPI())) for _ in range(3)])
+    return (con - sin) / repeticiones * 1e6
+
+
+def costo_etapas_us(repeticiones=100_000):
+    """Microsegundos que cuesta registrar las etapas y tamaños de una solicitud /predict."""
+    from src.api.metrics import MetricasAPI
+    metricas = MetricasAPI()
+    tiempos = {"tabla": 1e-5, "preprocesamiento": 2e-5, "modelo": 1e-4}
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        metricas.registrar_validacion()
+        metricas.etapas.observar(1e-5, "preparacion")
+        metricas.citas_por_solicitud.observar(1, "/predict")
+        metricas.etapas.observar(1e-5, "cola")
+        metricas.registrar_etapas(tiempos)
+        metricas.citas_por_inferencia.observar(1)
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def costo_muestra_us(muestras=500, intervalo=0.001):
+    """Microsegundos de CPU por muestra del perfilador, con el hilo principal en una pila de varios niveles."""
+    import tempfile
+    from src.api.metrics import PerfiladorMuestreo
+
+    def ocupado(nivel, perfilador):
+        if nivel:
+            return ocupado(nivel - 1, perfilador)
+        while perfilador.muestras_tomadas < muestras:
+            time.sleep(0.0001)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        perfilador = PerfiladorMuestreo(directorio, umbral=60, intervalo=intervalo)
+        perfilador.iniciar()
+        perfilador.solicitud_iniciada()
+        ocupado(40, perfilador)
+        perfilador.solicitud_terminada(0, 0, "bench")
+        perfilador.detener()
+    return perfilador.segundos_cpu / perfilador.muestras_tomadas * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--solicitudes", type=int, default=2000)
+    parser.add_argument("--rondas", type=int, default=3)
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        latencias = asyncio.run(latencias_en_proceso(args.solicitudes))
+        print(json.dumps(latencias.tolist()))
+        sys.exit(0)
+
+    middleware = asyncio.run(costo_middleware_us())
+    etapas = costo_etapas_us()
+    muestra = costo_muestra_us()
+    intervalo_ms = float(CONFIGURACIONES["métricas + perfilador"].get("CESFAM_PERFILADOR_INTERVALO_MS", 5))
+    total = middleware + etapas
+    print(f"Costo directo por solicitud: middleware {middleware:.1f} µs + etapas y tamaños {etapas:.1f} µs "
+          f"= {total:.1f} µs {'✅' if total <= PRESUPUESTO_US else '⚠️'} (presupuesto {PRESUPUESTO_US} µs)")
+    print(f"Perfilador: {muestra:.0f} µs por muestra; con una muestra cada {intervalo_ms:g} ms ocupa "
+          f"~{muestra / (intervalo_ms * 10):.1f}% de la CPU mientras hay solicitudes en curso.")
+
+    latencias = {nombre: [] for nombre in CONFIGURACIONES}
+    for ronda in range(args.rondas):
+        for nombre, entorno in CONFIGURACIONES.items():
+            latencias[nombre].append(medir_configuracion(entorno, args.solicitudes))
+
+    print(f"\n/predict, {args.rondas} x {args.solicitudes:,} solicitudes secuenciales por configuración, sin cache:")
+    print(f"{'configuración':>24} {'p50':>9} {'p50 por ronda':>22} {'p99':>9} {'diferencia p50':>15}")
+    base = np.median(np.concatenate(latencias["sin métricas"]))
+    for nombre, series in latencias.items():
+        lat = np.concatenate(series)
+        p50 = np.median(lat)
+        rondas = ", ".join(f"{np.median(s):.0f}" for s in series)
+        print(f"{nombre:>24} {p50:>7.0f}µs {rondas:>22} {np.percentile(lat, 99):>7.0f}µs {p50 - base:>+13.0f}µs")
@@ -0,0 +1,51 @@
+"""Benchmark de la búsqueda de hiperparámetros (train.py --buscar).
+
+Mide el tiempo total de HalvingRandomSearchCV sobre un dataset sintético con
+1, 2, ... hasta todos los núcleos (n_jobs) y, con un solo proceso, el efecto
+del cache del preprocesamiento (Pipeline(memory=...)).
+
+Uso: python tests/bench_search.py [filas] [backend]
+"""
+import sys
+import os
+import io
+import time
+import tempfile
+import contextlib
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.modeling.train import buscar_hiperparametros
+
+
+def medir(datos, backend, n_jobs, cachear, tmp):
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = buscar_hiperparametros(
+            backend, n_candidatos=32, folds=5, n_jobs=n_jobs, datos=datos, cachear=cachear,
+            model_path=os.path.join(tmp, "modelo.pkl"), leaderboard_path=os.path.join(tmp, "leaderboard.csv"),
+        )
+    return time.perf_counter() - inicio, resultado["roc_auc_cv"]
+
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    backend = sys.argv[2] if len(sys.argv) > 2 else 'gbm'
+    df = generar_registros_cesfam(filas, start_id=1, rng=np.random.default_rng(42))
+    X, y = df.drop(columns=['paciente_id', 'target_no_asiste']), df['target_no_asiste']
+    datos = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    nucleos = os.cpu_count()
+    print(f"{filas:,} filas, backend {backend}, {nucleos} núcleos")
+    print(f"{'n_jobs':>7} {'cache':>6} {'tiempo (s)':>11} {'aceleración':>12} {'ROC-AUC cv':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        base = None
+        for n_jobs in sorted({1, 2, 4, 8, nucleos} & set(range(1, nucleos + 1))):
+            segundos, auc = medir(datos, backend, n_jobs, True, tmp)
+            base = base or segundos
+            print(f"{n_jobs:>7} {'sí':>6} {segundos:>11.1f} {base / segundos:>11.2f}x {auc:>11.4f}")
+        segundos, auc = medir(datos, backend, 1, False, tmp)
+        print(f"{1:>7} {'no':>6} {segundos:>11.1f} {base / segundos:>11.2f}x {auc:>11.4f}")
@@ -0,0 +1,122 @@
+"""Benchmark del preprocesamiento denso vs disperso al crecer las categorías.
+
+Simula la incorporación de cientos o miles de especialidades y CESFAM: cada
+valor de 'especialidad' y 'sector' se divide en variantes con una distribución
+sesgada (pocas muy frecuentes y una cola larga de raras), hasta llegar a la
+cardinalidad pedida por variable. Para cada cardinalidad y codificación mide:
+
+- tiempo de fit_transform del preprocesamiento;
+- tamaño de la matriz resultante y pico de memoria (tracemalloc) al construirla;
+- tiempo y pico de memoria de ajustar el GradientBoosting de train.py;
+- ROC-AUC sobre un 20% de prueba.
+
+La versión densa se omite cuando su matriz superaría --max-densa-mb.
+
+Uso: python tests/bench_sparse.py [--filas 200000] [--filas-ajuste 50000] [--cardinalidades 6,100,1000,10000]
+"""
+import sys
+import os
+import time
+import argparse
+import tracemalloc
+import numpy as np
+from scipy import sparse
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.modeling.pipeline import NUMERIC_FEATURES
+from src.modeling.train import construir_pipeline
+
+COLUMNAS_AMPLIADAS = ['especialidad', 'sector']
+CODIFICACIONES = {
+    "densa": {},
+    "dispersa": {"disperso": True},
+    "dispersa + min_frec 0.1%": {"disperso": True, "min_frecuencia": 0.001},
+    "hashing 1024": {"n_hash": 1024},
+}
+
+
+def ampliar_categorias(X, cardinalidad, rng):
+    """Divide cada categoría de COLUMNAS_AMPLIADAS en variantes hasta `cardinalidad` valores por columna."""
+    X = X.copy()
+    for columna in COLUMNAS_AMPLIADAS:
+        base = X[columna].astype(str)
+        variantes = max(1, cardinalidad // base.nunique())
+        if variantes == 1:
+            continue
+        # u**3 concentra las citas en las primeras variantes y deja una cola de categorías raras.
+        indice = np.floor(variantes * rng.random(len(X)) ** 3).astype(np.int64)
+        X[columna] = base + "_" + indice.astype(str)
+    return X
+
+
+def medir_memoria(funcion):
+    """(resultado, segundos, pico en MB) de `funcion` bajo tracemalloc."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    tracemalloc.stop()
+    return resultado, segundos, pico
+
+
+def tamano_mb(matriz):
+    if sparse.issparse(matriz):
+        matriz = matriz.tocsr()
+        return (matriz.data.nbytes + matriz.indices.nbytes + matriz.indptr.nbytes) / 1024 ** 2
+    return matriz.nbytes / 1024 ** 2
+
+
+def medir(codificacion, X_train, y_train, X_test, y_test, filas_ajuste):
+    pipeline = construir_pipeline('gbm', **codificacion)
+    preprocesador = pipeline.named_steps['preprocessor']
+
+    inicio = time.perf_counter()
+    matriz = preprocesador.fit_transform(X_train)
+    transformar = time.perf_counter() - inicio
+    columnas, tamano = matriz.shape[1], tamano_mb(matriz)
+    del matriz
+    _, _, pico_transformar = medir_memoria(lambda: preprocesador.fit_transform(X_train))
+
+    _, ajuste, pico_ajuste = medir_memoria(lambda: pipeline.fit(X_train.head(filas_ajuste), y_train.head(filas_ajuste)))
+    auc = roc_auc_score(y_test, pipeline.predict_proba(X_test)[:, 1])
+    return {"columnas": columnas, "transformar_s": transformar, "matriz_mb": tamano,
+            "pico_transformar_mb": pico_transformar, "ajuste_s": ajuste, "pico_ajuste_mb": pico_ajuste, "roc_auc": auc}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--filas-ajuste", type=int, default=50_000,
+                        help="Filas con que se ajusta el GradientBoosting (el preprocesamiento usa todas)")
+    parser.add_argument("--cardinalidades", default="6,100,1000,10000")
+    parser.add_argument("--max-densa-mb", type=float, default=2000)
+    args = parser.parse_args()
+
+    df = generar_registros_cesfam(args.filas, start_id=1, rng=np.random.default_rng(42))
+    X_base = df.drop(columns=['paciente_id', 'target_no_asiste'])
+    y = df['target_no_asiste']
+    del df
+
+    print(f"{args.filas:,} citas; GradientBoosting ajustado con {args.filas_ajuste:,}.")
+    print(f"{'categorías':>10} {'codificación':>26} {'columnas':>9} {'transformar':>12} {'matriz':>10} "
+          f"{'pico transf.':>13} {'ajuste':>9} {'pico ajuste':>12} {'ROC-AUC':>8}")
+    for cardinalidad in [int(c) for c in args.cardinalidades.split(",")]:
+        X = ampliar_categorias(X_base, cardinalidad, np.random.default_rng(0))
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        reales = max(X[c].nunique() for c in COLUMNAS_AMPLIADAS)
+        for nombre, codificacion in CODIFICACIONES.items():
+            if not codificacion:
+                columnas_densa = len(NUMERIC_FEATURES) + sum(X_train[c].nunique() for c in X_train.columns
+                                                            if c not in NUMERIC_FEATURES)
+                estimado = len(X_train) * columnas_densa * 8 / 1024 ** 2
+                if estimado > args.max_densa_mb:
+                    print(f"{reales:>10,} {nombre:>26} {columnas_densa:>9,} (omitido: la matriz densa ocuparía {estimado:,.0f} MB)")
+                    continue
+            r = medir(codificacion, X_train, y_train, X_test, y_test, args.filas_ajuste)
+            print(f"{reales:>10,} {nombre:>26} {r['columnas']:>9,} {r['transformar_s']:>11.2f}s {r['matriz_mb']:>8.1f}MB "
+                  f"{r['pico_transformar_mb']:>11.1f}MB {r['ajuste_s']:>8.1f}s {r['pico_ajuste_mb']:>10.1f}MB {r['roc_auc']:>8.4f}")
@@ -0,0 +1,78 @@
+"""Benchmark de arranque de la API con varios workers de uvicorn.
+
+Levanta `uvicorn src.api.main:app --workers N` con distintas configuraciones de carga
+(con y sin mmap, carga en startup o diferida, modelo compacto), espera a que cada worker informe que
+está listo y reporta por worker el tiempo hasta listo, el RSS y el PSS (memoria
+proporcional, que descuenta las páginas compartidas entre procesos).
+
+Uso: python tests/bench_startup.py [workers]
+"""
+import sys
+import os
+import re
+import time
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PATRON_LISTO = re.compile(r"pid (\d+), listo en ([\d.]+) s, RSS ([\d.]+) MB")
+PATRON_INICIO_WORKER = re.compile(r"Started server process \[(\d+)\]")
+
+CONFIGURACIONES = {
+    "startup sin mmap": {"CESFAM_CARGA_MODELO": "startup", "CESFAM_MODEL_MMAP": "", "CESFAM_MODELO_COMPACTO": "0"},
+    "startup con mmap": {"CESFAM_CARGA_MODELO": "startup", "CESFAM_MODEL_MMAP": "r", "CESFAM_MODELO_COMPACTO": "0"},
+    "background con mmap": {"CESFAM_CARGA_MODELO": "background", "CESFAM_MODEL_MMAP": "r", "CESFAM_MODELO_COMPACTO": "0"},
+    # Requiere haber ejecutado src/modeling/export_model.py.
+    "startup modelo compacto": {"CESFAM_CARGA_MODELO": "startup", "CESFAM_MODELO_COMPACTO": "1"},
+}
+
+
+def pss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for linea in f:
+                if linea.startswith("Pss:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def medir(nombre, entorno_extra, workers, puerto, timeout=60):
+    entorno = dict(os.environ, PYTHONUNBUFFERED="1", **entorno_extra)
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app", "--port", str(puerto),
+         "--workers", str(workers), "--log-level", "info"],
+        cwd=PROJECT_ROOT, env=entorno, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    listos, iniciados = {}, {}
+    try:
+        while len(listos) < workers and time.perf_counter() - inicio < timeout:
+            linea = proceso.stdout.readline()
+            if not linea:
+                break
+            ahora = time.perf_counter() - inicio
+            if m := PATRON_INICIO_WORKER.search(linea):
+                iniciados[int(m.group(1))] = ahora
+            if m := PATRON_LISTO.search(linea):
+                listos[int(m.group(1))] = (float(m.group(2)), float(m.group(3)), ahora)
+
+        print(f"\n{nombre} ({workers} workers)")
+        print(f"{'pid':>8} {'proceso arriba (s)':>19} {'import→listo (s)':>17} {'RSS (MB)':>9} {'PSS (MB)':>9}")
+        for pid, (segundos_listo, rss, _) in sorted(listos.items()):
+            arriba = iniciados.get(pid, float("nan"))
+            print(f"{pid:>8} {arriba:>19.2f} {segundos_listo:>17.2f} {rss:>9.1f} {pss_mb(pid):>9.1f}")
+        if len(listos) < workers:
+            print(f"  ⚠️ Solo {len(listos)} de {workers} workers informaron estar listos.")
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+
+
+def main(workers=2):
+    for i, (nombre, entorno) in enumerate(CONFIGURACIONES.items()):
+        medir(nombre, entorno, workers, puerto=8100 + i)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2)
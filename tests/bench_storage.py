@@ -0,0 +1,85 @@
+"""Benchmark de carga del dataset de citas: CSV vs Parquet, completo y por columnas.
+
+Genera datasets sintéticos de 1M y 10M filas en un directorio temporal, en CSV y en
+Parquet, y mide cada forma de lectura en un proceso aparte (tiempo de carga, pico
+de RSS del proceso, RSS tras los imports y memoria del DataFrame resultante).
+
+Uso: python tests/bench_storage.py [filas ...]
+"""
+import sys
+import os
+import json
+import time
+import tempfile
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+LECTURAS = {
+    "CSV pd.read_csv (antes)": "pd.read_csv(csv_path)",
+    "CSV leer_citas (fallback)": "storage.leer_citas(csv_path=csv_path, ruta=ruta + '_no_existe')",
+    "Parquet leer_citas": "storage.leer_citas(csv_path=csv_path, ruta=ruta)",
+    "Parquet 2 columnas": "storage.leer_citas(['especialidad', 'target_no_asiste'], csv_path=csv_path, ruta=ruta)",
+}
+
+PLANTILLA = """
+import sys, os, time, json
+sys.path.insert(0, {raiz!r})
+import pandas as pd
+from src.data_prep import storage
+csv_path, ruta = {csv!r}, {ruta!r}
+base = int(open("/proc/self/statm").read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+inicio = time.perf_counter()
+df = {lectura}
+segundos = time.perf_counter() - inicio
+pico = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmHWM:"))
+print(json.dumps({{"segundos": segundos, "base_mb": base, "pico_mb": pico / 1024,
+                  "df_mb": df.memory_usage(deep=True).sum() / 2**20, "filas": len(df)}}))
+"""
+
+
+def preparar(filas, directorio, bloque=1_000_000):
+    from src.data_prep import storage
+    from src.data_prep.data_generator import generar_registros_cesfam
+
+    csv_path = os.path.join(directorio, f"citas_{filas}.csv")
+    ruta = os.path.join(directorio, f"citas_{filas}")
+    generadas = 0
+    while generadas < filas:
+        n = min(bloque, filas - generadas)
+        lote = generar_registros_cesfam(n, start_id=generadas + 1)
+        if generadas == 0:
+            storage.reiniciar_citas(lote, csv_path=csv_path, ruta=ruta)
+        else:
+            # Bloques grandes: se agregan como partes sin pasar por la compactación.
+            lote.to_csv(csv_path, mode='a', header=False, index=False)
+            storage.escribir_parte(lote, ruta)
+        generadas += n
+    tamano_parquet = sum(os.path.getsize(os.path.join(ruta, a)) for a in os.listdir(ruta))
+    return csv_path, ruta, os.path.getsize(csv_path) / 2**20, tamano_parquet / 2**20
+
+
+def medir(lectura, csv_path, ruta):
+    codigo = PLANTILLA.format(raiz=PROJECT_ROOT, csv=csv_path, ruta=ruta, lectura=lectura)
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main(tamanos=(1_000_000, 10_000_000)):
+    with tempfile.TemporaryDirectory() as directorio:
+        for filas in tamanos:
+            inicio = time.perf_counter()
+            csv_path, ruta, csv_mb, parquet_mb = preparar(filas, directorio)
+            print(f"\n{filas:,} filas (generadas en {time.perf_counter() - inicio:.1f} s) | "
+                  f"CSV {csv_mb:.1f} MB | Parquet {parquet_mb:.1f} MB")
+            print(f"{'lectura':<28} {'tiempo (s)':>11} {'RSS base (MB)':>14} {'pico RSS (MB)':>14} {'DataFrame (MB)':>15}")
+            for nombre, lectura in LECTURAS.items():
+                r = medir(lectura, csv_path, ruta)
+                print(f"{nombre:<28} {r['segundos']:>11.2f} {r['base_mb']:>14.1f} {r['pico_mb']:>14.1f} {r['df_mb']:>15.1f}")
+            os.remove(csv_path)
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or (1_000_000, 10_000_000))
@@ -0,0 +1,83 @@
+"""Benchmark de los backends de entrenamiento (gbm vs hgb).
+
+Para cada tamaño entrena ambos pipelines de train.py con el 80% de un dataset
+sintético y mide: tiempo de ajuste, latencia de inferencia de una cita (p50
+de predict_proba con un DataFrame de una fila, como la API sin modelo
+compilado) y de un lote de 1000 citas, tamaño del modelo serializado con
+joblib y ROC-AUC sobre el 20% restante.
+
+El GradientBoosting exacto es lento con millones de filas; --max-filas-gbm
+permite medirlo solo hasta cierto tamaño.
+
+Uso: python tests/bench_training.py [--filas 15000,1000000,10000000] [--max-filas-gbm N]
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+import joblib
+import numpy as np
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.modeling.train import construir_pipeline, BACKENDS
+
+
+def latencia_ms(pipeline, X, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        pipeline.predict_proba(X.iloc[[i % len(X)]] if repeticiones > 1 else X)
+        tiempos.append(time.perf_counter() - inicio)
+    return float(np.median(tiempos) * 1000)
+
+
+def medir(backend, X_train, y_train, X_test, y_test):
+    pipeline = construir_pipeline(backend)
+    inicio = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    ajuste = time.perf_counter() - inicio
+
+    auc = roc_auc_score(y_test, pipeline.predict_proba(X_test)[:, 1])
+    # Las filas de la API llegan como texto, no como categorías de pandas.
+    filas = X_test.head(1000).astype({c: str for c in X_test.select_dtypes('category').columns})
+    una = latencia_ms(pipeline, filas, 200)
+    inicio = time.perf_counter()
+    pipeline.predict_proba(filas)
+    lote = (time.perf_counter() - inicio) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "modelo.pkl")
+        joblib.dump(pipeline, ruta)
+        tamano = os.path.getsize(ruta) / 1024
+
+    return {"ajuste_s": ajuste, "una_cita_ms": una, "lote_1000_ms": lote, "tamano_kb": tamano, "roc_auc": auc}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", default="15000,1000000,10000000")
+    parser.add_argument("--max-filas-gbm", type=int, default=None)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    args = parser.parse_args()
+
+    print(f"Núcleos disponibles: {os.cpu_count()}")
+    print(f"{'filas':>12} {'backend':>8} {'ajuste':>10} {'1 cita':>9} {'1000 citas':>11} {'tamaño':>10} {'ROC-AUC':>8}")
+    for n in [int(f) for f in args.filas.split(",")]:
+        df = generar_registros_cesfam(n, start_id=1, rng=np.random.default_rng(42))
+        X = df.drop(columns=['paciente_id', 'target_no_asiste'])
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, df['target_no_asiste'], test_size=0.2, random_state=42, stratify=df['target_no_asiste']
+        )
+        del df, X
+        for backend in args.backends.split(","):
+            if backend == 'gbm' and args.max_filas_gbm is not None and n > args.max_filas_gbm:
+                print(f"{n:>12,} {backend:>8} {'(omitido)':>10}")
+                continue
+            r = medir(backend, X_train, y_train, X_test, y_test)
+            print(f"{n:>12,} {backend:>8} {r['ajuste_s']:>9.1f}s {r['una_cita_ms']:>7.2f}ms "
+                  f"{r['lote_1000_ms']:>9.1f}ms {r['tamano_kb']:>8.0f}KB {r['roc_auc']:>8.4f}")
@@ -0,0 +1,123 @@
+"""Prueba de carga de /predict con y sin micro-batching a 1, 10 y 100 clientes concurrentes.
+
+Por defecto levanta la API en el mismo proceso (transporte ASGI de httpx), de modo
+que no hace falta un servidor corriendo. Con --url se mide contra una API externa;
+en ese caso el modo de micro-batching lo define la configuración del servidor.
+
+Uso: python tests/load_test_predict.py [--solicitudes 2000] [--clientes 1 10 100] [--pipeline] [--cache] [--url URL]
+"""
+import sys
+import os
+import time
+import asyncio
+import argparse
+import warnings
+import numpy as np
+import httpx
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PAYLOAD = {
+    "edad": 45,
+    "sexo": "Femenino",
+    "sector": "Norte",
+    "prevision": "Fonasa B",
+    "especialidad": "Medicina General",
+    "dia_semana": "Lunes",
+    "turno": "Mañana",
+    "tiempo_espera_dias": 5,
+    "inasistencias_previas": 0
+}
+
+
+async def cliente(http, n_solicitudes, latencias, errores):
+    for _ in range(n_solicitudes):
+        inicio = time.perf_counter()
+        response = await http.post("/predict", json=PAYLOAD)
+        latencias.append(time.perf_counter() - inicio)
+        if response.status_code != 200:
+            errores.append(response.status_code)
+
+
+async def medir(http, total, concurrencia):
+    latencias, errores = [], []
+    por_cliente = max(1, total // concurrencia)
+    inicio = time.perf_counter()
+    await asyncio.gather(*[cliente(http, por_cliente, latencias, errores) for _ in range(concurrencia)])
+    duracion = time.perf_counter() - inicio
+    lat_ms = np.array(latencias) * 1000
+    return {
+        "rps": len(latencias) / duracion,
+        "p50": np.percentile(lat_ms, 50),
+        "p99": np.percentile(lat_ms, 99),
+        "errores": len(errores),
+    }
+
+
+async def ejecutar_en_proceso(microbatch, total, clientes):
+    from src.api import config
+    config.MICROBATCH = microbatch
+    # Con 100 clientes la cola por defecto podría rechazar solicitudes; aquí interesa el throughput.
+    config.EJECUTOR_MAX_COLA = max(config.EJECUTOR_MAX_COLA, max(clientes))
+    from src.api.main import app
+
+    resultados = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as http:
+            await medir(http, 50, 1)  # calentamiento
+            for concurrencia in clientes:
+                resultados[concurrencia] = await medir(http, total, concurrencia)
+    return resultados
+
+
+async def ejecutar_remoto(url, total, clientes):
+    resultados = {}
+    limites = httpx.Limits(max_connections=max(clientes))
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as http:
+        await medir(http, 50, 1)
+        for concurrencia in clientes:
+            resultados[concurrencia] = await medir(http, total, concurrencia)
+    return resultados
+
+
+def imprimir(titulo, resultados):
+    print(f"\n{titulo}")
+    print(f"{'clientes':>9} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errores':>8}")
+    for concurrencia, r in resultados.items():
+        print(f"{concurrencia:>9} {r['rps']:>10.1f} {r['p50']:>10.2f} {r['p99']:>10.2f} {r['errores']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--solicitudes", type=int, default=2000, help="Solicitudes por nivel de concurrencia")
+    parser.add_argument("--clientes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--pipeline", action="store_true", help="Desactiva la inferencia compilada (mide el pipeline de sklearn)")
+    parser.add_argument("--cache", action="store_true", help="Mantiene activo el cache de predicciones")
+    parser.add_argument("--url", default=None, help="URL de una API ya levantada, p. ej. http://127.0.0.1:8000")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    if args.url:
+        imprimir(f"API externa {args.url}", asyncio.run(ejecutar_remoto(args.url, args.solicitudes, args.clientes)))
+        return
+
+    from src.api import config
+    if args.pipeline:
+        config.INFERENCIA_COMPILADA = False
+    if not args.cache:
+        # Todas las solicitudes usan la misma cita: con cache se mediría solo el cache.
+        config.CACHE_MAX_ENTRADAS = 0
+
+    sin = asyncio.run(ejecutar_en_proceso(False, args.solicitudes, args.clientes))
+    con = asyncio.run(ejecutar_en_proceso(True, args.solicitudes, args.clientes))
+    imprimir("Sin micro-batching", sin)
+    imprimir(f"Con micro-batching (ventana {config.MICROBATCH_VENTANA_MS} ms, máx. {config.MICROBATCH_MAX})", con)
+
+    print(f"\n{'clientes':>9} {'ganancia throughput':>20}")
+    for concurrencia in args.clientes:
+        print(f"{concurrencia:>9} {con[concurrencia]['rps'] / sin[concurrencia]['rps']:>19.2f}x")
+
+
+if __name__ == "__main__":
+    main()
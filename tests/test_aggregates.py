@@ -0,0 +1,77 @@
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.dashboard.aggregates import AgregadosEDA, SeguidorAgregados, COLUMNAS_CORRELACION
+from src.data_prep.data_generator import generar_registros_cesfam
+
+
+def test_incremental_aggregates_match_full_recomputation():
+
+    df = generar_registros_cesfam(3000, start_id=1)
+    agregados = AgregadosEDA()
+    for inicio in range(0, len(df), 250):
+        agregados.actualizar(df.iloc[inicio:inicio + 250])
+
+    assert agregados.total == len(df)
+    assert np.isclose(agregados.tasa_no_show(), df['target_no_asiste'].mean())
+
+    esperadas = df.groupby('especialidad')['target_no_asiste'].mean()
+    tasas = agregados.tasas_por_especialidad()
+    assert np.allclose(tasas[esperadas.index], esperadas)
+
+    assert agregados.hist_edad.sum() == len(df)
+    assert np.allclose(agregados.correlacion(), df[COLUMNAS_CORRELACION].corr(), atol=1e-9)
+
+def test_partial_aggregates_merge_in_any_order():
+
+    df = generar_registros_cesfam(2000, start_id=1)
+    lotes = [df.iloc[i:i + 300] for i in range(0, len(df), 300)]
+
+    secuencial = AgregadosEDA()
+    for lote in lotes:
+        secuencial.actualizar(lote)
+
+    # Como si cada lote se hubiera agregado en otro proceso y se combinaran al final.
+    parciales = [AgregadosEDA.desde_lote(lote) for lote in reversed(lotes)]
+    combinado = AgregadosEDA()
+    for parcial in parciales:
+        combinado.combinar(parcial)
+
+    assert combinado.total == secuencial.total
+    assert combinado.por_categoria['sector'].conteos == secuencial.por_categoria['sector'].conteos
+    assert np.array_equal(combinado.hist_edad, secuencial.hist_edad)
+    assert np.allclose(combinado.correlacion(), secuencial.correlacion(), atol=1e-12)
+
+def test_covariance_is_stable_with_large_ids():
+
+    # Con sumas de productos, la varianza de ids del orden de 1e9 pierde todos sus dígitos.
+    df = generar_registros_cesfam(5000, start_id=1_000_000_000)
+    agregados = AgregadosEDA()
+    for inicio in range(0, len(df), 500):
+        agregados.actualizar(df.iloc[inicio:inicio + 500])
+
+    assert np.allclose(agregados.correlacion(), df[COLUMNAS_CORRELACION].corr(), atol=1e-9)
+
+def test_follower_skips_unchanged_file_and_publishes_new_snapshots(tmp_path):
+
+    ruta = str(tmp_path / "citas.csv")
+    generar_registros_cesfam(200, start_id=1).to_csv(ruta, index=False)
+    seguidor = SeguidorAgregados(ruta)
+
+    primeros, clave = seguidor.actualizar()
+    assert primeros.total == 200
+
+    mismos, misma_clave = seguidor.actualizar()
+    assert mismos is primeros and misma_clave == clave
+    assert seguidor.tiempos["filas_nuevas"] == 0
+
+    generar_registros_cesfam(50, start_id=201).to_csv(ruta, mode='a', header=False, index=False)
+    nuevos, nueva_clave = seguidor.actualizar()
+
+    assert nueva_clave != clave
+    assert nuevos.total == 250
+    # El agregado publicado antes no se modifica: quien lo esté graficando no ve cambios a medias.
+    assert primeros.total == 200
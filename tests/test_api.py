@@ -1,5 +1,6 @@
 import sys
 import os
+import subprocess
 from fastapi.testclient import TestClient
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -54,4 +55,201 @@ def test_predict_endpoint_high_risk():
 
     with TestClient(app) as client:
         response = client.post("/predict", json=payload)
-        assert response.status_code == 200
\ No newline at end of file
+        assert response.status_code == 200
+
+
+def test_predict_batch_preserves_order():
+
+    payload_bajo = {
+        "edad": 70,
+        "sexo": "Femenino",
+        "sector": "Norte",
+        "prevision": "Fonasa B",
+        "especialidad": "Medicina General",
+        "dia_semana": "Lunes",
+        "turno": "Mañana",
+        "tiempo_espera_dias": 2,
+        "inasistencias_previas": 0
+    }
+    payload_alto = {
+        "edad": 25,
+        "sexo": "Masculino",
+        "sector": "Centro",
+        "prevision": "Fonasa A",
+        "especialidad": "Dental",
+        "dia_semana": "Viernes",
+        "turno": "Tarde",
+        "tiempo_espera_dias": 30,
+        "inasistencias_previas": 10
+    }
+    citas = [payload_bajo, payload_alto, payload_bajo]
+
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", json={"citas": citas})
+        assert response.status_code == 200, f"Error: {response.text}"
+        data = response.json()
+        assert data["total"] == 3
+        assert "tiempo_ms" in data
+
+        for cita, resultado in zip(citas, data["resultados"]):
+            individual = client.post("/predict", json=cita).json()
+            assert resultado["prediccion"] == individual["prediccion"]
+            assert resultado["probabilidad"] == individual["probabilidad"]
+
+def test_predict_batch_rejects_oversized_batch(monkeypatch):
+
+    from src.api import config
+    monkeypatch.setattr(config, "MAX_BATCH_SIZE", 2)
+
+    payload = {
+        "edad": 30,
+        "sexo": "Femenino",
+        "sector": "Norte",
+        "prevision": "Fonasa B",
+        "especialidad": "Medicina General",
+        "dia_semana": "Lunes",
+        "turno": "Mañana",
+        "tiempo_espera_dias": 5,
+        "inasistencias_previas": 0
+    }
+
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", json={"citas": [payload] * 3})
+        assert response.status_code == 413
+
+def test_predict_uses_configured_threshold(monkeypatch):
+
+    from src.api import config
+
+    payload = {
+        "edad": 30,
+        "sexo": "Femenino",
+        "sector": "Norte",
+        "prevision": "Fonasa B",
+        "especialidad": "Medicina General",
+        "dia_semana": "Lunes",
+        "turno": "Mañana",
+        "tiempo_espera_dias": 5,
+        "inasistencias_previas": 0
+    }
+
+    with TestClient(app) as client:
+        monkeypatch.setattr(config, "UMBRAL_DECISION", 0.0)
+        data = client.post("/predict", json=payload).json()
+        assert data["umbral"] == 0.0
+        assert data["prediccion"] == 1
+
+        monkeypatch.setattr(config, "UMBRAL_DECISION", 1.01)
+        data = client.post("/predict", json=payload).json()
+        assert data["prediccion"] == 0
+
+def test_stats_reports_executor_metrics():
+
+    with TestClient(app) as client:
+        response = client.get("/stats")
+        assert response.status_code == 200
+        stats = response.json()["inferencia"]
+        assert stats["workers"] >= 1
+        assert "profundidad_cola" in stats
+        assert "espera_media_ms" in stats
+
+def test_repeated_prediction_is_served_from_cache():
+
+    payload = {
+        "edad": 52,
+        "sexo": "Masculino",
+        "sector": "Rural",
+        "prevision": "Fonasa C",
+        "especialidad": "Matrona",
+        "dia_semana": "Jueves",
+        "turno": "Tarde",
+        "tiempo_espera_dias": 12,
+        "inasistencias_previas": 1
+    }
+
+    with TestClient(app) as client:
+        primera = client.post("/predict", json=payload).json()
+        segunda = client.post("/predict", json=payload).json()
+        assert primera == segunda
+
+        stats = client.get("/stats").json()["cache"]
+        assert stats["aciertos"] >= 1
+        assert stats["version_modelo"] is not None
+
+def test_paciente_id_is_optional_and_not_a_model_feature():
+
+    payload = {
+        "edad": 33,
+        "sexo": "Femenino",
+        "sector": "Sur",
+        "prevision": "Fonasa A",
+        "especialidad": "Dental",
+        "dia_semana": "Martes",
+        "turno": "Mañana",
+        "tiempo_espera_dias": 7,
+        "inasistencias_previas": 0
+    }
+
+    with TestClient(app) as client:
+        sin_id = client.post("/predict", json=payload).json()
+        con_id = client.post("/predict", json=dict(payload, paciente_id=123)).json()
+        # El modelo actual no usa historial: el paciente_id no cambia la predicción.
+        assert sin_id == con_id
+
+def test_health_endpoints_report_readiness():
+
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["ready"] is True
+        assert data["rss_mb"] > 0
+
+def test_lazy_mode_loads_model_on_first_request(monkeypatch):
+
+    from src.api import config
+    import src.api.main as api
+
+    monkeypatch.setattr(config, "CARGA_MODELO", "lazy")
+    monkeypatch.setattr(api.gestor, "activo", None)
+
+    payload = {
+        "edad": 30,
+        "sexo": "Femenino",
+        "sector": "Norte",
+        "prevision": "Fonasa B",
+        "especialidad": "Medicina General",
+        "dia_semana": "Lunes",
+        "turno": "Mañana",
+        "tiempo_espera_dias": 5,
+        "inasistencias_previas": 0
+    }
+
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        assert client.get("/health/ready").status_code == 503
+
+        assert client.post("/predict", json=payload).status_code == 200
+        assert client.get("/health/ready").status_code == 200
+
+def test_root_reports_model_version_and_admin_reload():
+
+    with TestClient(app) as client:
+        modelo = client.get("/").json()["modelo"]
+        assert len(modelo["sha256"]) == 64
+        assert modelo["version"] == modelo["sha256"][:12]
+
+        response = client.post("/admin/reload")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["recargado"] is False
+        assert data["modelo"]["version"] == modelo["version"]
+
+def test_importing_the_api_does_not_load_pandas_or_pyarrow():
+
+    raiz = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    codigo = "import sys; import src.api.main; print(sorted(m for m in ('pandas', 'pyarrow') if m in sys.modules))"
+    salida = subprocess.run([sys.executable, "-W", "ignore", "-c", codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    assert salida.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,104 @@
+import sys
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.dashboard.api_client import ClienteAPI, citas_desde_dataframe, resultados_ordenados, CAMPOS_CITA
+
+CITA = {
+    "edad": 45, "sexo": "Femenino", "sector": "Norte", "prevision": "Fonasa B",
+    "especialidad": "Medicina General", "dia_semana": "Lunes", "turno": "Mañana",
+    "tiempo_espera_dias": 5, "inasistencias_previas": 0
+}
+
+
+class ApiFalsa(BaseHTTPRequestHandler):
+    """Responde 503 con Retry-After a las primeras `saturadas` solicitudes y luego como la API."""
+
+    def do_POST(self):
+        servidor = self.server
+        cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        servidor.solicitudes.append((self.path, cuerpo))
+        if servidor.saturadas > 0:
+            servidor.saturadas -= 1
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/predict/batch":
+            respuesta = {"resultados": [
+                {"prediccion": int(c["edad"] > 60), "probabilidad": c["edad"] / 100} for c in cuerpo["citas"]
+            ]}
+        else:
+            respuesta = {"prediccion": 0, "probabilidad": 0.1}
+        datos = json.dumps(respuesta).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_falsa():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), ApiFalsa)
+    servidor.solicitudes, servidor.saturadas = [], 0
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+
+
+def test_retries_when_api_queue_is_full(api_falsa):
+
+    api_falsa.saturadas = 2
+    cliente = ClienteAPI(f"http://127.0.0.1:{api_falsa.server_port}", backoff=0)
+
+    response = cliente.predecir(CITA)
+
+    assert response.status_code == 200
+    assert len(api_falsa.solicitudes) == 3
+
+def test_batch_is_sent_in_chunks_and_keeps_order(api_falsa):
+
+    cliente = ClienteAPI(f"http://127.0.0.1:{api_falsa.server_port}")
+    citas = [dict(CITA, edad=e) for e in range(25)]
+    avances = []
+
+    resultados = cliente.predecir_lote(citas, tamano_bloque=10, al_avanzar=lambda hechas, total: avances.append(hechas))
+
+    assert [r["probabilidad"] for r in resultados] == [e / 100 for e in range(25)]
+    assert [len(c["citas"]) for _, c in api_falsa.solicitudes] == [10, 10, 5]
+    assert avances == [10, 20, 25]
+
+def test_uploaded_csv_is_validated_and_sorted_by_risk():
+
+    agenda = pd.DataFrame([dict(CITA, edad=30), dict(CITA, edad=None), dict(CITA, edad=80)])
+    citas, filas_validas = citas_desde_dataframe(agenda)
+
+    assert len(citas) == 2 and citas[1]["edad"] == 80
+    json.dumps(citas)  # tipos nativos, serializables para la API
+
+    tabla = resultados_ordenados(agenda, filas_validas, [
+        {"prediccion": 0, "probabilidad": 0.2}, {"prediccion": 1, "probabilidad": 0.9}
+    ])
+    assert tabla['edad'].tolist() == [80, 30]
+
+    with pytest.raises(ValueError):
+        citas_desde_dataframe(agenda.drop(columns=[CAMPOS_CITA[0]]))
+
+def test_uploaded_csv_rejects_non_integer_values_instead_of_truncating():
+
+    assert citas_desde_dataframe(pd.DataFrame([dict(CITA, edad=45.0)]))[0][0]["edad"] == 45
+    for valor in (45.7, "cuarenta"):
+        with pytest.raises(ValueError, match="edad"):
+            citas_desde_dataframe(pd.DataFrame([CITA, dict(CITA, edad=valor)]))
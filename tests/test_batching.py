@@ -0,0 +1,45 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.batching import AgrupadorSolicitudes
+
+
+def test_concurrent_requests_are_coalesced_in_order():
+
+    lotes = []
+
+    async def procesar_lote(registros):
+        lotes.append(len(registros))
+        return [r["id"] / 100 for r in registros]
+
+    async def escenario():
+        agrupador = AgrupadorSolicitudes(procesar_lote, ventana_ms=50, max_lote=8)
+        agrupador.iniciar()
+        try:
+            return await asyncio.gather(*[agrupador.enviar({"id": i}) for i in range(10)])
+        finally:
+            await agrupador.detener()
+
+    resultados = asyncio.run(escenario())
+
+    assert resultados == [i / 100 for i in range(10)]
+    assert lotes == [8, 2]
+
+def test_batch_errors_propagate_to_every_caller():
+
+    async def procesar_lote(registros):
+        raise RuntimeError("modelo caído")
+
+    async def escenario():
+        agrupador = AgrupadorSolicitudes(procesar_lote, ventana_ms=5, max_lote=4)
+        agrupador.iniciar()
+        try:
+            return await asyncio.gather(*[agrupador.enviar({"id": i}) for i in range(3)], return_exceptions=True)
+        finally:
+            await agrupador.detener()
+
+    resultados = asyncio.run(escenario())
+    assert all(isinstance(r, RuntimeError) for r in resultados)
@@ -0,0 +1,60 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.cache import CachePredicciones
+
+
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_cache_hits_on_same_registro_regardless_of_key_order():
+
+    cache = CachePredicciones(max_entradas=10)
+    cache.guardar({"edad": 30, "sexo": "Femenino"}, "v1", 0.25)
+
+    assert cache.obtener({"sexo": "Femenino", "edad": 30}, "v1") == 0.25
+    assert cache.obtener({"sexo": "Masculino", "edad": 30}, "v1") is None
+
+    stats = cache.estadisticas()
+    assert stats["aciertos"] == 1
+    assert stats["fallos"] == 1
+
+def test_cache_evicts_least_recently_used():
+
+    cache = CachePredicciones(max_entradas=2)
+    cache.guardar({"id": 1}, "v1", 0.1)
+    cache.guardar({"id": 2}, "v1", 0.2)
+    cache.obtener({"id": 1}, "v1")
+    cache.guardar({"id": 3}, "v1", 0.3)
+
+    assert cache.obtener({"id": 2}, "v1") is None
+    assert cache.obtener({"id": 1}, "v1") == 0.1
+    assert cache.estadisticas()["desalojos"] == 1
+
+def test_cache_entries_expire_after_ttl():
+
+    reloj = RelojFalso()
+    cache = CachePredicciones(max_entradas=10, ttl_segundos=60, reloj=reloj)
+    cache.guardar({"id": 1}, "v1", 0.1)
+
+    reloj.ahora = 59
+    assert cache.obtener({"id": 1}, "v1") == 0.1
+    reloj.ahora = 61
+    assert cache.obtener({"id": 1}, "v1") is None
+    assert cache.estadisticas()["expiradas"] == 1
+
+def test_cache_is_invalidated_when_model_version_changes():
+
+    cache = CachePredicciones(max_entradas=10)
+    cache.guardar({"id": 1}, "v1", 0.1)
+
+    assert cache.obtener({"id": 1}, "v2") is None
+    assert cache.estadisticas()["invalidaciones"] == 1
+    assert cache.estadisticas()["entradas"] == 0
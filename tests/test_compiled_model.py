@@ -0,0 +1,102 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import joblib
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.compiled_model import (
+    ModeloCompilado, compilar_modelo, verificar_paridad, registros_de_verificacion, TOLERANCIA_PROBABILIDAD
+)
+from src.modeling.pipeline import get_preprocessing_pipeline
+from src.modeling.train import construir_pipeline
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.data_prep.historial import HistorialPacientes, HISTORIAL_FEATURES
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'model_pipeline.pkl')
+DATA_PATH = os.path.join(PROJECT_ROOT, 'data', 'raw', 'dataset_cesfam_stream.csv')
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def registros():
+    df = pd.read_csv(DATA_PATH, nrows=2000)
+    return df.drop(columns=['paciente_id', 'target_no_asiste']).to_dict('records')
+
+
+def test_compiled_matches_predict_proba(pipeline, registros):
+
+    compilado = compilar_modelo(pipeline)
+    assert verificar_paridad(pipeline, compilado, registros) <= TOLERANCIA_PROBABILIDAD
+
+def test_compiled_handles_unknown_and_missing_values(pipeline, registros):
+
+    compilado = compilar_modelo(pipeline)
+    raros = [
+        dict(registros[0], sector='Sector_Desconocido_Nuevo'),
+        dict(registros[1], edad=None),
+        dict(registros[2], sexo=None, tiempo_espera_dias=np.nan),
+    ]
+    assert verificar_paridad(pipeline, compilado, raros) <= TOLERANCIA_PROBABILIDAD
+
+def test_verification_records_cover_history_features():
+
+    df = generar_registros_cesfam(3000, start_id=1, rng=np.random.default_rng(4))
+    df['paciente_id'] = np.random.default_rng(5).integers(0, 300, len(df))
+    datos = pd.concat([df, HistorialPacientes().caracteristicas_y_agregar(df)], axis=1)
+    pipeline = construir_pipeline('gbm', historial=True).fit(
+        datos.drop(columns=['paciente_id', 'target_no_asiste']), datos['target_no_asiste']
+    )
+    compilado = compilar_modelo(pipeline)
+    registros = registros_de_verificacion(compilado)
+
+    for feature in HISTORIAL_FEATURES:
+        valores = [r[feature] for r in registros]
+        assert any(v is None for v in valores), feature
+        assert len({v for v in valores if v is not None}) > 5, feature
+    assert any(0 < r['hist_tasa_no_show'] < 1 for r in registros if r['hist_tasa_no_show'] is not None)
+    assert verificar_paridad(pipeline, compilado, registros) <= TOLERANCIA_PROBABILIDAD
+
+def test_compact_artifact_roundtrip_keeps_parity(pipeline, registros, tmp_path):
+
+    ruta = str(tmp_path / "modelo_compacto.npz")
+    compilar_modelo(pipeline).guardar(ruta, "abc123")
+    cargado = ModeloCompilado.cargar(ruta)
+
+    assert cargado.sha256_modelo == "abc123"
+    assert verificar_paridad(pipeline, cargado, registros) <= TOLERANCIA_PROBABILIDAD
+    df = pd.DataFrame(registros)
+    columnas = cargado.predict_proba_transformado(cargado.transformar_columnas(df))
+    assert np.max(np.abs(columnas - pipeline.predict_proba(df)[:, 1])) <= TOLERANCIA_PROBABILIDAD
+
+def test_compact_artifact_rejects_other_format(pipeline, tmp_path, monkeypatch):
+
+    from src.api import compiled_model
+
+    ruta = str(tmp_path / "modelo_compacto.npz")
+    compilar_modelo(pipeline).guardar(ruta, "abc123")
+    monkeypatch.setattr(compiled_model, "FORMATO_COMPACTO", compiled_model.FORMATO_COMPACTO + 1)
+    with pytest.raises(ValueError):
+        ModeloCompilado.cargar(ruta)
+
+def test_compiled_rejects_unsupported_pipeline():
+
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    df = pd.read_csv(DATA_PATH, nrows=200)
+    X = df.drop(columns=['paciente_id', 'target_no_asiste'])
+    modelo = Pipeline([
+        ('preprocessor', get_preprocessing_pipeline()),
+        ('classifier', LogisticRegression())
+    ]).fit(X, df['target_no_asiste'])
+
+    with pytest.raises(ValueError):
+        compilar_modelo(modelo)
@@ -0,0 +1,46 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep import storage
+from src.data_prep.data_generator import generar_registros_cesfam, generar_dataset
+
+
+def test_generated_batch_uses_storage_schema():
+
+    df = generar_registros_cesfam(20000, start_id=1, rng=np.random.default_rng(0))
+
+    assert {c: str(t) for c, t in df.dtypes.items()} == storage.TIPOS_CITAS
+    assert df['paciente_id'].tolist() == list(range(1, 20001))
+    assert df['edad'].between(0, 94).all()
+    assert 0.2 < df['target_no_asiste'].mean() < 0.32
+
+@pytest.mark.skipif(not storage.parquet_disponible(), reason="pyarrow no está instalado")
+def test_sharded_dataset_is_identical_for_any_worker_count(tmp_path):
+
+    un_worker = str(tmp_path / "uno")
+    dos_workers = str(tmp_path / "dos")
+    assert generar_dataset(2500, un_worker, workers=1, filas_por_shard=1000) == 2500
+    generar_dataset(2500, dos_workers, workers=2, filas_por_shard=1000)
+
+    a = storage.leer_citas(ruta=un_worker)
+    b = storage.leer_citas(ruta=dos_workers)
+    assert a['paciente_id'].tolist() == list(range(1, 2501))
+    pd.testing.assert_frame_equal(a, b)
+
+@pytest.mark.skipif(not storage.parquet_disponible(), reason="pyarrow no está instalado")
+def test_generating_over_an_existing_dataset_replaces_it(tmp_path):
+
+    ruta = str(tmp_path / "citas")
+    storage.reiniciar_citas(generar_registros_cesfam(1000, start_id=1), csv_path=str(tmp_path / "citas.csv"), ruta=ruta)
+    storage.agregar_citas(generar_registros_cesfam(500, start_id=1001), csv_path=str(tmp_path / "citas.csv"), ruta=ruta)
+
+    generar_dataset(2500, ruta, workers=1, filas_por_shard=1000)
+
+    ids = storage.leer_citas(['paciente_id'], ruta=ruta)['paciente_id']
+    assert ids.is_unique
+    assert ids.tolist() == list(range(1, 2501))
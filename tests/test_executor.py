@@ -0,0 +1,48 @@
+import sys
+import os
+import asyncio
+import threading
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.executor import EjecutorInferencia, ColaSaturadaError
+
+
+def test_executor_runs_function_and_records_metrics():
+
+    ejecutor = EjecutorInferencia(tipo="thread", workers=2, max_cola=2)
+    try:
+        resultado = asyncio.run(ejecutor.ejecutar(sum, [1, 2, 3]))
+        assert resultado == 6
+
+        stats = ejecutor.estadisticas()
+        assert stats["completadas"] == 1
+        assert stats["rechazadas"] == 0
+        assert stats["profundidad_cola"] == 0
+    finally:
+        ejecutor.cerrar()
+
+def test_executor_rejects_when_saturated():
+
+    ejecutor = EjecutorInferencia(tipo="thread", workers=1, max_cola=1)
+    liberar = threading.Event()
+
+    async def escenario():
+        ocupadas = [asyncio.ensure_future(ejecutor.ejecutar(liberar.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert ejecutor.estadisticas()["profundidad_cola"] == 1
+
+        with pytest.raises(ColaSaturadaError):
+            await ejecutor.ejecutar(liberar.wait, 5)
+
+        liberar.set()
+        await asyncio.gather(*ocupadas)
+
+    try:
+        asyncio.run(escenario())
+        stats = ejecutor.estadisticas()
+        assert stats["rechazadas"] == 1
+        assert stats["completadas"] == 2
+    finally:
+        ejecutor.cerrar()
@@ -0,0 +1,121 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.data_prep.feature_store import (
+    HistorialPacientes, HistorialVigente, HISTORIAL_FEATURES, actualizar_historial, completar_registros
+)
+
+
+def citas_con_pacientes_repetidos(n, pacientes, seed):
+    df = generar_registros_cesfam(n, start_id=1, rng=np.random.default_rng(seed))
+    df['paciente_id'] = np.random.default_rng(seed + 1).integers(0, pacientes, n)
+    return df
+
+
+def features_por_fuerza_bruta(df):
+    filas = []
+    for i in range(len(df)):
+        previas = df.iloc[:i]
+        mismo = previas['paciente_id'] == df['paciente_id'].iloc[i]
+        misma_especialidad = mismo & (previas['especialidad'] == df['especialidad'].iloc[i])
+        tasa = previas.loc[mismo, 'target_no_asiste'].mean() if mismo.any() else np.nan
+        filas.append((mismo.sum(), tasa, misma_especialidad.sum()))
+    return np.array(filas, dtype=float)
+
+
+def test_training_features_only_use_earlier_appointments():
+
+    df = citas_con_pacientes_repetidos(1500, 200, 0)
+    historial = HistorialPacientes()
+    features = pd.concat([historial.caracteristicas_y_agregar(df.iloc[i:i + 400]) for i in range(0, len(df), 400)])
+
+    assert list(features.columns) == HISTORIAL_FEATURES
+    np.testing.assert_allclose(features.to_numpy(dtype=float), features_por_fuerza_bruta(df), equal_nan=True)
+
+def test_serving_lookup_matches_next_training_row(tmp_path):
+
+    df = citas_con_pacientes_repetidos(1000, 50, 1)
+    historial = HistorialPacientes()
+    historial.caracteristicas_y_agregar(df.iloc[:-1])
+    ruta = str(tmp_path / "historial.npz")
+    historial.guardar(ruta)
+
+    siguiente = df.iloc[[-1]]
+    registro = siguiente.drop(columns=['target_no_asiste']).to_dict('records')[0]
+    servido = completar_registros([registro], HistorialPacientes.cargar(ruta))[0]
+    entrenado = historial.caracteristicas_y_agregar(siguiente).iloc[0]
+
+    assert 'paciente_id' not in servido
+    for feature in HISTORIAL_FEATURES:
+        assert servido[feature] == pytest.approx(entrenado[feature], nan_ok=True)
+
+def test_unknown_patient_has_empty_history_and_missing_id_is_imputed():
+
+    historial = HistorialPacientes()
+    registro = generar_registros_cesfam(1, start_id=1).drop(columns=['target_no_asiste']).to_dict('records')[0]
+
+    nuevo, sin_id = completar_registros([registro, dict(registro, paciente_id=None)], historial)
+    assert (nuevo['hist_citas'], nuevo['hist_tasa_no_show'], nuevo['hist_citas_especialidad']) == (0, None, 0)
+    assert all(sin_id[f] is None for f in HISTORIAL_FEATURES)
+
+def test_incremental_update_from_csv_matches_full_build(tmp_path):
+
+    df = citas_con_pacientes_repetidos(3000, 300, 2)
+    csv = str(tmp_path / "citas.csv")
+    ruta = str(tmp_path / "historial.npz")
+    df.iloc[:1000].to_csv(csv, index=False)
+    assert actualizar_historial(csv, ruta)[1] == 1000
+    df.iloc[1000:].to_csv(csv, mode='a', header=False, index=False)
+    incremental, nuevas = actualizar_historial(csv, ruta)
+
+    completo = HistorialPacientes()
+    completo.agregar(df)
+    ids = df['paciente_id'].to_numpy()
+    assert nuevas == 2000 and incremental.citas == 3000
+    for feature, valores in completo.caracteristicas(ids, df['especialidad']).items():
+        np.testing.assert_array_equal(HistorialPacientes.cargar(ruta).caracteristicas(ids, df['especialidad'])[feature], valores)
+
+    # Una siembra nueva reemplaza el CSV: el historial se reconstruye desde cero.
+    df.iloc[:10].to_csv(csv, index=False)
+    assert actualizar_historial(csv, ruta)[0].citas == 10
+
+def test_watched_history_reloads_in_background_without_blocking_readers(tmp_path, monkeypatch):
+
+    import time
+    from src.data_prep import historial as modulo
+    ruta = str(tmp_path / "historial.npz")
+    df = citas_con_pacientes_repetidos(200, 20, 3)
+    primero = HistorialPacientes()
+    primero.agregar(df.iloc[:100])
+    primero.guardar(ruta)
+
+    vigente = HistorialVigente(ruta, intervalo=0.01)
+    vigente.iniciar_vigilancia()
+    try:
+        while vigente.actual() is None:
+            time.sleep(0.01)
+        assert vigente.actual().citas == 100
+
+        cargar = modulo.HistorialPacientes.cargar
+        def cargar_lento(ruta):
+            time.sleep(0.3)
+            return cargar(ruta)
+        monkeypatch.setattr(modulo.HistorialPacientes, "cargar", staticmethod(cargar_lento))
+        primero.agregar(df.iloc[100:])
+        primero.guardar(ruta)
+
+        # Mientras se carga el archivo nuevo, las consultas devuelven el anterior sin esperar.
+        inicio = time.perf_counter()
+        assert vigente.actual().citas == 100
+        assert time.perf_counter() - inicio < 0.05
+        while vigente.actual().citas != 200:
+            assert time.perf_counter() - inicio < 5
+            time.sleep(0.01)
+    finally:
+        vigente.detener_vigilancia()
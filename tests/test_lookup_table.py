@@ -0,0 +1,63 @@
+import sys
+import os
+import numpy as np
+import joblib
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.lookup_table import TablaRiesgo, ESCALA_CUANTIZACION
+from src.api.compiled_model import compilar_modelo
+from src.modeling.build_lookup_table import bordes_desde_modelo, RANGOS_NUMERICOS
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'model_pipeline.pkl')
+
+
+@pytest.fixture
+def tabla():
+    probabilidades = np.arange(2 * 2 * 3, dtype=np.uint16).reshape(2, 2, 3) * 1000
+    return TablaRiesgo(
+        categorical_features=['sexo', 'turno'],
+        categorias=[['Femenino', 'Masculino'], ['Mañana', 'Tarde']],
+        numeric_features=['edad'],
+        bordes=[[0, 18, 65, 121]],
+        probabilidades=probabilidades,
+        sha256_modelo="abc",
+    )
+
+
+def test_lookup_finds_cell_and_rejects_out_of_table(tabla):
+
+    assert tabla.buscar({"sexo": "Masculino", "turno": "Mañana", "edad": 70}) == 8000 / ESCALA_CUANTIZACION
+    assert tabla.buscar({"sexo": "Femenino", "turno": "Tarde", "edad": 17}) == 3000 / ESCALA_CUANTIZACION
+
+    assert tabla.buscar({"sexo": "Otro", "turno": "Tarde", "edad": 30}) is None
+    assert tabla.buscar({"sexo": "Femenino", "turno": "Tarde", "edad": 121}) is None
+    assert tabla.buscar({"sexo": "Femenino", "turno": "Tarde", "edad": None}) is None
+
+def test_table_roundtrip(tabla, tmp_path):
+
+    ruta = str(tmp_path / "tabla_riesgo")
+    tabla.guardar(ruta)
+    cargada = TablaRiesgo.cargar(ruta, mmap_mode="r")
+
+    assert cargada.sha256_modelo == "abc"
+    registro = {"sexo": "Masculino", "turno": "Tarde", "edad": 40}
+    assert cargada.buscar(registro) == tabla.buscar(registro)
+
+def test_model_threshold_buckets_are_exact():
+
+    # Dentro de cada rango derivado de los umbrales, todas las edades (y esperas,
+    # e inasistencias) enteras deben recibir la misma probabilidad del modelo.
+    compilado = compilar_modelo(joblib.load(MODEL_PATH))
+    bordes = bordes_desde_modelo(joblib.load(MODEL_PATH))
+    base = dict(zip(compilado.categorical_features, [c[0] for c in compilado.categorias]))
+    base.update({"edad": 40, "tiempo_espera_dias": 5, "inasistencias_previas": 0})
+
+    for feature, (inicio, fin) in RANGOS_NUMERICOS.items():
+        registros = [dict(base, **{feature: v}) for v in range(inicio, fin)]
+        probabilidades = compilado.predict_proba(registros)
+        for a, b in zip(bordes[feature][:-1], bordes[feature][1:]):
+            rango = probabilidades[a - inicio:b - inicio]
+            assert np.all(rango == rango[0]), f"{feature} no es constante en [{a}, {b})"
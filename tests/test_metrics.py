@@ -0,0 +1,121 @@
+import sys
+import os
+import time
+import threading
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.metrics import RegistroMetricas, PerfiladorMuestreo
+from src.api.main import app
+
+
+def valor_metrica(texto, muestra):
+    for linea in texto.splitlines():
+        if linea.startswith(muestra + " "):
+            return float(linea.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_and_counter_use_prometheus_text_format():
+
+    registro = RegistroMetricas()
+    contador = registro.contador("solicitudes_total", "Solicitudes.", ("endpoint",))
+    histograma = registro.histograma("latencia_segundos", "Latencia.", ("endpoint",), buckets=(0.1, 1.0))
+    contador.incrementar("/predict")
+    contador.incrementar("/predict", valor=2)
+    for segundos in (0.05, 0.1, 0.5, 3.0):
+        histograma.observar(segundos, "/predict")
+
+    texto = registro.exportar()
+    assert "# TYPE solicitudes_total counter" in texto
+    assert "# TYPE latencia_segundos histogram" in texto
+    assert valor_metrica(texto, 'solicitudes_total{endpoint="/predict"}') == 3
+    # Los buckets son acumulados e incluyen el límite superior.
+    assert valor_metrica(texto, 'latencia_segundos_bucket{endpoint="/predict",le="0.1"}') == 2
+    assert valor_metrica(texto, 'latencia_segundos_bucket{endpoint="/predict",le="1.0"}') == 3
+    assert valor_metrica(texto, 'latencia_segundos_bucket{endpoint="/predict",le="+Inf"}') == 4
+    assert valor_metrica(texto, 'latencia_segundos_count{endpoint="/predict"}') == 4
+    assert valor_metrica(texto, 'latencia_segundos_sum{endpoint="/predict"}') == 3.65
+
+def test_metrics_endpoint_reports_latency_stages_model_and_errors(monkeypatch):
+
+    from src.api import config
+    monkeypatch.setattr(config, "MAX_BATCH_SIZE", 2)
+
+    # Edad poco común para que la cita no esté en el cache de otras pruebas.
+    payload = {
+        "edad": 117,
+        "sexo": "Masculino",
+        "sector": "Sur",
+        "prevision": "Fonasa D",
+        "especialidad": "Dental",
+        "dia_semana": "Miércoles",
+        "turno": "Tarde",
+        "tiempo_espera_dias": 41,
+        "inasistencias_previas": 3
+    }
+
+    with TestClient(app) as client:
+        antes = client.get("/metrics").text
+        assert client.post("/predict", json=payload).status_code == 200
+        assert client.post("/predict/batch", json={"citas": [payload] * 3}).status_code == 413
+        respuesta = client.get("/metrics")
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    texto = respuesta.text
+
+    def aumento(muestra):
+        return (valor_metrica(texto, muestra) or 0) - (valor_metrica(antes, muestra) or 0)
+
+    assert aumento('cesfam_http_latencia_segundos_count{metodo="POST",endpoint="/predict"}') == 1
+    assert aumento('cesfam_http_solicitudes_total{metodo="POST",endpoint="/predict",estado="200"}') == 1
+    assert aumento('cesfam_http_errores_total{endpoint="/predict/batch",estado="413"}') == 1
+    assert aumento('cesfam_citas_por_solicitud_count{endpoint="/predict"}') == 1
+    for etapa in ("validacion", "preparacion", "cola", "preprocesamiento", "modelo"):
+        assert aumento(f'cesfam_inferencia_etapa_segundos_count{{etapa="{etapa}"}}') >= 1, etapa
+    assert 'cesfam_modelo_info{version="' in texto
+    # /metrics no se mide a sí mismo.
+    assert 'endpoint="/metrics"' not in texto
+
+def test_profiler_dumps_folded_stacks_for_slow_requests(tmp_path):
+
+    perfilador = PerfiladorMuestreo(str(tmp_path), umbral=0.05, intervalo=0.001)
+    perfilador.iniciar()
+
+    def solicitud(segundos, nombre):
+        inicio = time.perf_counter()
+        perfilador.solicitud_iniciada()
+        time.sleep(segundos)
+        perfilador.solicitud_terminada(inicio, time.perf_counter() - inicio, nombre)
+
+    try:
+        solicitud(0.001, "GET /rapida")
+        hilo = threading.Thread(target=solicitud, args=(0.2, "POST /predict"), name="solicitud-lenta")
+        hilo.start()
+        hilo.join()
+    finally:
+        perfilador.detener()
+
+    archivos = os.listdir(tmp_path)
+    assert len(archivos) == 1 and "POST_predict" in archivos[0] and archivos[0].endswith(".folded")
+    with open(tmp_path / archivos[0]) as f:
+        lineas = f.read().splitlines()
+    assert any(l.startswith("solicitud-lenta;") and "solicitud (test_metrics.py)" in l for l in lineas)
+    assert all(int(l.rsplit(" ", 1)[1]) >= 1 for l in lineas)
+
+def test_profiler_writes_files_outside_the_request_thread(tmp_path, monkeypatch):
+
+    perfilador = PerfiladorMuestreo(str(tmp_path), umbral=0.0, intervalo=0.001)
+    hilos = []
+    monkeypatch.setattr(perfilador, "_volcar", lambda *args: hilos.append(threading.current_thread().name))
+    perfilador.iniciar()
+    try:
+        for _ in range(3):
+            perfilador.solicitud_iniciada()
+            perfilador.solicitud_terminada(time.perf_counter(), 0.001, "POST /predict")
+    finally:
+        perfilador.detener()
+
+    assert hilos == ["perfilador-volcado"] * 3
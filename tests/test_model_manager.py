@@ -0,0 +1,116 @@
+import sys
+import os
+import shutil
+import threading
+import joblib
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.compiled_model import compilar_modelo
+from src.api.model_manager import GestorModelo, hash_archivo, ruta_modelo_compacto
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'model_pipeline.pkl')
+
+PACIENTE = {
+    "edad": 45,
+    "sexo": "Femenino",
+    "sector": "Norte",
+    "prevision": "Fonasa B",
+    "especialidad": "Medicina General",
+    "dia_semana": "Lunes",
+    "turno": "Mañana",
+    "tiempo_espera_dias": 5,
+    "inasistencias_previas": 0
+}
+
+
+def publicar_variante(destino):
+    # Mismo pipeline con otra tasa de aprendizaje: cambia el hash y las probabilidades.
+    pipeline = joblib.load(MODEL_PATH)
+    pipeline.named_steps['classifier'].learning_rate = 0.05
+    tmp = str(destino) + ".tmp"
+    joblib.dump(pipeline, tmp)
+    os.replace(tmp, destino)
+
+
+@pytest.fixture
+def ruta_modelo(tmp_path):
+    ruta = tmp_path / "model_pipeline.pkl"
+    shutil.copy(MODEL_PATH, ruta)
+    return ruta
+
+
+def test_reload_swaps_to_new_version_and_keeps_old_snapshot_usable(ruta_modelo):
+
+    gestor = GestorModelo(str(ruta_modelo), registro_ejemplo=PACIENTE)
+    gestor.cargar()
+    anterior = gestor.activo
+    probabilidad_anterior = anterior.predecir([PACIENTE])[0]
+
+    assert gestor.recargar()["recargado"] is False
+
+    publicar_variante(ruta_modelo)
+    resultado = gestor.recargar()
+
+    assert resultado["recargado"] is True
+    assert gestor.activo.version != anterior.version
+    assert gestor.activo.predecir([PACIENTE])[0] != probabilidad_anterior
+    # Una solicitud que ya tomó la versión anterior termina con ella.
+    assert anterior.predecir([PACIENTE])[0] == probabilidad_anterior
+
+def test_compact_model_is_used_only_for_its_own_pickle(ruta_modelo):
+
+    compilado = compilar_modelo(joblib.load(ruta_modelo))
+    compilado.guardar(ruta_modelo_compacto(str(ruta_modelo)), hash_archivo(str(ruta_modelo)))
+    gestor = GestorModelo(str(ruta_modelo), registro_ejemplo=PACIENTE)
+    gestor.cargar()
+    assert gestor.activo.pipeline is None
+    assert gestor.activo.describir()["modelo_compacto"] is True
+
+    # Un pickle nuevo sin exportar vuelve a cargarse con sklearn.
+    publicar_variante(ruta_modelo)
+    assert gestor.recargar()["recargado"] is True
+    assert gestor.activo.pipeline is not None
+
+def test_invalid_model_is_rejected_and_active_version_kept(ruta_modelo):
+
+    gestor = GestorModelo(str(ruta_modelo), registro_ejemplo=PACIENTE)
+    gestor.cargar()
+    version = gestor.activo.version
+
+    with open(ruta_modelo, "wb") as f:
+        f.write(b"no es un modelo")
+
+    resultado = gestor.recargar()
+    assert resultado["recargado"] is False
+    assert gestor.activo.version == version
+    assert gestor.estadisticas()["recargas_fallidas"] == 1
+
+def test_predictions_never_fail_during_swap(ruta_modelo):
+
+    gestor = GestorModelo(str(ruta_modelo), registro_ejemplo=PACIENTE)
+    gestor.cargar()
+    errores = []
+    detener = threading.Event()
+
+    def trafico():
+        while not detener.is_set():
+            try:
+                gestor.activo.predecir([PACIENTE])
+            except Exception as e:
+                errores.append(e)
+
+    hilos = [threading.Thread(target=trafico) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    try:
+        publicar_variante(ruta_modelo)
+        assert gestor.recargar()["recargado"] is True
+    finally:
+        detener.set()
+        for hilo in hilos:
+            hilo.join()
+
+    assert errores == []
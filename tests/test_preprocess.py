@@ -72,5 +72,45 @@ class TestPreprocessing(unittest.TestCase):
         except Exception as e:
             self.fail(f"El pipeline falló con una categoría desconocida: {e}")
 
+    def test_sparse_output_matches_dense(self):
+
+        data = pd.concat([self.sample_data, self.sample_data.assign(sector='Sur', edad=30)], ignore_index=True)
+        densa = get_preprocessing_pipeline().fit_transform(data)
+        dispersa = get_preprocessing_pipeline(disperso=True).fit_transform(data)
+
+        self.assertEqual(dispersa.format, 'csr')
+        np.testing.assert_allclose(dispersa.toarray(), densa)
+
+    def test_frequency_cap_groups_rare_categories(self):
+
+        data = pd.concat([self.sample_data] * 5 + [
+            self.sample_data.assign(especialidad=f'Especialidad_{i}') for i in range(20)
+        ], ignore_index=True)
+        pipeline = get_preprocessing_pipeline(disperso=True, min_frecuencia=3).fit(data)
+        onehot = pipeline.named_transformers_['cat'].named_steps['onehot']
+
+        # Las 20 especialidades con una sola cita quedan en una única columna de infrecuentes.
+        self.assertEqual(len(onehot.get_feature_names_out()), 6 + 1)
+        nueva = pipeline.transform(self.sample_data.assign(especialidad='Especialidad_Nueva')).toarray()
+        conocida_rara = pipeline.transform(self.sample_data.assign(especialidad='Especialidad_3')).toarray()
+        np.testing.assert_array_equal(nueva, conocida_rara)
+
+    def test_hashing_has_fixed_width(self):
+
+        pipeline = get_preprocessing_pipeline(n_hash=32).fit(self.sample_data)
+        nuevo = pipeline.transform(self.sample_data.assign(sector='Sector_Desconocido_Nuevo'))
+
+        self.assertEqual(nuevo.format, 'csr')
+        self.assertEqual(nuevo.shape, (1, 3 + 32))
+        self.assertEqual(nuevo[:, 3:].sum(), 6)
+
+    def test_history_columns_are_kept_without_observed_values(self):
+
+        # Si ningún paciente tiene citas previas la tasa de historial es siempre NaN.
+        data = self.sample_data.assign(hist_citas=0, hist_tasa_no_show=np.nan, hist_citas_especialidad=0)
+        processed = get_preprocessing_pipeline(historial=True).fit_transform(data)
+
+        self.assertEqual(processed.shape[1], get_preprocessing_pipeline().fit_transform(self.sample_data).shape[1] + 3)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
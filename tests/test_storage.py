@@ -0,0 +1,112 @@
+import sys
+import os
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep import storage
+from src.data_prep.data_generator import generar_registros_cesfam
+
+pytestmark = pytest.mark.skipif(not storage.parquet_disponible(), reason="pyarrow no está instalado")
+
+
+def rutas(tmp_path):
+    return {"csv_path": str(tmp_path / "citas.csv"), "ruta": str(tmp_path / "citas")}
+
+
+def test_appends_roundtrip_with_compact_types(tmp_path):
+
+    r = rutas(tmp_path)
+    storage.reiniciar_citas(generar_registros_cesfam(100, start_id=1), **r)
+    storage.agregar_citas(generar_registros_cesfam(50, start_id=101), **r)
+
+    df = storage.leer_citas(**r)
+    assert df['paciente_id'].tolist() == list(range(1, 151))
+    assert str(df['especialidad'].dtype) == 'category'
+    assert str(df['edad'].dtype) == 'int16'
+
+    # Parquet y CSV entregan el mismo contenido y los mismos tipos.
+    desde_csv = storage.leer_citas(csv_path=r["csv_path"], ruta=str(tmp_path / "no_existe"))
+    pd.testing.assert_frame_equal(df, desde_csv, check_categorical=False)
+
+def test_reads_only_requested_columns(tmp_path):
+
+    r = rutas(tmp_path)
+    storage.reiniciar_citas(generar_registros_cesfam(20, start_id=1), **r)
+
+    df = storage.leer_citas(['especialidad', 'target_no_asiste'], **r)
+    assert list(df.columns) == ['especialidad', 'target_no_asiste']
+
+def test_compaction_keeps_every_row_once(tmp_path):
+
+    r = rutas(tmp_path)
+    storage.reiniciar_citas(generar_registros_cesfam(10, start_id=1), **r)
+    siguiente = 11
+    for _ in range(storage.MAX_PARTES_SIN_COMPACTAR + 5):
+        storage.agregar_citas(generar_registros_cesfam(10, start_id=siguiente), **r)
+        siguiente += 10
+
+    archivos = os.listdir(r["ruta"])
+    assert any(a.startswith("compacto-") for a in archivos)
+    assert len(archivos) < storage.MAX_PARTES_SIN_COMPACTAR
+
+    ids = storage.leer_citas(['paciente_id'], **r)['paciente_id']
+    assert ids.tolist() == list(range(1, siguiente))
+
+def test_reads_in_bounded_blocks_from_an_id(tmp_path):
+
+    r = rutas(tmp_path)
+    storage.reiniciar_citas(generar_registros_cesfam(100, start_id=1), **r)
+    storage.agregar_citas(generar_registros_cesfam(50, start_id=101), **r)
+
+    for origen in (r, {"csv_path": r["csv_path"], "ruta": str(tmp_path / "no_existe")}):
+        bloques = list(storage.leer_citas_por_bloques(filas_por_bloque=40, **origen))
+        assert max(len(b) for b in bloques) <= 40
+        assert pd.concat(bloques)['paciente_id'].tolist() == list(range(1, 151))
+
+        nuevas = list(storage.leer_citas_por_bloques(['edad'], filas_por_bloque=40, desde_id=120, **origen))
+        assert pd.concat(nuevas)['paciente_id'].tolist() == list(range(121, 151))
+
+def test_tiered_compaction_bounds_file_count_and_row_groups(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(storage, "FILAS_POR_GRUPO", 64)
+    ruta = str(tmp_path / "citas")
+    siguiente = 1
+    for _ in range(200):
+        storage.escribir_parte(generar_registros_cesfam(10, start_id=siguiente), ruta)
+        storage.compactar(ruta, max_partes=4, factor=3)
+        siguiente += 10
+
+    # Con factor 3 quedan a lo más 2 compactos por nivel, más las partes sueltas.
+    archivos = os.listdir(ruta)
+    compactos = [a for a in archivos if a.startswith("compacto-")]
+    niveles = [storage._nivel(os.path.join(ruta, c), 3) for c in compactos]
+    assert all(niveles.count(n) <= 2 for n in niveles)
+    assert len(archivos) - len(compactos) <= 4
+    assert len(archivos) < 20
+
+    ids = storage.leer_citas(['paciente_id'], ruta=ruta)['paciente_id']
+    assert ids.tolist() == list(range(1, siguiente))
+    # Las fusiones se escriben por row groups acotados.
+    grande = max(compactos, key=lambda c: storage._rango_archivo(c)[1] - storage._rango_archivo(c)[0])
+    metadatos = storage.pq.ParquetFile(os.path.join(ruta, grande)).metadata
+    assert metadatos.num_row_groups > 1
+    assert all(metadatos.row_group(i).num_rows <= 64 for i in range(metadatos.num_row_groups))
+
+def test_interrupted_compaction_reads_each_row_once(tmp_path):
+
+    ruta = str(tmp_path / "citas")
+    for inicio in (1, 11, 21):
+        storage.escribir_parte(generar_registros_cesfam(10, start_id=inicio), ruta)
+    storage.compactar(ruta, max_partes=0)
+    storage.escribir_parte(generar_registros_cesfam(10, start_id=31), ruta)
+    storage.compactar(ruta, max_partes=0, factor=100)
+    antes = sorted(os.listdir(ruta))
+
+    # Simula una caída después de escribir el compacto fusionado y antes de borrar los de origen.
+    tabla = storage.pa.concat_tables([storage.pq.read_table(os.path.join(ruta, a)) for a in antes]).unify_dictionaries()
+    storage.pq.write_table(tabla, os.path.join(ruta, "compacto-000000000001-000000000040.parquet"))
+
+    ids = storage.leer_citas(['paciente_id'], ruta=ruta)['paciente_id']
+    assert ids.tolist() == list(range(1, 41))
@@ -0,0 +1,45 @@
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep import storage
+from src.data_prep.stream_generator import EscritorCitas, PERFILES, simular_a_tasa
+from src.data_prep.data_generator import generar_registros_cesfam
+
+
+def test_profiles_keep_the_requested_mean_rate():
+
+    for nombre, perfil in PERFILES.items():
+        pesos = [perfil(hora, dia) for dia in range(5) for hora in range(24)]
+        assert np.isclose(np.mean(pesos), 1.0), nombre
+    assert PERFILES['manana'](9, 0) > 2 > PERFILES['manana'](3, 0)
+    assert PERFILES['lunes'](9, 0) > PERFILES['lunes'](9, 2)
+
+def test_writer_flushes_by_size_and_keeps_csv_open(tmp_path):
+
+    csv_path = str(tmp_path / "citas.csv")
+    storage.reiniciar_citas(generar_registros_cesfam(10, start_id=1), csv_path, str(tmp_path / "citas"))
+    escritor = EscritorCitas(csv_path, max_filas=100, max_segundos=60, ruta_parquet=str(tmp_path / "citas"))
+
+    escritor.agregar(generar_registros_cesfam(60, start_id=11), llegada=0)
+    assert escritor.filas_escritas == 0
+    escritor.agregar(generar_registros_cesfam(60, start_id=71), llegada=0)
+    assert escritor.filas_escritas == 120 and escritor.escrituras_por_tamano == 1
+
+    escritor.agregar(generar_registros_cesfam(5, start_id=131), llegada=0)
+    escritor.cerrar()
+
+    ids = storage.leer_citas(['paciente_id'], csv_path=csv_path, ruta=str(tmp_path / "no_existe"))['paciente_id']
+    assert ids.tolist() == list(range(1, 136))
+
+def test_rate_controlled_stream_reaches_target(tmp_path):
+
+    resumen = simular_a_tasa(
+        2000, duracion_segundos=1.5, guardar_path=str(tmp_path / "citas.csv"), inicial=10,
+        max_segundos_buffer=0.2, reporte_segundos=60, ruta_parquet=str(tmp_path / "citas")
+    )
+
+    assert 0.8 < resumen["tasa_lograda"] / resumen["tasa_perfil"] < 1.2
+    assert storage.leer_citas(ruta=str(tmp_path / "citas")).shape[0] == resumen["filas"] + 10
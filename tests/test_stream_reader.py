@@ -0,0 +1,54 @@
+import sys
+import os
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep.stream_reader import LectorIncremental
+from src.data_prep.data_generator import generar_registros_cesfam
+
+
+def test_reads_only_new_complete_lines(tmp_path):
+
+    ruta = str(tmp_path / "citas.csv")
+    generar_registros_cesfam(100, start_id=1).to_csv(ruta, index=False)
+    lector = LectorIncremental(ruta)
+
+    primeras, reiniciado = lector.leer_nuevas()
+    assert len(primeras) == 100 and not reiniciado
+
+    nuevas, _ = lector.leer_nuevas()
+    assert nuevas.empty
+
+    # Una línea a medio escribir queda pendiente hasta que se completa.
+    lote = generar_registros_cesfam(50, start_id=101).to_csv(index=False, header=False)
+    corte = lote.index("\n", len(lote) // 2) + 5
+    with open(ruta, "a") as f:
+        f.write(lote[:corte])
+    parcial, _ = lector.leer_nuevas()
+    with open(ruta, "a") as f:
+        f.write(lote[corte:])
+    resto, _ = lector.leer_nuevas()
+
+    ids = pd.concat([parcial, resto])['paciente_id'].tolist()
+    assert ids == list(range(101, 151))
+    assert lector.filas_leidas == 150
+
+def test_restarts_when_file_is_rewritten(tmp_path):
+
+    ruta = str(tmp_path / "citas.csv")
+    generar_registros_cesfam(100, start_id=1).to_csv(ruta, index=False)
+    lector = LectorIncremental(ruta, columnas=['paciente_id', 'edad'])
+    lector.leer_nuevas()
+
+    generar_registros_cesfam(30, start_id=500).to_csv(ruta, index=False)
+    nuevas, reiniciado = lector.leer_nuevas()
+
+    assert reiniciado
+    assert list(nuevas.columns) == ['paciente_id', 'edad']
+    assert nuevas['paciente_id'].tolist() == list(range(500, 530))
+
+def test_missing_file_returns_none(tmp_path):
+
+    nuevas, reiniciado = LectorIncremental(str(tmp_path / "no_existe.csv")).leer_nuevas()
+    assert nuevas is None and not reiniciado
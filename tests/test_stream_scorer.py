@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import shutil
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from src.api.model_manager import GestorModelo
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.scoring.stream_scorer import PuntuadorStream
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'model_pipeline.pkl')
+
+
+def crear_puntuador(entrada, salida):
+    return PuntuadorStream(str(entrada), str(salida), gestor=GestorModelo(MODEL_PATH), umbral=0.5)
+
+
+def test_scores_new_rows_like_the_pipeline(tmp_path):
+
+    entrada, salida = tmp_path / "citas.csv", tmp_path / "predicciones.csv"
+    citas = generar_registros_cesfam(200, start_id=1)
+    citas.to_csv(entrada, index=False)
+
+    puntuador = crear_puntuador(entrada, salida)
+    assert puntuador.procesar_pendientes() == 200
+    assert puntuador.procesar_pendientes() == 0
+
+    predicciones = pd.read_csv(salida)
+    esperadas = joblib.load(MODEL_PATH).predict_proba(citas.drop(columns=['target_no_asiste', 'paciente_id']))[:, 1]
+    assert predicciones['paciente_id'].tolist() == list(range(1, 201))
+    np.testing.assert_allclose(predicciones['probabilidad'], esperadas, atol=1e-6)
+    assert (predicciones['prediccion'] == (predicciones['probabilidad'] >= 0.5)).all()
+
+    metricas = puntuador.metricas()
+    assert metricas["filas_puntuadas"] == 200 and metricas["bytes_pendientes"] == 0
+    assert metricas["retraso_p50_s"] >= 0
+
+def test_restart_resumes_from_checkpoint_without_duplicates(tmp_path):
+
+    entrada, salida = tmp_path / "citas.csv", tmp_path / "predicciones.csv"
+    generar_registros_cesfam(100, start_id=1).to_csv(entrada, index=False)
+    crear_puntuador(entrada, salida).procesar_pendientes()
+
+    # Caída después de escribir predicciones pero antes de guardar el checkpoint.
+    with open(salida, "a") as f:
+        f.write("101,0.5,1,x,0\n102,0.5")
+    generar_registros_cesfam(50, start_id=101).to_csv(entrada, mode='a', header=False, index=False)
+
+    puntuador = crear_puntuador(entrada, salida)
+    assert puntuador.filas_puntuadas == 100
+    assert puntuador.procesar_pendientes() == 50
+
+    predicciones = pd.read_csv(salida)
+    assert predicciones['paciente_id'].tolist() == list(range(1, 151))
+    with open(str(salida)[:-len(".csv")] + "_checkpoint.json") as f:
+        assert json.load(f)["filas_puntuadas"] == 150
+
+def test_replaced_input_restarts_the_output(tmp_path):
+
+    entrada, salida = tmp_path / "citas.csv", tmp_path / "predicciones.csv"
+    generar_registros_cesfam(100, start_id=1).to_csv(entrada, index=False)
+    puntuador = crear_puntuador(entrada, salida)
+    puntuador.procesar_pendientes()
+
+    os.remove(entrada)
+    generar_registros_cesfam(30, start_id=1).to_csv(entrada, index=False)
+    puntuador.procesar_pendientes()
+
+    assert pd.read_csv(salida)['paciente_id'].tolist() == list(range(1, 31))
+    assert puntuador.filas_puntuadas == 30
+
+def test_hot_reload_to_a_model_with_other_inputs_reads_its_columns(tmp_path):
+
+    entrada, salida = tmp_path / "citas.csv", tmp_path / "predicciones.csv"
+    ruta_modelo = tmp_path / "model_pipeline.pkl"
+    citas = generar_registros_cesfam(300, start_id=1)
+    # Modelo inicial con solo dos de las columnas de la cita.
+    reducido = Pipeline([
+        ('preprocessor', ColumnTransformer([('cat', OneHotEncoder(handle_unknown='ignore'), ['sexo']),
+                                            ('num', 'passthrough', ['edad'])])),
+        ('classifier', LogisticRegression()),
+    ]).fit(citas[['edad', 'sexo']], citas['target_no_asiste'])
+    joblib.dump(reducido, ruta_modelo)
+    citas.iloc[:100].to_csv(entrada, index=False)
+
+    gestor = GestorModelo(str(ruta_modelo))
+    puntuador = PuntuadorStream(str(entrada), str(salida), gestor=gestor, umbral=0.5)
+    assert puntuador.procesar_pendientes() == 100
+
+    shutil.copy(MODEL_PATH, ruta_modelo)
+    assert gestor.recargar()["recargado"] is True
+    citas.iloc[100:].to_csv(entrada, mode='a', header=False, index=False)
+    assert puntuador.procesar_pendientes() == 200
+
+    predicciones = pd.read_csv(salida)
+    assert predicciones['version_modelo'].nunique() == 2
+    esperadas = joblib.load(MODEL_PATH).predict_proba(citas.iloc[100:].drop(columns=['target_no_asiste', 'paciente_id']))[:, 1]
+    np.testing.assert_allclose(predicciones['probabilidad'].iloc[100:], esperadas, atol=1e-6)
@@ -0,0 +1,117 @@
+import sys
+import os
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.compiled_model import compilar_modelo
+from src.api.model_manager import GestorModelo
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.data_prep.feature_store import HistorialPacientes, completar_registros
+from src.modeling.train import construir_pipeline
+
+PACIENTE = {
+    "edad": 45,
+    "sexo": "Femenino",
+    "sector": "Norte",
+    "prevision": "Fonasa B",
+    "especialidad": "Medicina General",
+    "dia_semana": "Lunes",
+    "turno": "Mañana",
+    "tiempo_espera_dias": 5,
+    "inasistencias_previas": 0
+}
+
+
+@pytest.fixture(scope="module")
+def pipeline_hgb():
+    df = generar_registros_cesfam(3000, start_id=1, rng=np.random.default_rng(0))
+    return construir_pipeline('hgb').fit(df.drop(columns=['paciente_id', 'target_no_asiste']), df['target_no_asiste'])
+
+
+def test_hgb_uses_native_categories(pipeline_hgb):
+
+    clf = pipeline_hgb.named_steps['classifier']
+    assert type(clf).__name__ == 'HistGradientBoostingClassifier'
+    assert clf.is_categorical_.sum() == 6
+    # Categorías desconocidas y valores faltantes se aceptan igual que con el one-hot.
+    raros = pd.DataFrame([PACIENTE, dict(PACIENTE, sector="Sector_Nuevo", sexo=None, edad=np.nan)])
+    probabilidades = pipeline_hgb.predict_proba(raros)[:, 1]
+    assert np.all((probabilidades >= 0) & (probabilidades <= 1))
+
+def test_hgb_artifact_is_served_by_the_api_manager(pipeline_hgb, tmp_path):
+
+    ruta = str(tmp_path / "model_pipeline.pkl")
+    joblib.dump(pipeline_hgb, ruta)
+
+    with pytest.raises(ValueError):
+        compilar_modelo(pipeline_hgb)
+    gestor = GestorModelo(ruta, registro_ejemplo=PACIENTE)
+    gestor.cargar()
+    assert gestor.activo.compilado is None
+    esperado = pipeline_hgb.predict_proba(pd.DataFrame([PACIENTE]))[:, 1]
+    np.testing.assert_allclose(gestor.activo.predecir([PACIENTE]), esperado)
+
+def test_sparse_gbm_matches_dense_and_stays_compilable():
+
+    df = generar_registros_cesfam(2000, start_id=1, rng=np.random.default_rng(1))
+    X, y = df.drop(columns=['paciente_id', 'target_no_asiste']), df['target_no_asiste']
+    densa = construir_pipeline('gbm').fit(X, y)
+    dispersa = construir_pipeline('gbm', disperso=True).fit(X, y)
+
+    np.testing.assert_allclose(dispersa.predict_proba(X), densa.predict_proba(X))
+    np.testing.assert_allclose(compilar_modelo(dispersa).predict_proba(X.to_dict('records')),
+                               densa.predict_proba(X)[:, 1])
+
+def test_hgb_rejects_sparse_encoding():
+
+    with pytest.raises(ValueError):
+        construir_pipeline('hgb', disperso=True)
+
+def test_history_model_is_served_with_the_same_features(tmp_path):
+
+    df = generar_registros_cesfam(3000, start_id=1, rng=np.random.default_rng(2))
+    df['paciente_id'] = np.random.default_rng(3).integers(0, 300, len(df))
+    historial = HistorialPacientes()
+    datos = pd.concat([df, historial.caracteristicas_y_agregar(df)], axis=1)
+    pipeline = construir_pipeline('gbm', historial=True).fit(
+        datos.drop(columns=['paciente_id', 'target_no_asiste']), datos['target_no_asiste']
+    )
+    ruta = str(tmp_path / "model_pipeline.pkl")
+    joblib.dump(pipeline, ruta)
+    gestor = GestorModelo(ruta, registro_ejemplo=PACIENTE)
+    gestor.cargar()
+
+    citas = [dict(PACIENTE, paciente_id=i) for i in range(5)] + [PACIENTE]
+    registros = completar_registros(citas, historial)
+    esperado = pipeline.predict_proba(pd.DataFrame(registros).astype({'hist_citas': float}))[:, 1]
+    assert gestor.activo.compilado is not None
+    np.testing.assert_allclose(gestor.activo.predecir(registros), esperado)
+
+def test_unknown_backend_is_rejected():
+
+    with pytest.raises(ValueError):
+        construir_pipeline('xgboost')
+
+def test_search_writes_leaderboard_and_best_artifact(tmp_path):
+
+    from sklearn.model_selection import train_test_split
+    from src.modeling.train import buscar_hiperparametros
+
+    df = generar_registros_cesfam(3000, start_id=1, rng=np.random.default_rng(1))
+    X, y = df.drop(columns=['paciente_id', 'target_no_asiste']), df['target_no_asiste']
+    datos = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    rutas = {"model_path": str(tmp_path / "modelo.pkl"), "leaderboard_path": str(tmp_path / "leaderboard.csv")}
+
+    resultado = buscar_hiperparametros('hgb', n_candidatos=3, folds=3, n_jobs=1, datos=datos, **rutas)
+
+    leaderboard = pd.read_csv(rutas["leaderboard_path"])
+    assert len(leaderboard) >= 3
+    assert {'mean_test_score', 'mean_fit_time', 'n_resources', 'learning_rate'} <= set(leaderboard.columns)
+    mejor = joblib.load(rutas["model_path"])
+    assert mejor.memory is None
+    assert mejor.named_steps['classifier'].learning_rate == resultado["mejores_parametros"]['classifier__learning_rate']
+    assert 0.5 < resultado["roc_auc_prueba"] <= 1.0
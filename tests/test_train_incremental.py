@@ -0,0 +1,79 @@
+import sys
+import os
+import joblib
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_prep import storage
+from src.data_prep.data_generator import generar_registros_cesfam
+from src.modeling.pipeline import get_preprocessing_pipeline
+from src.modeling.train_incremental import (
+    BocetoMediana, EstadisticasPreprocesamiento, EntrenadorIncremental, entrenar_incremental
+)
+
+
+def citas(n, start_id, semilla):
+    return generar_registros_cesfam(n, start_id=start_id, rng=np.random.default_rng(semilla))
+
+
+def test_sketch_median_matches_numpy():
+
+    for valores in ([3, 1, 2], [4, 1, 3, 2], [5, 5, 7, 100, np.nan]):
+        boceto = BocetoMediana()
+        boceto.actualizar(valores[:2])
+        boceto.actualizar(valores[2:])
+        assert boceto.mediana() == np.nanmedian(valores)
+
+def test_streaming_stats_match_fitting_on_all_rows():
+
+    df = citas(3000, 1, 0).drop(columns=['paciente_id', 'target_no_asiste'])
+    estadisticas = EstadisticasPreprocesamiento()
+    for inicio in range(0, len(df), 700):
+        estadisticas.actualizar(df.iloc[inicio:inicio + 700])
+
+    esperado = get_preprocessing_pipeline().fit(df).transform(df)
+    obtenido = estadisticas.construir_preprocesador().transform(df)
+    assert obtenido.format == 'csr'
+    np.testing.assert_allclose(obtenido.toarray(), esperado, atol=1e-9)
+
+def test_updating_stats_keeps_model_predictions(tmp_path):
+
+    entrenador = EntrenadorIncremental()
+    primeras = citas(2000, 1, 1)
+    entrenador.estadisticas.actualizar(primeras)
+    entrenador._actualizar_preprocesador()
+    entrenador._entrenar_bloque(primeras)
+
+    X = primeras.drop(columns=['paciente_id', 'target_no_asiste'])
+    antes = entrenador.pipeline().predict_proba(X)[:, 1]
+    # Bloque nuevo con otra distribución de edades y una especialidad nunca vista.
+    nuevas = citas(500, 2001, 2).assign(edad=lambda d: d['edad'] + 20)
+    nuevas['especialidad'] = nuevas['especialidad'].cat.add_categories(['Podologia'])
+    nuevas.loc[nuevas.index[:50], 'especialidad'] = 'Podologia'
+    entrenador.estadisticas.actualizar(nuevas)
+    entrenador._actualizar_preprocesador()
+
+    assert 'especialidad_Podologia' in entrenador.preprocesador.get_feature_names_out()
+    np.testing.assert_allclose(entrenador.pipeline().predict_proba(X)[:, 1], antes, atol=1e-12)
+
+def test_refresh_trains_only_on_new_rows(tmp_path):
+
+    rutas = {"csv_path": str(tmp_path / "citas.csv"), "ruta": str(tmp_path / "citas")}
+    destinos = {"model_path": str(tmp_path / "modelo.pkl"), "estado_path": str(tmp_path / "estado.joblib")}
+    storage.reiniciar_citas(citas(5000, 1, 3), **rutas)
+
+    metricas = entrenar_incremental(filas_por_bloque=1000, **rutas, **destinos)
+    assert metricas["filas"] == 500
+    assert EntrenadorIncremental.cargar(destinos["estado_path"]).filas_entrenadas == 4500
+
+    storage.agregar_citas(citas(1000, 5001, 4), **rutas)
+    entrenar_incremental(filas_por_bloque=1000, **rutas, **destinos)
+    entrenador = EntrenadorIncremental.cargar(destinos["estado_path"])
+    assert entrenador.ultimo_id == 6000 and entrenador.filas_entrenadas == 5400
+    assert entrenar_incremental(filas_por_bloque=1000, **rutas, **destinos) is None
+
+    # El artefacto es un Pipeline como el de train.py.
+    pipeline = joblib.load(destinos["model_path"])
+    probabilidades = pipeline.predict_proba(citas(10, 1, 5).drop(columns=['paciente_id', 'target_no_asiste']))[:, 1]
+    assert np.all((probabilidades > 0) & (probabilidades < 1))